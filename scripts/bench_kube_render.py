@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+"""
+Benchmarks rendering a tree of Kubernetes manifests
+
+The `legacy` case does what `KubeMixIn.render_nested_manifests` did before
+`compose_flow.kube.render`: for every file, parse the environment, create a new
+Jinja environment and checker, and render serially.  It understates the old
+cost, which also re-rendered the environment from its backend for every file.
+The `workers` cases render the same tree with `render_files` and an increasing
+number of worker processes, and the `unchanged` case renders it again with
+`render_directory` after a previous render.
+
+`--jinja-every` controls how many files use Jinja, e.g. `4` for every fourth one.
+
+```
+python scripts/bench_kube_render.py --files 400 --workers 1,2,4,8
+```
+"""
+import argparse
+import base64
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+sys.path.insert(0, SRC_DIR)
+
+from compose_flow.kube import render as kube_render  # noqa: E402
+from compose_flow.kube.checks import ManifestChecker  # noqa: E402
+from compose_flow.kube.render import (  # noqa: E402
+    RenderJob,
+    render_directory,
+    render_files,
+)
+from compose_flow.utils import get_kv, render  # noqa: E402
+
+MANIFEST = """---
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: app-{idx}
+  namespace: ${{NAMESPACE}}
+spec:
+  replicas: 2
+  template:
+    spec:
+      containers:
+{containers}
+---
+apiVersion: v1
+kind: Secret
+metadata:
+  name: app-{idx}
+data:
+  password: {password}
+"""
+
+CONTAINER = """      - name: app-{idx}-{container}
+        image: ${{DOCKER_IMAGE}}
+        env:
+        - name: DATABASE_URL
+          value: ${{DATABASE_URL}}
+        - name: REDIS_URL
+          value: ${{REDIS_URL}}
+        resources:
+          requests:
+            cpu: 100m
+            memory: 128Mi
+          limits:
+            cpu: 200m
+            memory: 256Mi
+"""
+
+
+def make_env_content(variables: int) -> str:
+    lines = [
+        "NAMESPACE=app",
+        "DOCKER_IMAGE=registry.example.com/app:1.0.0",
+        "DATABASE_URL=postgres://app@db/app",
+        "REDIS_URL=redis://redis:6379/0",
+        "PASSWORD=secret",
+    ]
+    lines.extend(f"VAR_{idx}=value-{idx}" for idx in range(variables))
+
+    return "\n".join(lines)
+
+
+def make_tree(root: str, files: int, jinja_every: int) -> list:
+    paths = []
+    for idx in range(files):
+        path = os.path.join(root, "manifests", f"group-{idx % 10}", f"app-{idx}.yml")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        password = "c2VjcmV0"
+        if jinja_every and idx % jinja_every == 0:
+            password = "{{ PASSWORD | b64encode }}"
+
+        containers = "".join(CONTAINER.format(idx=idx, container=x) for x in range(3))
+        with open(path, "w") as fh:
+            fh.write(MANIFEST.format(idx=idx, containers=containers, password=password))
+
+        paths.append(path)
+
+    return paths
+
+
+def legacy_render(paths: list, out_dir: str, env_content: str) -> None:
+    from jinja2 import Environment
+
+    for path in paths:
+        env = dict(get_kv(env_content, multiple=True))
+
+        with open(path, "r") as fh:
+            content = fh.read()
+
+        rendered = render(content, env=env)
+
+        jinja_env = Environment()
+        jinja_env.filters["b64encode"] = lambda s: base64.b64encode(s.encode()).decode(
+            "utf-8"
+        )
+        rendered = jinja_env.from_string(rendered).render(env)
+
+        check_errors = ManifestChecker().check(rendered)
+        if check_errors:
+            raise Exception(check_errors)
+
+        with open(os.path.join(out_dir, os.path.basename(path)), "w") as fh:
+            fh.write(rendered)
+
+
+def time_runs(func, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--variables", type=int, default=300)
+    parser.add_argument("--jinja-every", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--workers", default=f"1,2,4,{os.cpu_count()}")
+
+    args = parser.parse_args()
+
+    # render through the pool whenever more than one worker is requested
+    kube_render.PARALLEL_MIN_FILES = 0
+
+    root = tempfile.mkdtemp()
+    try:
+        paths = make_tree(root, args.files, args.jinja_every)
+        out_dir = os.path.join(root, "rendered")
+        os.makedirs(out_dir)
+
+        env_content = make_env_content(args.variables)
+
+        results = {}
+        results["legacy"] = time_runs(
+            lambda: legacy_render(paths, out_dir, env_content), args.runs
+        )
+
+        jobs = [RenderJob(x, os.path.join(out_dir, os.path.basename(x))) for x in paths]
+        checker = ManifestChecker()
+
+        for workers in sorted(set(int(x) for x in args.workers.split(","))):
+
+            def run():
+                env = dict(get_kv(env_content, multiple=True))
+
+                render_files(jobs, env, checker=checker, workers=workers)
+
+            results[f"workers={workers}"] = time_runs(run, args.runs)
+
+        env = dict(get_kv(env_content, multiple=True))
+        source_path = os.path.join(root, "manifests")
+        rendered_path = os.path.join(root, "incremental")
+
+        render_directory(source_path, rendered_path, env, checker=checker)
+
+        results["unchanged"] = time_runs(
+            lambda: render_directory(source_path, rendered_path, env, checker=checker),
+            args.runs,
+        )
+    finally:
+        shutil.rmtree(root)
+
+    print(f"{args.files} files, {os.cpu_count()} cpus")
+
+    legacy = statistics.median(results["legacy"])
+    for name, timings in results.items():
+        median = statistics.median(timings)
+
+        print(
+            f"{name:>12}: median={median * 1000:.1f}ms speedup={legacy / median:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
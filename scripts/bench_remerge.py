@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+Benchmarks `compose_flow.utils.remerge` against the previous boltons-based implementation
+
+Synthetic compose files are generated with a base file and overlays similar to
+a project's `docker-compose.<profile>.yml` files.
+
+```
+python scripts/bench_remerge.py --services 10 100 1000
+```
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from boltons.iterutils import default_enter, default_visit, get_path, remap
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+sys.path.insert(0, SRC_DIR)
+
+from compose_flow.utils import remerge  # noqa: E402
+
+
+# https://gist.github.com/mahmoud/db02d16ac89fa401b968
+def legacy_remerge(target_list, sourced=False):
+    """
+    The boltons remap-based remerge used before the specialized merge
+    """
+    if not sourced:
+        target_list = [(id(t), t) for t in target_list]
+
+    ret = None
+    source_map = {}
+
+    def remerge_enter(path, key, value):
+        new_parent, new_items = default_enter(path, key, value)
+        if ret and not path and key is None:
+            new_parent = ret
+        try:
+            cur_val = get_path(ret, path + (key,))
+        except KeyError:
+            pass
+        else:
+            new_parent = cur_val
+
+        if isinstance(value, list):
+            new_parent.extend(value)
+            new_items = []
+
+        return new_parent, new_items
+
+    for t_name, target in target_list:
+        if sourced:
+
+            def remerge_visit(path, key, value):
+                source_map[path + (key,)] = t_name
+                return True
+
+        else:
+            remerge_visit = default_visit
+
+        ret = remap(target, enter=remerge_enter, visit=remerge_visit)
+
+    if not sourced:
+        return ret
+    return ret, source_map
+
+
+def make_base(num_services: int) -> dict:
+    services = {}
+    for idx in range(num_services):
+        services[f"service{idx}"] = {
+            "image": "${DOCKER_IMAGE}",
+            "command": ["/app/bin/start", f"--worker={idx}"],
+            "environment": [f"SERVICE_INDEX={idx}", "DATABASE_URL"],
+            "deploy": {
+                "replicas": 1,
+                "placement": {"constraints": ["node.role == worker"]},
+                "resources": {
+                    "limits": {"memory": "256M", "cpus": "0.5"},
+                    "reservations": {"memory": "128M"},
+                },
+                "labels": {"traefik.enable": "false"},
+            },
+            "networks": ["backend"],
+            "logging": {"driver": "json-file", "options": {"max-size": "10m"}},
+        }
+
+    return {
+        "version": "3.7",
+        "services": services,
+        "networks": {"backend": {"driver": "overlay"}},
+    }
+
+
+def make_overlay(num_services: int, name: str) -> dict:
+    services = {}
+    for idx in range(0, num_services, 2):
+        services[f"service{idx}"] = {
+            "environment": [f"OVERLAY={name}"],
+            "deploy": {
+                "replicas": 2,
+                "resources": {"limits": {"memory": "512M"}},
+                "labels": {f"overlay.{name}": "true"},
+            },
+        }
+
+    return {"services": services}
+
+
+def make_targets(num_services: int, num_overlays: int) -> list:
+    targets = [make_base(num_services)]
+    for idx in range(num_overlays):
+        targets.append(make_overlay(num_services, f"overlay{idx}"))
+
+    return targets
+
+
+def time_fn(fn, num_services: int, num_overlays: int, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        # generate new targets for each run since merged lists share items
+        targets = make_targets(num_services, num_overlays)
+
+        start = time.perf_counter()
+        fn(targets)
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--services", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--overlays", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=5)
+
+    args = parser.parse_args()
+
+    for num_services in args.services:
+        targets = make_targets(num_services, args.overlays)
+        expected = legacy_remerge(make_targets(num_services, args.overlays))
+        if remerge(targets) != expected:
+            sys.exit(f"merge results differ for services={num_services}")
+
+        legacy = time_fn(legacy_remerge, num_services, args.overlays, args.runs)
+        current = time_fn(remerge, num_services, args.overlays, args.runs)
+
+        print(
+            f"services={num_services:>5}: legacy={legacy * 1000:.1f}ms"
+            f" remerge={current * 1000:.1f}ms speedup={legacy / current:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
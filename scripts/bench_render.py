@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+Benchmarks `compose_flow.utils.render` against the previous implementation
+
+A synthetic Kubernetes manifest of about `--size-mb` megabytes is rendered
+with a variable substitution every few lines.
+
+```
+python scripts/bench_render.py --size-mb 5
+```
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+sys.path.insert(0, SRC_DIR)
+
+from compose_flow import template  # noqa: E402
+from compose_flow.utils import render  # noqa: E402
+
+LEGACY_VAR_RE = re.compile(r"\${(?P<varname>.*?)(?P<junk>[:?].*)?}")
+
+DOCUMENT = """---
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: app-{idx}
+  namespace: ${{NAMESPACE}}
+  labels:
+    app: app-{idx}
+    version: ${{VERSION}}
+spec:
+  replicas: 2
+  template:
+    spec:
+      containers:
+        - name: app
+          image: ${{DOCKER_IMAGE}}
+          env:
+            - name: DATABASE_URL
+              value: ${{DATABASE_URL}}
+            - name: WORKER_INDEX
+              value: "{idx}"
+          resources:
+            limits:
+              memory: 512Mi
+"""
+
+ENV = {
+    "NAMESPACE": "production",
+    "VERSION": "1.2.3",
+    "DOCKER_IMAGE": "registry.example.com/app:1.2.3",
+    "DATABASE_URL": "postgres://user:pass@db:5432/app",
+}
+
+
+def legacy_render(content: str, env: dict) -> str:
+    """
+    The string concatenation render used before compiled templates
+    """
+    previous_idx = 0
+    rendered = ""
+
+    for x in LEGACY_VAR_RE.finditer(content):
+        rendered += content[previous_idx : x.start("varname") - 2]
+
+        varname = x.group("varname")
+        rendered += env[varname]
+
+        end = x.end("junk")
+        if end == -1:
+            end = x.end("varname")
+
+        previous_idx = end + 1
+
+    rendered += content[previous_idx:]
+
+    return rendered
+
+
+def make_manifest(size: int) -> str:
+    documents = []
+
+    total = 0
+    idx = 0
+    while total < size:
+        document = DOCUMENT.format(idx=idx)
+        documents.append(document)
+
+        total += len(document)
+        idx += 1
+
+    return "".join(documents)
+
+
+def time_fn(fn, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def clear_template_cache():
+    template._cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=5)
+    parser.add_argument("--runs", type=int, default=5)
+
+    args = parser.parse_args()
+
+    content = make_manifest(int(args.size_mb * 1024 * 1024))
+
+    if render(content, env=ENV) != legacy_render(content, ENV):
+        sys.exit("render results differ")
+
+    def render_cold():
+        clear_template_cache()
+        render(content, env=ENV)
+
+    results = (
+        ("legacy", time_fn(lambda: legacy_render(content, ENV), args.runs)),
+        ("cold", time_fn(render_cold, args.runs)),
+        ("cached", time_fn(lambda: render(content, env=ENV), args.runs)),
+    )
+
+    print(f"manifest size: {len(content) / 1024 / 1024:.1f}MB")
+
+    legacy = statistics.median(results[0][1])
+    for name, timings in results:
+        median = statistics.median(timings)
+
+        print(
+            f"{name:>8}: median={median * 1000:.1f}ms"
+            f" min={min(timings) * 1000:.1f}ms speedup={legacy / median:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Benchmarks compose-flow cold start
+
+Each sample is a fresh interpreter so that module imports are included in the timing.
+The `eager` case imports every subcommand module, which is what the command line
+parser did before the static subcommand registry was introduced.
+
+```
+python scripts/bench_startup.py --runs 20
+```
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+WORKFLOW_IMPORT = "from compose_flow.commands import Workflow"
+
+CASES = {
+    "version": [WORKFLOW_IMPORT, "Workflow(argv=['--version'])"],
+    "help": [WORKFLOW_IMPORT, "Workflow(argv=['help'])"],
+    "eager": [
+        WORKFLOW_IMPORT,
+        "from compose_flow.commands.subcommands import find_subcommands",
+        "list(find_subcommands())",
+        "Workflow(argv=['--version'])",
+    ],
+}
+
+
+def run_case(lines: list, runs: int) -> list:
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "\n".join(lines)], env=env, check=True)
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+
+    args = parser.parse_args()
+
+    results = {}
+    for name, lines in CASES.items():
+        timings = run_case(lines, args.runs)
+        results[name] = statistics.median(timings)
+
+        print(
+            f"{name:>8}: median={results[name] * 1000:.1f}ms min={min(timings) * 1000:.1f}ms"
+        )
+
+    print(f"\nspeedup vs eager: {results['eager'] / results['version']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
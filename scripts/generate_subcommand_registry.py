@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Generates the static subcommand registry
+
+The registry lets the command line parser list every subcommand without
+importing the subcommand modules; only the selected subcommand is imported.
+Re-run this script whenever a subcommand is added, removed or renamed:
+
+```
+python scripts/generate_subcommand_registry.py
+```
+"""
+import argparse
+import json
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+sys.path.insert(0, SRC_DIR)
+
+from compose_flow.commands.subcommands import find_subcommands  # noqa: E402
+
+REGISTRY_PATH = os.path.join(
+    SRC_DIR, "compose_flow", "commands", "subcommands", "registry.py"
+)
+
+HEADER = '''"""
+Static registry of subcommands
+
+GENERATED FILE: do not edit by hand, run `scripts/generate_subcommand_registry.py`
+
+Maps the subcommand name to a tuple of (module name, class name, aliases)
+"""
+'''
+
+
+def render_registry() -> str:
+    entries = []
+    for subcommand_cls in find_subcommands():
+        module_name = subcommand_cls.__module__.rsplit(".", 1)[-1]
+        aliases = list(getattr(subcommand_cls, "aliases", []))
+
+        entries.append(
+            (
+                subcommand_cls.__name__.lower(),
+                module_name,
+                subcommand_cls.__name__,
+                aliases,
+            )
+        )
+
+    lines = [HEADER, "SUBCOMMANDS = {"]
+    for name, module_name, class_name, aliases in sorted(entries):
+        values = ", ".join(json.dumps(x) for x in (module_name, class_name, aliases))
+        lines.append(f"    {json.dumps(name)}: ({values}),")
+    lines.append("}")
+
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit non-zero when the registry on disk is out of date",
+    )
+
+    args = parser.parse_args()
+
+    content = render_registry()
+
+    if args.check:
+        with open(REGISTRY_PATH, "r") as fh:
+            if fh.read() != content:
+                sys.exit(f"{REGISTRY_PATH} is out of date")
+
+        return
+
+    with open(REGISTRY_PATH, "w") as fh:
+        fh.write(content)
+
+
+if __name__ == "__main__":
+    main()
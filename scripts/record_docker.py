@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Records docker responses for the transport tests
+
+Runs both docker transports against the daemon at `DOCKER_HOST` and writes the
+API responses and the docker command output to a JSON file that
+`tests.docker_recording` replays.
+
+```
+DOCKER_HOST=unix:///var/run/docker.sock python scripts/record_docker.py \
+    --config dev-app src/tests/files/docker/swarm.json
+```
+
+Config data is only recorded for the configs passed with `--config`.  Review
+the output before committing it; it contains whatever the swarm returns.
+"""
+import argparse
+import json
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from compose_flow import docker, docker_api  # noqa: E402
+
+
+def record(configs: list) -> dict:
+    recording = {"api": {}, "cli": {}}
+
+    client = docker_api.get_client()
+    if not client:
+        sys.exit("DOCKER_HOST must be a unix:// or tcp:// address")
+
+    send = client._send
+
+    def recording_send(method, url, body, headers):
+        status, content = send(method, url, body, headers)
+
+        recording["api"][f"{method} {url}"] = {
+            "status": status,
+            "body": json.loads(content.decode("utf8")) if content else None,
+        }
+
+        return status, content
+
+    client._send = recording_send
+
+    get_docker_output = docker.get_docker_output
+
+    def recording_output(command, env):
+        output = get_docker_output(command, env)
+
+        recording["cli"][command] = output
+
+        return output
+
+    docker.get_docker_output = recording_output
+
+    for transport in (docker.ApiTransport(client), docker.CliTransport()):
+        transport.get_nodes()
+
+        names = [x["Name"] for x in transport.get_services()]
+        for name in names:
+            transport.inspect_service(name)
+            transport.get_tasks(name)
+
+        transport.inspect_services(names)
+
+        if configs:
+            transport.get_configs(configs)
+
+    return recording
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--config",
+        action="append",
+        default=[],
+        help="name of a config to record, can be given multiple times",
+    )
+    parser.add_argument("output", help="path to write the recording to")
+
+    args = parser.parse_args()
+
+    recording = record(args.config)
+
+    with open(args.output, "w") as fh:
+        json.dump(recording, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+    print(
+        f"recorded {len(recording['api'])} requests and {len(recording['cli'])} commands"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""
+Converts a compose-flow trace to the Chrome trace event format
+
+```
+CF_TRACE_FILE=trace.jsonl compose-flow -e dev deploy rancher
+python scripts/trace_to_chrome.py trace.jsonl trace.json
+```
+
+Open the output in `chrome://tracing` or https://ui.perfetto.dev; commands run
+concurrently show up on separate rows.
+"""
+import argparse
+import json
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from compose_flow import timings  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("trace", help="the JSON lines trace written to CF_TRACE_FILE")
+    parser.add_argument("output", help="path to write the Chrome trace to")
+
+    args = parser.parse_args()
+
+    trace = timings.read_trace(args.trace)
+
+    with open(args.output, "w") as fh:
+        json.dump(timings.to_chrome_trace(trace), fh)
+
+    print(f"converted {len(trace)} commands")
+
+
+if __name__ == "__main__":
+    main()
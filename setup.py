@@ -69,7 +69,10 @@ setup(
     package_dir={"": "src"},
     packages=packages,
     entry_points={
-        "console_scripts": ["compose-flow = compose_flow.entrypoints:compose_flow"]
+        "console_scripts": [
+            "compose-flow = compose_flow.entrypoints:compose_flow",
+            "compose-flow-daemon = compose_flow.entrypoints:daemon",
+        ]
     },
     install_requires=get_required_packages(),
 )
@@ -0,0 +1,3 @@
+from compose_flow.entrypoints import compose_flow
+
+compose_flow()
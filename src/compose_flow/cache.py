@@ -0,0 +1,191 @@
+"""
+On-disk cache
+
+Entries are JSON documents stored in a directory, one file per key.  Keys are
+generated from the content that produced the cached value, so a changed input
+simply results in a different key.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+from typing import Iterable, NamedTuple
+
+
+class CacheEntry(NamedTuple):
+    key: str
+    size: int
+    created: float
+    last_used: float
+
+
+class DiskCache(object):
+    """
+    Size-bounded cache of JSON-serializable values
+
+    When `max_bytes` is set, the least recently used entries are evicted once the
+    cache grows beyond it.  When `ttl` is set, entries older than `ttl` seconds are
+    considered missing.
+    """
+
+    suffix = ".json"
+
+    def __init__(self, root: str, max_bytes: int = None, ttl: float = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    @property
+    def logger(self):
+        return logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """
+        Returns a key for the given JSON-serializable parts
+        """
+        serialized = json.dumps(parts, sort_keys=True, default=str)
+
+        return hashlib.sha256(serialized.encode("utf8")).hexdigest()
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}{self.suffix}")
+
+    def get(self, key: str, default=None):
+        """
+        Returns the cached value for the given key or `default` when it is not cached
+        """
+        path = self.get_path(key)
+
+        try:
+            with open(path, "r") as fh:
+                entry = json.load(fh)
+        except FileNotFoundError:
+            return default
+        except ValueError:
+            self.logger.warning(f"removing corrupt cache entry {path}")
+            self.remove(key)
+
+            return default
+
+        if self.ttl is not None and time.time() - entry["created"] > self.ttl:
+            self.remove(key)
+
+            return default
+
+        # bump the modification time to track usage for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return entry["value"]
+
+    def set(self, key: str, value) -> None:
+        """
+        Stores the value in the cache
+        """
+        os.makedirs(self.root, exist_ok=True)
+
+        entry = {"created": time.time(), "value": value}
+
+        # write to a temp file and move it in place so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                json.dump(entry, fh)
+
+            os.replace(temp_path, self.get_path(key))
+        except BaseException:
+            os.remove(temp_path)
+
+            raise
+
+        self.evict()
+
+    def remove(self, key: str) -> None:
+        try:
+            os.remove(self.get_path(key))
+        except FileNotFoundError:
+            pass
+
+    def entries(self) -> Iterable[CacheEntry]:
+        """
+        Returns the entries in the cache, least recently used first
+        """
+        if not os.path.isdir(self.root):
+            return []
+
+        entries = []
+        for item in os.listdir(self.root):
+            if not item.endswith(self.suffix):
+                continue
+
+            path = os.path.join(self.root, item)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            entries.append(
+                CacheEntry(
+                    key=item[: -len(self.suffix)],
+                    size=stat.st_size,
+                    created=stat.st_ctime,
+                    last_used=stat.st_mtime,
+                )
+            )
+
+        return sorted(entries, key=lambda x: x.last_used)
+
+    def evict(self) -> None:
+        """
+        Removes least recently used entries until the cache fits in `max_bytes`
+        """
+        if not self.max_bytes:
+            return
+
+        entries = self.entries()
+        total = sum(x.size for x in entries)
+
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+
+            self.logger.debug(f"evicting cache entry {entry.key}")
+
+            self.remove(entry.key)
+
+            total -= entry.size
+
+    def clear(self) -> int:
+        """
+        Removes all entries from the cache
+
+        Returns:
+            the number of entries removed
+        """
+        entries = self.entries()
+        for entry in entries:
+            self.remove(entry.key)
+
+        return len(entries)
+
+
+def file_digest(path: str) -> [str, None]:
+    """
+    Returns the sha256 digest of the file's content or None when the file does not exist
+    """
+    digest = hashlib.sha256()
+
+    try:
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(65536), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+
+    return digest.hexdigest()
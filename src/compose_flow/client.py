@@ -0,0 +1,120 @@
+"""
+Client of the compose-flow daemon
+
+The `compose-flow` entrypoint hands commands to the daemon, see
+`compose_flow.daemon`, through this module before anything else in the package
+is imported, so that a command run by the daemon does not pay for importing
+compose-flow; keep its imports to the standard library.
+
+The client sends the command as a single line of JSON with its arguments,
+working directory and environment.  The daemon answers with one line of JSON per
+message:
+
+- `{"out": "..."}` and `{"err": "..."}` carry the command's output
+- `{"exit": 0}` ends the command with its exit code
+- `{"fallback": "reason"}` hands the command back to be run locally
+"""
+import json
+import os
+import socket
+import sys
+
+
+def send(sock: socket.socket, message: dict) -> None:
+    sock.sendall(json.dumps(message).encode("utf8") + b"\n")
+
+
+def read_messages(sock: socket.socket):
+    with sock.makefile("r", encoding="utf8") as fh:
+        for line in fh:
+            yield json.loads(line)
+
+
+def connect(socket_path: str) -> [socket.socket, None]:
+    """
+    Returns a connection to the daemon or None when no daemon is listening
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+
+        return None
+
+    return sock
+
+
+def run(
+    socket_path: str,
+    argv: list,
+    cwd: str = None,
+    environ: dict = None,
+    stdout=None,
+    stderr=None,
+) -> [int, None]:
+    """
+    Runs the command in the daemon listening on the socket
+
+    Returns:
+        the exit code of the command or None when it is to be run locally
+    """
+    sock = connect(socket_path)
+    if sock is None:
+        return None
+
+    streams = {"out": stdout or sys.stdout, "err": stderr or sys.stderr}
+
+    with sock:
+        send(
+            sock,
+            {
+                "argv": list(argv),
+                "cwd": cwd or os.getcwd(),
+                "environ": dict(os.environ if environ is None else environ),
+            },
+        )
+
+        try:
+            for message in read_messages(sock):
+                if "exit" in message:
+                    return message["exit"]
+
+                if "fallback" in message:
+                    return None
+
+                for name, stream in streams.items():
+                    if name in message:
+                        stream.write(message[name])
+                        stream.flush()
+        except KeyboardInterrupt:
+            return 130
+
+    # the command may have done part of its work, do not run it again
+    streams["err"].write(
+        "Error: the compose-flow daemon exited while running the command\n"
+    )
+
+    return 1
+
+
+def stop(socket_path: str) -> bool:
+    """
+    Stops the daemon listening on the socket
+
+    Returns:
+        whether a daemon was listening
+    """
+    sock = connect(socket_path)
+    if sock is None:
+        return False
+
+    with sock:
+        send(sock, {"stop": True})
+
+        for message in read_messages(sock):
+            if "exit" in message:
+                break
+
+    return True
@@ -6,13 +6,16 @@ import importlib
 import os
 import sys
 
-from .base import BaseSubcommand, BaseBuildSubcommand
-from .passthrough_base import PassthroughBaseSubcommand
+from .registry import SUBCOMMANDS
 
 
 def find_subcommands() -> object:
     """
     Generates a collection of subcommand classes found in this package
+
+    NOTE: this imports every subcommand module; it is used to generate the static
+    registry in `registry.py`.  at runtime use `get_subcommand_names()` and
+    `load_subcommand()`, which only import the selected subcommand.
     """
     for item in os.listdir(os.path.dirname(__file__)):
         if item.startswith("_"):
@@ -32,6 +35,9 @@ def get_subcommand_class(filename: str) -> [object, None]:
     """
     Imports the given filename and returns the subcommand class found
     """
+    from .base import BaseSubcommand, BaseBuildSubcommand
+    from .passthrough_base import PassthroughBaseSubcommand
+
     module_name = filename.split(".", 1)[0]
     package = __name__
 
@@ -51,6 +57,40 @@ def get_subcommand_class(filename: str) -> [object, None]:
             continue
 
 
+def get_subcommand_names() -> dict:
+    """
+    Returns a mapping of subcommand name to its aliases without importing any subcommand
+    """
+    return {name: aliases for name, (_, _, aliases) in SUBCOMMANDS.items()}
+
+
+def resolve_subcommand_name(name: str) -> [str, None]:
+    """
+    Returns the registered subcommand name for the given name or alias
+    """
+    if name in SUBCOMMANDS:
+        return name
+
+    for subcommand_name, (_, _, aliases) in SUBCOMMANDS.items():
+        if name in aliases:
+            return subcommand_name
+
+
+def load_subcommand(name: str) -> object:
+    """
+    Imports the module for the given subcommand name or alias and returns its class
+    """
+    subcommand_name = resolve_subcommand_name(name)
+    if subcommand_name is None:
+        raise KeyError(f"unknown subcommand {name}")
+
+    module_name, class_name, _ = SUBCOMMANDS[subcommand_name]
+
+    module = importlib.import_module(f".{module_name}", package=__name__)
+
+    return getattr(module, class_name)
+
+
 # https://stackoverflow.com/a/26379693/703144
 def set_default_subparser(self, name, args=None):
     """default subparser selection. Call after setup, just before parse_args()
@@ -1,10 +1,10 @@
-from functools import lru_cache
 import logging
 
 from abc import ABC
 
-from compose_flow import errors, shell
+from compose_flow import errors, shell, timings
 from compose_flow.config import get_config
+from compose_flow.context import activate, get_context
 from compose_flow.errors import (
     CommandError,
     EnvError,
@@ -14,6 +14,7 @@ from compose_flow.errors import (
     ProfileError,
     TagVersionError,
 )
+from compose_flow.utils import cached_property
 
 
 class BaseSubcommand(ABC):
@@ -42,6 +43,10 @@ class BaseSubcommand(ABC):
     # the project version should be updated (i.e. DOCKER_IMAGE)
     update_version_env_vars = False
 
+    # whether the subcommand needs the terminal, e.g. to run an interactive shell;
+    # the daemon hands these back to the client to run, see `compose_flow.daemon`
+    interactive = False
+
     def __init__(self, workflow):
         self.workflow = workflow
 
@@ -60,7 +65,10 @@ class BaseSubcommand(ABC):
         # use the `or` syntax so that the environment data is not evaluated unless env is not passed in
         env = kwargs.pop("_env", None) or self.workflow.environment.data
 
-        return shell.execute(command, env, **kwargs)
+        with activate(get_context(self.workflow)), timings.subcommand(
+            self.__class__.__name__.lower()
+        ):
+            return shell.execute(command, env, **kwargs)
 
     def get_subcommand(self, name: str) -> object:
         """
@@ -93,6 +101,12 @@ class BaseSubcommand(ABC):
         else:
             self.print_subcommand_help(self.__doc__, error=f"unknown action={action}")
 
+    def is_interactive(self) -> bool:
+        """
+        Returns whether the command, as given on the command line, needs the terminal
+        """
+        return self.interactive
+
     def is_dirty_working_copy_okay(self, exc: Exception) -> bool:
         """
         Checks to see if the project's compose-flow.yml allows for the env to use a dirty working copy
@@ -175,8 +189,7 @@ class BaseBuildSubcommand(BaseSubcommand):
     def is_missing_env_arg_okay(self):
         return True
 
-    @property
-    @lru_cache()
+    @cached_property
     def compose(self):
         """
         Returns a Compose subcommand
@@ -1,6 +1,10 @@
+import functools
 import logging
 
+from compose_flow import settings
+from compose_flow.kube import digests, scheduler
 from compose_flow.kube.mixins import KubeMixIn
+from compose_flow.kube.scheduler import Step
 
 from .base import BaseSubcommand
 from .profile import Profile
@@ -23,6 +27,28 @@ class Deploy(BaseSubcommand, KubeMixIn):
     @classmethod
     def fill_subparser(cls, parser, subparser):
         subparser.add_argument("action", nargs="?", default="docker", choices=ACTIONS)
+        subparser.add_argument(
+            "-j",
+            "--parallel",
+            type=int,
+            default=settings.DEPLOY_WORKERS,
+            help="number of apps and manifests to deploy at the same time",
+        )
+        subparser.add_argument(
+            "--serial-apps",
+            action="store_true",
+            help="deploy apps one at a time in the order they are listed",
+        )
+        subparser.add_argument(
+            "--force",
+            action="store_true",
+            help="deploy apps and manifests whose rendered output is already deployed",
+        )
+        subparser.add_argument(
+            "--plan",
+            action="store_true",
+            help="print what would be deployed, in order, without deploying",
+        )
 
     @property
     def logger(self):
@@ -42,34 +68,73 @@ class Deploy(BaseSubcommand, KubeMixIn):
             --compose-file {self.workflow.profile.filename}
             {self.workflow.config_name}"""
 
+    @staticmethod
+    def get_depends_on(entry: dict) -> tuple:
+        depends_on = entry.get("depends_on") or ()
+        if isinstance(depends_on, str):
+            depends_on = (depends_on,)
+
+        return tuple(depends_on)
+
+    def get_app_step(self, app: dict, target: str = "rancher") -> Step:
+        # check if app is already installed - if so upgrade, if not install
+        command = self.get_app_deploy_command(app, target=target)
+
+        # with --serial-apps, apps without an explicit depends_on are deployed in order
+        group = None
+        if self.workflow.args.serial_apps and "depends_on" not in app:
+            group = "apps"
+
+        return Step(
+            command,
+            name=app["name"],
+            wave=app.get("wave", scheduler.APPS_WAVE),
+            group=group,
+            depends_on=self.get_depends_on(app),
+            digest=digests.get_command_digest(command),
+        )
+
+    def get_manifest_step(self, manifest, kubectl_prefix: str = "kubectl") -> Step:
+        if isinstance(manifest, str):
+            manifest = {"path": manifest}
+
+        # without an explicit depends_on, manifests in the same namespace are applied in order
+        group = None
+        if "depends_on" not in manifest:
+            group = f"namespace:{manifest.get('namespace') or ''}"
+
+        command = self.get_kubectl_command(manifest, kubectl_prefix=kubectl_prefix)
+
+        # the content behind a URL is only known to kubectl
+        digest = None
+        if not self._is_url(manifest["path"]):
+            digest = digests.get_command_digest(command)
+
+        return Step(
+            command,
+            name=manifest.get("name", manifest["path"]),
+            wave=manifest.get("wave", scheduler.MANIFESTS_WAVE),
+            group=group,
+            depends_on=self.get_depends_on(manifest),
+            digest=digest,
+        )
+
     def build_kubectl_command(self) -> list:
         self.switch_kube_context()
 
-        command = []
-
-        for manifest in self.get_kubectl_manifests():
-            if isinstance(manifest, str):
-                manifest = {"path": manifest}
-            command.append(self.get_kubectl_command(manifest))
-
-        return command
+        return [self.get_manifest_step(x) for x in self.get_kubectl_manifests()]
 
     def build_rancher_command(self) -> list:
         self.switch_rancher_context()
 
-        command = []
+        command = [self.get_app_step(x) for x in self.get_apps()]
 
-        for app in self.get_apps():
-            # check if app is already installed - if so upgrade, if not install
-            command.append(self.get_app_deploy_command(app))
-
-        self.upsert_rancher_namespaces(self.workflow.args.dry_run)
+        args = self.workflow.args
+        self.upsert_rancher_namespaces(args.dry_run or args.plan)
 
         for manifest in self.get_rancher_manifests():
-            if isinstance(manifest, str):
-                manifest = {"path": manifest}
             command.append(
-                self.get_kubectl_command(manifest, kubectl_prefix="rancher kubectl")
+                self.get_manifest_step(manifest, kubectl_prefix="rancher kubectl")
             )
 
         return command
@@ -77,14 +142,10 @@ class Deploy(BaseSubcommand, KubeMixIn):
     def build_rke_command(self) -> str:
         return self.get_rke_deploy_command()
 
-    def build_helm_command(self) -> str:
+    def build_helm_command(self) -> list:
         self.switch_kube_context()
 
-        command = []
-
-        for app in self.get_helm_apps():
-            command.append(self.get_app_deploy_command(app, target="helm"))
-        return command
+        return [self.get_app_step(x, target="helm") for x in self.get_helm_apps()]
 
     def handle(self):
         args = self.workflow.args
@@ -99,15 +160,76 @@ class Deploy(BaseSubcommand, KubeMixIn):
         command = action_method()
         command_is_list = isinstance(command, list)
 
-        logged_command = "\n".join(command) if command_is_list else command
+        logged_command = (
+            "\n".join(x.command for x in command) if command_is_list else command
+        )
         self.logger.info(logged_command)
 
-        if not args.dry_run:
+        record = None
+        unchanged = set()
+        if command_is_list:
+            # steps without a digest are always deployed, there is nothing to record
+            if any(x.digest for x in command):
+                record = self.get_deploy_record()
+
+            if record and not args.force:
+                unchanged = {
+                    x.name for x in command if record.is_unchanged(x.name, x.digest)
+                }
+
+            if args.dry_run or args.plan:
+                # validates the plan as well
+                print(
+                    scheduler.format_plan(
+                        command, {x: scheduler.UNCHANGED for x in unchanged}
+                    )
+                )
+
+        if not (args.dry_run or args.plan):
             if command_is_list:
-                # If multiple commands are returned, run them one by one
-                for c in command:
-                    self.execute(c)
+                # load the environment once rather than in each of the threads running steps
+                run_step = functools.partial(
+                    self.run_step, env=env.data, record=record, unchanged=unchanged
+                )
+
+                try:
+                    scheduler.run_steps(command, run_step, workers=args.parallel)
+                finally:
+                    self.invalidate_app_listings()
+
+                    if record:
+                        record.save()
             else:
                 self.execute(command)
 
             env.write()
+
+    def get_deploy_record(self) -> digests.DeployRecord:
+        """
+        Returns the record of what was deployed to the target cluster
+        """
+        action = self.workflow.args.action
+        scope = self.rancher_scope if action == "rancher" else self.kube_scope
+
+        return digests.get_record(action, scope, self.workflow.config_name)
+
+    def run_step(
+        self,
+        step: Step,
+        env: dict = None,
+        record: digests.DeployRecord = None,
+        unchanged: set = (),
+    ) -> str:
+        if step.name in unchanged:
+            self.logger.info("%s is unchanged, skipping", step.name)
+
+            return scheduler.UNCHANGED
+
+        output = scheduler.get_output(step.name)
+
+        self.execute(step.command, _env=env, _out=output, _err=output)
+
+        if record:
+            record.deployed(step.name, step.digest)
+
+        return scheduler.OK
@@ -7,12 +7,17 @@ import os
 import tempfile
 import warnings
 
-from functools import lru_cache
+from typing import Dict, NamedTuple, Tuple
 
-from compose_flow import docker, errors, utils
-from compose_flow.commands.subcommands import BaseSubcommand
+from .base import BaseSubcommand
+
+from compose_flow import docker, errors, settings, utils
+from compose_flow.cache import DiskCache
 from compose_flow.config import get_config
+from compose_flow.context import get_context
 from compose_flow.environment.backends import get_backend
+from compose_flow.template import resolve_references
+from compose_flow.utils import cached_property
 
 DOCKER_IMAGE_VAR = "DOCKER_IMAGE"
 VERSION_VAR = "VERSION"
@@ -30,6 +35,28 @@ RUNTIME_PLACEHOLDER = "runtime://"
 # then the environment `foo` would be loaded in and the `bar` environment set on top
 ENV_EXTENDS_BASENAME = "CF_ENV_EXTENDS_BASENAME"
 
+# the extends chain of each environment is remembered so it can be prefetched;
+# only the basenames are stored, never the environments themselves
+EXTENDS_CACHE_MAX_BYTES = 1024 * 1024
+
+
+class ResolvedEnvironment(NamedTuple):
+    """
+    The environment with its extended environments and defaults applied
+    """
+
+    # the final variables
+    values: Dict[str, str]
+
+    # the basenames of the environments extended, closest first
+    extends: Tuple[str, ...] = ()
+
+    def render(self) -> str:
+        """
+        Returns the values in .env file format
+        """
+        return "\n".join(sorted(f"{k}={v}" for k, v in self.values.items()))
+
 
 class Env(BaseSubcommand):
     """
@@ -46,6 +73,15 @@ class Env(BaseSubcommand):
 
         self._data = None
 
+        # the resolved environment, built from data on first use
+        self._resolved = None
+
+        # backends by remote
+        self._backends = {}
+
+        # the data of extended environments by basename
+        self._extends_data = {}
+
         # when data is modified, set this to True
         self._data_modified = False
 
@@ -80,8 +116,22 @@ class Env(BaseSubcommand):
         return self.get_backend()
 
     def get_backend(self, remote=None):
-        backend_name = "local"
+        """
+        Returns the backend for the given remote
+
+        Backends are created once; some of them switch contexts or check the
+        cluster when created.
+        """
         remote = remote or self.workflow.args.remote
+
+        backend = self._backends.get(remote)
+        if backend is None:
+            backend = self._backends[remote] = self._make_backend(remote)
+
+        return backend
+
+    def _make_backend(self, remote):
+        backend_name = "local"
         project_config = get_config(self.workflow)
 
         if remote is not None:
@@ -104,6 +154,9 @@ class Env(BaseSubcommand):
 
         return backend
 
+    def is_interactive(self) -> bool:
+        return self.workflow.args.action == "edit"
+
     def edit(self) -> None:
         """
         Open the current backend data in an editor and write changes back
@@ -115,7 +168,8 @@ class Env(BaseSubcommand):
 
             fh.flush()
 
-            editor = os.environ.get("EDITOR", os.environ.get("VISUAL", "vi"))
+            environ = get_context(self.workflow).environ
+            editor = environ.get("EDITOR", environ.get("VISUAL", "vi"))
 
             self.execute(f"{editor} {path}", _fg=True)
 
@@ -143,6 +197,11 @@ class Env(BaseSubcommand):
             action="store_true",
             help="show runtime variables instead of values",
         )
+        subparser.add_argument(
+            "--with-content",
+            action="store_true",
+            help="with the ls action, print the content of each environment",
+        )
 
     def cat(self) -> str:
         """
@@ -185,7 +244,7 @@ class Env(BaseSubcommand):
             if k not in self._rendered_config:
                 self._rendered_config[k] = v
 
-            new_val = os.environ.get(location_ref)
+            new_val = get_context(self.workflow).environ.get(location_ref)
             if new_val is None:
                 if (
                     hasattr(self.workflow.args, "action")
@@ -200,21 +259,14 @@ class Env(BaseSubcommand):
             data[k] = new_val
 
         # render substitutions
-        sub_count = True
-        while sub_count:
-            # reset the substitution count to break the loop when no subs are made
-            sub_count = 0
-
-            for k, v in data.items():
-                rendered = utils.render(v, env=data)
-
-                if rendered != v:
-                    sub_count += 1
+        for k, rendered in resolve_references(data).items():
+            v = data[k]
 
-                    if k not in self._rendered_config:
-                        self._rendered_config[k] = v
+            if rendered != v:
+                if k not in self._rendered_config:
+                    self._rendered_config[k] = v
 
-                    data[k] = rendered
+                data[k] = rendered
 
         if self.workflow.subcommand.update_version_env_vars:
             # regenerate the full docker image name
@@ -279,6 +331,7 @@ class Env(BaseSubcommand):
             self._data_modified = True
 
         self._data = data
+        self._resolved = None
 
     def is_dirty_working_copy_okay(self, exc: Exception) -> bool:
         is_dirty_working_copy_okay = super().is_dirty_working_copy_okay(exc)
@@ -310,6 +363,19 @@ class Env(BaseSubcommand):
     def is_write_profile_error_okay(self, exc):
         return self.is_env_modification_action()
 
+    def get_config_name(self, basename: str = None) -> str:
+        """
+        Returns the name of the config to read for the given basename
+
+        When no basename is given, the name of the workflow's config is returned
+        """
+        # when a basename is given as a param, create the config name from it
+        # this is used to extend configurations based on the ENV_EXTENDS_BASENAME env variable
+        if basename:
+            return f"{self.workflow.args.environment}-{basename}"
+
+        return self.workflow.config_name
+
     def load(self, basename: str = None, post_process: bool = True) -> dict:
         """
         Loads an environment from the backend
@@ -318,18 +384,12 @@ class Env(BaseSubcommand):
             basename: the config basename to load
             post_process: whether to perform post-processing upon reading data
         """
-        data = {}
-
         # when no environment is specified on the command line, do not load any docker config
         environment = self.workflow.environment_name
         if not environment:
-            return data
+            return {}
 
-        # when a basename is given as a param, create the config name from it
-        # this is used to extend configurations based on the ENV_EXTENDS_BASENAME env variable
-        config_name = self.workflow.config_name
-        if basename:
-            config_name = f"{self.workflow.args.environment}-{basename}"
+        config_name = self.get_config_name(basename)
 
         try:
             backend = self.get_backend(remote=self.workflow.args.config_remote)
@@ -340,6 +400,24 @@ class Env(BaseSubcommand):
 
             content = ""
 
+        data = self.parse(content)
+
+        if post_process:
+            # all values from the docker config are persistable
+            self.update(data)
+
+            # now that the data from the cf environment is parsed default the
+            # docker image to anything that was defined in there.
+            self._docker_image = data.get("DOCKER_IMAGE")
+
+        return data
+
+    def parse(self, content: str) -> dict:
+        """
+        Parses the content of an environment
+        """
+        data = {}
+
         for idx, line in enumerate(content.splitlines()):
             # skip empty lines
             if line.strip() == "":
@@ -364,16 +442,64 @@ class Env(BaseSubcommand):
 
             data[key] = value
 
-        if post_process:
-            # all values from the docker config are persistable
-            self.update(data)
+        return data
 
-            # now that the data from the cf environment is parsed default the
-            # docker image to anything that was defined in there.
-            self._docker_image = data.get("DOCKER_IMAGE")
+    def load_extends(self, basename: str) -> dict:
+        """
+        Loads an environment extended by this one
+
+        Each extended environment is read from the backend once per workflow
+        """
+        data = self._extends_data.get(basename)
+        if data is None:
+            data = self._extends_data[basename] = self.load(
+                basename=basename, post_process=False
+            )
 
         return data
 
+    def prefetch_extends(self, basenames: list) -> None:
+        """
+        Reads the given extended environments with a single backend call
+
+        This is only done for backends that read environments in bulk; otherwise the
+        environments are loaded one at a time as the chain is followed.
+        """
+        backend = self.get_backend(remote=self.workflow.args.config_remote)
+        if not backend.bulk_read:
+            return
+
+        config_names = {
+            self.get_config_name(x): x for x in basenames if x not in self._extends_data
+        }
+        if not config_names:
+            return
+
+        try:
+            contents = backend.read_many(list(config_names))
+        except errors.NoSuchConfig as exc:
+            # the chain changed since it was cached, follow it one environment at a time
+            self.logger.debug(f"unable to prefetch {list(config_names)}: {exc}")
+
+            return
+
+        for config_name, content in contents.items():
+            self._extends_data[config_names[config_name]] = self.parse(content)
+
+    @cached_property
+    def extends_cache(self) -> DiskCache:
+        return DiskCache(
+            os.path.join(settings.CACHE_ROOT, "env-extends"),
+            max_bytes=EXTENDS_CACHE_MAX_BYTES,
+        )
+
+    def get_extends_cache_key(self) -> str:
+        args = self.workflow.args
+
+        return DiskCache.make_key(
+            args.remote, args.config_remote, self.workflow.config_name
+        )
+
     @property
     def logger(self):
         return logging.getLogger(f"{__name__}.{self.__class__.__name__}")
@@ -394,37 +520,21 @@ class Env(BaseSubcommand):
         return buf.getvalue()
 
     def render_buf(self, buf, data: dict = None, runtime_config: bool = True):
+        if runtime_config:
+            if data:
+                resolved = self.resolve(data)
+            else:
+                resolved = self.resolved
+
+            buf.write(resolved.render())
+
+            return
+
+        # reset runtime variables
         data = data or self.data  # pylint: disable=E1101
+        data.update(self._rendered_config)
 
-        if runtime_config:
-            # look to see if ENV_EXTENDS_BASENAME is defined in each environment,
-            # starting with the initial data.  when ENV_EXTENDS_BASENAME is found
-            # load its data and check it for ENV_EXTENDS_BASENAME.  continue
-            # checking until ENV_EXTENDS_BASENAME is not found
-            extended_configs = []
-
-            _data, data = data, {}
-            while True:
-                extended_configs.insert(0, _data)
-
-                extends_env = _data.get(ENV_EXTENDS_BASENAME)
-                if not extends_env:
-                    break
-
-                self.logger.info(f"extending current env with {extends_env}")
-                _data = self.load(basename=extends_env, post_process=False)
-
-            # apply the extended configs top-down such that the original data overwrites
-            # any upstream configuration
-            for extended_config in extended_configs:
-                data.update(extended_config)
-
-            # set defaults when no value is set
-            for k, v in self.cf_env.items():
-                if k not in data:
-                    data[k] = v
-        else:  # reset runtime variables
-            data.update(self._rendered_config)
+        self._resolved = None
 
         lines = []
         for k, v in data.items():
@@ -432,6 +542,95 @@ class Env(BaseSubcommand):
 
         buf.write("\n".join(sorted(lines)))
 
+    @property
+    def resolved(self) -> ResolvedEnvironment:
+        """
+        Returns the resolved environment
+
+        It is built once and rebuilt after the data is updated
+        """
+        if self._resolved is None:
+            self._resolved = self.resolve(self.data)
+
+        return self._resolved
+
+    def resolve(self, data: dict) -> ResolvedEnvironment:
+        """
+        Applies the extended environments and defaults to the given data
+        """
+        extends_cache_key = self.get_extends_cache_key()
+
+        # read the chain followed last time in one go
+        cached_extends = self.extends_cache.get(extends_cache_key)
+        if cached_extends and cached_extends[0] == data.get(ENV_EXTENDS_BASENAME):
+            self.prefetch_extends(cached_extends)
+
+        # look to see if ENV_EXTENDS_BASENAME is defined in each environment,
+        # starting with the initial data.  when ENV_EXTENDS_BASENAME is found
+        # load its data and check it for ENV_EXTENDS_BASENAME.  continue
+        # checking until ENV_EXTENDS_BASENAME is not found
+        extended_configs = []
+        extends = []
+
+        _data = data
+        while True:
+            extended_configs.insert(0, _data)
+
+            extends_env = _data.get(ENV_EXTENDS_BASENAME)
+            if not extends_env:
+                break
+
+            config_names = [self.workflow.config_name] + [
+                self.get_config_name(x) for x in extends
+            ]
+            if self.get_config_name(extends_env) in config_names:
+                chain = config_names + [self.get_config_name(extends_env)]
+
+                raise errors.CircularReference(
+                    f"circular {ENV_EXTENDS_BASENAME}: {' -> '.join(chain)}"
+                )
+
+            self.logger.info(f"extending current env with {extends_env}")
+            _data = self.load_extends(extends_env)
+
+            extends.append(extends_env)
+
+        if extends != (cached_extends or []):
+            self.extends_cache.set(extends_cache_key, extends)
+
+        # apply the extended configs top-down such that the original data overwrites
+        # any upstream configuration
+        values = {}
+        for extended_config in extended_configs:
+            values.update(extended_config)
+
+        # set defaults when no value is set
+        for k, v in self.cf_env.items():
+            if k not in values:
+                values[k] = v
+
+        return ResolvedEnvironment(values, tuple(extends))
+
+    def ls(self) -> None:
+        """
+        Lists the environments in the backend
+
+        With --with-content, all the environments are read in bulk and printed
+        """
+        names = sorted(self.backend.ls())
+
+        if not self.workflow.args.with_content:
+            for name in names:
+                print(name)
+
+            return
+
+        contents = self.backend.read_many(names)
+        for name in names:
+            print(f"# {name}")
+            print(contents[name].rstrip())
+            print("")
+
     def rm(self) -> None:
         """
         Removes an environment from the backend
@@ -446,8 +645,9 @@ class Env(BaseSubcommand):
         """
         self.data.update(self.cf_env)
 
-    @property
-    @lru_cache()
+        self._resolved = None
+
+    @cached_property
     def version(self):
         """
         Returns a version string for the current version of code
@@ -12,6 +12,8 @@ from compose_flow import errors
 class PassthroughBaseSubcommand(BaseSubcommand):
     command_name = None
 
+    interactive = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -16,18 +16,20 @@ compose-flow -e dev service exec web /bin/bash
 """
 import argparse
 import logging
-import os
 import re
 import time
 
 from compose_flow.kube.mixins import KubeMixIn
 from .base import BaseSubcommand
 from compose_flow import errors, shell
+from compose_flow.context import get_context
 
 
 class Pod(BaseSubcommand, KubeMixIn):
     command_name = "pod"
 
+    interactive = True
+
     setup_environment = True
 
     setup_profile = False
@@ -111,7 +113,7 @@ class Pod(BaseSubcommand, KubeMixIn):
 
         logging.debug(f"command={command}")
 
-        return shell.execute(command, os.environ, _fg=True)
+        return shell.execute(command, get_context(self.workflow).environ, _fg=True)
 
     def select_pod(self):
         args = self.workflow.args
@@ -2,18 +2,33 @@
 Profile subcommand
 """
 import copy
+import datetime
+import functools
 import logging
+import os
 import tempfile
 
-from functools import lru_cache
 from typing import Callable, List
 
+from tabulate import tabulate
+
 from .base import BaseSubcommand
 
-from compose_flow.compose import merge_profile
+from compose_flow import settings
+from compose_flow.cache import DiskCache, file_digest
+from compose_flow.compose import get_overlay_filenames, merge_profile
 from compose_flow.config import get_config
+from compose_flow.context import get_context
 from compose_flow.errors import EnvError, NoSuchProfile, ProfileError
-from compose_flow.utils import get_kv, render, yaml_dump, yaml_load
+from compose_flow.utils import (
+    cached_method,
+    cached_property,
+    get_kv,
+    get_package_version,
+    render,
+    yaml_dump,
+    yaml_load,
+)
 
 COPY_ENV_VAR = "CF_COPY_ENV_FROM"
 
@@ -30,6 +45,9 @@ def listify_kv(d: dict) -> list:
 class Profile(BaseSubcommand):
     """
     Subcommand for managing profiles
+
+    Compiled profiles are cached on disk; the `cache` action lists the cached
+    entries and `cache --clear` removes them.
     """
 
     update_version_env_vars = True
@@ -52,6 +70,57 @@ class Profile(BaseSubcommand):
     @classmethod
     def fill_subparser(cls, parser, subparser):
         subparser.add_argument("action")
+        subparser.add_argument(
+            "--clear",
+            action="store_true",
+            help="with the cache action, remove all cached profiles",
+        )
+
+    @property
+    def setup_profile(self):
+        # inspecting the cache does not need a compiled profile
+        return getattr(self.workflow.args, "action", None) != "cache"
+
+    @cached_property
+    def compile_cache(self) -> DiskCache:
+        return DiskCache(
+            os.path.join(settings.CACHE_ROOT, "profiles"),
+            max_bytes=settings.PROFILE_CACHE_MAX_BYTES,
+        )
+
+    def action_cache(self):
+        """
+        Lists the compiled profile cache entries or removes them with --clear
+        """
+        cache = self.compile_cache
+
+        if self.workflow.args.clear:
+            count = cache.clear()
+
+            print(f"removed {count} cached profiles from {cache.root}")
+
+            return
+
+        entries = cache.entries()
+
+        rows = []
+        for entry in reversed(entries):
+            last_used = datetime.datetime.fromtimestamp(entry.last_used)
+
+            rows.append(
+                {
+                    "key": entry.key,
+                    "size": entry.size,
+                    "last used": last_used.isoformat(sep=" ", timespec="seconds"),
+                }
+            )
+
+        print(tabulate(rows, headers="keys"))
+
+        total = sum(x.size for x in entries)
+        print(
+            f"\n{len(entries)} entries, {total} of {cache.max_bytes} bytes in {cache.root}"
+        )
 
     @property
     def data(self):
@@ -283,6 +352,16 @@ class Profile(BaseSubcommand):
         if self._compiled_profile:
             return self._compiled_profile
 
+        cache_key = self.get_compile_cache_key(profile)
+        if cache_key:
+            content = self.compile_cache.get(cache_key)
+            if content is not None:
+                self.logger.debug(f"using cached profile {cache_key}")
+
+                self._compiled_profile = content
+
+                return content
+
         content = merge_profile(profile)
 
         # perform transformations on the compiled profile
@@ -339,6 +418,9 @@ class Profile(BaseSubcommand):
 
             content = yaml_dump(data)
 
+        if cache_key:
+            self.compile_cache.set(cache_key, content)
+
         self._compiled_profile = content
 
         return content
@@ -389,7 +471,7 @@ class Profile(BaseSubcommand):
         return data
 
     @classmethod
-    @lru_cache()
+    @functools.lru_cache()
     def get_all_checks(cls) -> List[str]:
         """
         Returns a list of all the method names that are checks in this class
@@ -405,6 +487,35 @@ class Profile(BaseSubcommand):
 
         return checks
 
+    def get_compile_cache_key(self, profile: dict) -> [str, None]:
+        """
+        Returns the compiled profile cache key for the given profile
+
+        The key is made from the content of the overlay files, the profile, the
+        config name and the compose-flow version.  None is returned when the cache
+        is disabled or the compose-flow version cannot be determined, e.g. when
+        running from a source checkout.
+        """
+        if not settings.PROFILE_CACHE_MAX_BYTES:
+            return None
+
+        # import here to prevent a circular import
+        from compose_flow.commands.workflow import PACKAGE_NAME
+
+        try:
+            version = get_package_version(PACKAGE_NAME)
+        except Exception:
+            return None
+
+        context = get_context(self.workflow)
+
+        digests = [
+            (filename, file_digest(context.path(filename)))
+            for filename in get_overlay_filenames(profile)
+        ]
+
+        return DiskCache.make_key(digests, profile, self.workflow.config_name, version)
+
     def get_profile_compose_file(self, profile: dict):
         """
         Processes the profile to generate the compose file
@@ -491,10 +602,10 @@ class Profile(BaseSubcommand):
         if changed:
             service_data.setdefault("deploy", {})["resources"] = resources
 
-    @lru_cache()
+    @cached_method
     def write(self) -> None:
         """
         Writes the loaded compose file to disk
         """
-        with open(self.filename, "w") as fh:
+        with open(get_context(self.workflow).path(self.filename), "w") as fh:
             fh.write(yaml_dump(self.data))
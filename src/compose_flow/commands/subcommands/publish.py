@@ -13,6 +13,9 @@ class Publish(BaseBuildSubcommand):
     Subcommand for building and pushing Docker images
     """
 
+    # docker push shows its progress on the terminal
+    interactive = True
+
     @classmethod
     def fill_subparser(cls, parser, subparser):
         subparser.epilog = __doc__
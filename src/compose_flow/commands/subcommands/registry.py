@@ -0,0 +1,29 @@
+"""
+Static registry of subcommands
+
+GENERATED FILE: do not edit by hand, run `scripts/generate_subcommand_registry.py`
+
+Maps the subcommand name to a tuple of (module name, class name, aliases)
+"""
+
+SUBCOMMANDS = {
+    "build": ("build", "Build", []),
+    "compose": ("compose", "Compose", []),
+    "deploy": ("deploy", "Deploy", []),
+    "docker": ("docker", "Docker", []),
+    "env": ("env", "Env", []),
+    "helm": ("helm", "Helm", []),
+    "help": ("help", "Help", []),
+    "kompose": ("kompose", "Kompose", []),
+    "kubectl": ("kubectl", "Kubectl", []),
+    "pod": ("pod", "Pod", []),
+    "profile": ("profile", "Profile", []),
+    "publish": ("publish", "Publish", []),
+    "rancher": ("rancher", "Rancher", []),
+    "remote": ("remote", "Remote", []),
+    "remoteconfig": ("remote_config", "RemoteConfig", []),
+    "service": ("service", "Service", []),
+    "swarm": ("swarm", "Swarm", []),
+    "task": ("task", "Task", []),
+    "workflowconfig": ("workflow_config", "WorkflowConfig", []),
+}
@@ -7,7 +7,8 @@ import sys
 
 from .base import BaseSubcommand
 
-from compose_flow import errors, shell
+from compose_flow import errors, shell, tunnel
+from compose_flow.context import get_context
 from compose_flow.errors import EnvError, ErrorMessage
 from compose_flow import settings
 
@@ -24,9 +25,15 @@ class Remote(BaseSubcommand):
         self._host = kwargs.pop("host", None)
         self.name = kwargs.pop("name", None)
 
+        self._tunnel = None
+
         super().__init__(*args, **kwargs)
 
     def close(self, pids=None, do_print=True):
+        if self.tunnel:
+            self.tunnel.close()
+
+        # tunnels opened by older versions are plain ssh processes
         try:
             pids = pids or list(self.get_remote_ssh_pids())
         except EnvError:
@@ -70,7 +77,7 @@ class Remote(BaseSubcommand):
         subparser.add_argument("--host")
 
     def get_remote_host(self):
-        return self.docker_host or os.environ.get("DOCKER_HOST")
+        return self.docker_host or get_context(self.workflow).environ.get("DOCKER_HOST")
 
     def get_remote_ssh_pids(self):
         socket = self.get_socket()
@@ -78,7 +85,9 @@ class Remote(BaseSubcommand):
 
         try:
             # very low-level command that does not need workflow environment
-            proc = self.execute(f'pgrep -f "{pgrep_search}"', _env=os.environ)
+            proc = self.execute(
+                f'pgrep -f "{pgrep_search}"', _env=get_context(self.workflow).environ
+            )
         except shell.ErrorReturnCode_1:
             pass
         else:
@@ -141,39 +150,18 @@ class Remote(BaseSubcommand):
         return True
 
     def make_connection(self, use_existing=False):
-        try:
-            pids = list(self.get_remote_ssh_pids())
-        except (EnvError, ErrorMessage):
-            pids = []
-
-        try:
-            remote_host = self.get_remote_host()
-        except EnvError:
-            remote_host = None
-
-        try:
-            if self.status(docker_host=self.docker_host, do_print=False):
-                raise errors.AlreadyConnected(f"already connected to {remote_host}")
-        except EnvError:
-            pass
-
-        if pids:
-            self.close(do_print=False)
-
         host = self.host
         if not host:
-            raise errors.RemoteUndefined("Error: Remote host not given")
-
-        socket_path = self.socket_path
-
-        self.remove_socket()
+            # DOCKER_HOST may still point at a working tunnel
+            if self.status(do_print=False):
+                raise errors.AlreadyConnected(
+                    f"already connected to {self.get_remote_host()}"
+                )
 
-        self.close(do_print=False)
+            raise errors.RemoteUndefined("Error: Remote host not given")
 
-        # very low-level command that does not need workflow environment
-        self.execute(
-            f"ssh -Nf -L {socket_path}:/var/run/docker.sock {host}", _env=os.environ
-        )
+        if not self.tunnel.connect():
+            raise errors.AlreadyConnected(f"already connected to {self.docker_host}")
 
     def print_eval_hint(self):
         print(
@@ -193,29 +181,23 @@ class Remote(BaseSubcommand):
             return f"/tmp/compose-flow-{host}.sock"
 
     def status(self, docker_host=None, do_print=True):
-        pids = []
         status = False
 
         docker_host = docker_host or self.get_remote_host()
-        try:
-            pids = list(self.get_remote_ssh_pids())
-        except ErrorMessage:
-            pass
 
-        # we are connected if we get PIDs back
-        connected = len(pids) > 0
+        matches = UNIX_REMOTE_HOST_RE.match(docker_host or "")
+        connected = bool(matches) and tunnel.ping(matches.group("socket"))
 
         if docker_host and connected:
             status = True
 
-            message = f"connected to docker_host {docker_host}, ssh pid {pids}"
+            message = f"connected to docker_host {docker_host}"
+
+            latencies = self.tunnel.get_latencies() if self.tunnel else []
+            if latencies:
+                message = f"{message}, {tunnel.format_latencies(latencies)}"
         elif docker_host:
-            message = f"environment set to {docker_host}, but no ssh connection found"
-        elif pids:
-            pids_s = ", ".join([f"{x}" for x in pids])
-            message = (
-                f"ssh connection found at pids {pids_s}, but environment not setup"
-            )
+            message = f"environment set to {docker_host}, but docker does not respond"
         else:
             message = "Not connected"
 
@@ -224,6 +206,22 @@ class Remote(BaseSubcommand):
 
         return status
 
+    @property
+    def tunnel(self):
+        """
+        Returns the ssh tunnel to the remote host or None when no host is configured
+        """
+        if self._tunnel is None and self.host:
+            self._tunnel = tunnel.get_tunnel(
+                self.host,
+                self.socket_path,
+                execute=lambda command: self.execute(
+                    command, _env=get_context(self.workflow).environ
+                ),
+            )
+
+        return self._tunnel
+
     @property
     def username(self):
         """
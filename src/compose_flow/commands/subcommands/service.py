@@ -30,16 +30,22 @@ compose-flow -e dev service exec app /bin/bash
 ```
 """
 import argparse
-import functools
 import logging
-import os
 import random
 import shlex
 import sys
 import time
 
+from typing import List
+
 from .base import BaseSubcommand
-from compose_flow import errors, shell
+from compose_flow import docker, errors, shell
+from compose_flow.context import get_context
+from compose_flow.utils import cached_method, get_backoff_delays
+
+
+def format_task(task: dict) -> str:
+    return f"{task['Name']}.{task['ID']} on {task['Node']}, {task['CurrentState']}"
 
 
 class Service(BaseSubcommand):
@@ -56,7 +62,10 @@ class Service(BaseSubcommand):
             "--user", "-u", help="the user to become int he container"
         )
         subparser.add_argument(
-            "--retries", type=int, default=30, help="number of times to retry"
+            "--retries",
+            type=int,
+            default=30,
+            help="number of times to look for a running container, backing off in between",
         )
         subparser.add_argument(
             "--ssh", action="store_true", help="ssh to the machine, not the container"
@@ -84,21 +93,17 @@ class Service(BaseSubcommand):
         subparser.add_argument("action", help="The action to run")
         subparser.add_argument("service", nargs="?", help="The desired service")
 
-    def action_exec(self):
-        args = self.workflow.args
-
-        result = None
-        for i in range(args.retries):
-            try:
-                result = self.run_service()
-            except errors.NoContainer:
-                time.sleep(1.0)
-            else:
-                break
+    def is_interactive(self) -> bool:
+        return self.workflow.args.action == "exec"
 
-        if not result:
+    def action_exec(self):
+        try:
+            self.wait_for_containers()
+        except errors.NoContainer:
             sys.exit(f"No container found for service={self.service_name}")
 
+        self.run_service()
+
     def action_list(self):
         """
         Lists the stack
@@ -111,39 +116,36 @@ class Service(BaseSubcommand):
             print("ALL CONTAINERS:\n")
 
             for idx, item in enumerate(self.list_containers()):
-                print("\t{}: {}".format(idx, item))
+                print("\t{}: {}".format(idx, format_task(item)))
 
-            print(f"\nSELECTED:\n\t{self.select_container()}")
+            print(f"\nSELECTED:\n\t{format_task(self.select_container())}")
         else:
             # print(f'list services for env {self.project_name}\n')
             print(self.list_services())
 
-    @functools.lru_cache()
-    def list_containers(self, service_name: str = None):
-        service_name = service_name or self.service_name
-
-        command = f"docker service ps --no-trunc --filter desired-state=running {service_name}"
-
-        proc = self.execute(command)
+    @cached_method
+    def list_containers(self, service_name: str = None) -> List[dict]:
+        """
+        Returns the running tasks of the service, as listed by `docker service ps`
 
-        # note; because this is being cached, create a list
-        # instead of a generator becuase a generator can only
-        # be iterated once
-        items = []
+        Raises:
+            NoContainer when none of the service's tasks is running
+        """
+        service_name = service_name or self.service_name
 
         try:
-            output = proc.splitlines()[1:]
-
-            # check to see there's at least one container listed
-            output[0]
-        except IndexError:
+            tasks = docker.get_tasks(service_name)
+        except errors.NoSuchService:
             raise errors.NoContainer()
-        else:
-            for item in output:
-                if f"{service_name}." not in item:
-                    continue
 
-                items.append(item)
+        # the service name also matches services it is a prefix of
+        items = [
+            x
+            for x in tasks
+            if x["Name"].startswith(f"{service_name}.") and docker.is_running(x)
+        ]
+        if not items:
+            raise errors.NoContainer()
 
         return items
 
@@ -157,16 +159,9 @@ class Service(BaseSubcommand):
 
     def run_service(self):
         args = self.workflow.args
-        line = self.select_container()
+        task = self.select_container()
 
-        container_info = line.strip()
-        container_info_split = container_info.split()
-
-        container_hash = container_info_split[0]
-        container_prefix = container_info_split[1]
-        container_host = container_info_split[3]
-
-        # print(container_info)
+        container_host = task["Node"]
 
         if container_host.startswith("ip-"):
             container_host = container_host.replace("ip-", "").replace("-", ".")
@@ -179,7 +174,7 @@ class Service(BaseSubcommand):
 
         command = f"ssh -t {host_info}"
         docker_command = (
-            f"docker exec -t -i {docker_user}{container_prefix}.{container_hash}"
+            f"docker exec -t -i {docker_user}{task['Name']}.{task['ID']}"
             f' {" ".join(self.workflow.args_remainder)}'
         )
 
@@ -193,7 +188,7 @@ class Service(BaseSubcommand):
 
         logging.debug(f"command={command}")
 
-        return shell.execute(command, os.environ, _fg=True)
+        return shell.execute(command, get_context(self.workflow).environ, _fg=True)
 
     def select_container(self):
         args = self.workflow.args
@@ -204,6 +199,33 @@ class Service(BaseSubcommand):
         else:
             return containers[args.container]
 
+    def wait_for_containers(self) -> List[dict]:
+        """
+        Returns the running tasks of the service, waiting for one to run
+
+        The service is listed up to `--retries` times, backing off exponentially
+        with jitter in between, so that a task that is being scheduled is found
+        soon after it starts without listing the service over and over.
+
+        Raises:
+            NoContainer when no task is running after the last attempt
+        """
+        delays = get_backoff_delays(self.workflow.args.retries)
+
+        while True:
+            try:
+                return self.list_containers()
+            except errors.NoContainer:
+                delay = next(delays, None)
+                if delay is None:
+                    raise
+
+                self.logger.debug(
+                    f"no running container for {self.service_name}, retrying in {delay:.2f}s"
+                )
+
+                time.sleep(delay)
+
     @property
     def service_name(self):
         args = self.workflow.args
@@ -8,9 +8,16 @@ The `inspect` action will list all the services running on the swarm
 ```
 compose-flow -e dev swarm inspect
 ```
+
+All the services are inspected with a single docker call; the time taken by
+each phase is logged.  When the bulk call fails, services are inspected one by
+one with `CF_DOCKER_INSPECT_WORKERS` threads.
 """
 import argparse
-import collections
+import collections.abc
+import time
+
+from contextlib import contextmanager
 
 from compose_flow import docker
 from tabulate import tabulate
@@ -25,7 +32,7 @@ def flatten(d, parent_key="", sep="_"):
     for k, v in d.items():
         new_key = parent_key + sep + k if parent_key else k
 
-        if isinstance(v, collections.MutableMapping):
+        if isinstance(v, collections.abc.MutableMapping):
             items.extend(flatten(v, new_key, sep=sep).items())
         else:
             items.append((new_key, v))
@@ -33,6 +40,37 @@ def flatten(d, parent_key="", sep="_"):
     return dict(items)
 
 
+def get_service_info(service_config: dict) -> dict:
+    """
+    Returns the status checks for a service from `docker service inspect`
+    """
+    spec = service_config["Spec"]
+    task_template = spec["TaskTemplate"]
+
+    service_status = {}
+
+    service_info = {"service": {"name": spec["Name"]}, "status": service_status}
+
+    # check placement constraints.  if the mode is global, the service should run on every available machine
+    mode = spec["Mode"]
+    if "Global" in mode:
+        service_status["has_node_constraint"] = "Global"
+    else:
+        placement_constraints = task_template["Placement"].get("Constraints", [])
+
+        service_status["has_node_constraint"] = any(
+            [x.startswith("node.role") for x in placement_constraints]
+        )
+
+    # check resources
+    resources = task_template["Resources"]
+
+    service_status["has_limits"] = "Limits" in resources
+    service_status["has_reservations"] = "Reservations" in resources
+
+    return service_info
+
+
 class Swarm(BaseSubcommand):
     setup_profile = False
 
@@ -43,43 +81,29 @@ class Swarm(BaseSubcommand):
 
         subparser.add_argument("action", help="The action to run")
 
-    def action_inspect(self):
-        # for node in docker.get_nodes():
-        #     print(node)
-
-        service_status_l = []
-
-        for service in docker.get_services():
-            service_name = service["Name"]
-            service_status = {}
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Logs the time taken by the phase
+        """
+        start = time.perf_counter()
 
-            service_info = {"service": {"name": service_name}, "status": service_status}
+        yield
 
-            service_config = docker.get_service_config(service_name)
+        self.logger.info(f"{name}: {time.perf_counter() - start:.2f}s")
 
-            spec = service_config[0]["Spec"]
-            task_template = spec["TaskTemplate"]
-
-            # check placement constraints.  if the mode is global, the service should run on every available machine
-            mode = spec["Mode"]
-            if "Global" in mode:
-                service_status["has_node_constraint"] = "Global"
-            else:
-                placement_constraints = task_template["Placement"].get(
-                    "Constraints", []
-                )
-
-                service_status["has_node_constraint"] = any(
-                    [x.startswith("node.role") for x in placement_constraints]
-                )
+    def action_inspect(self):
+        # for node in docker.get_nodes():
+        #     print(node)
 
-            # check resources
-            resources = task_template["Resources"]
+        with self.phase("list services"):
+            service_names = [x["Name"] for x in docker.get_services()]
 
-            service_status["has_limits"] = "Limits" in resources
-            service_status["has_reservations"] = "Reservations" in resources
+        with self.phase("inspect services"):
+            service_configs = docker.get_service_configs(service_names)
 
-            service_status_l.append(service_info)
+        with self.phase("check services"):
+            service_status_l = [get_service_info(x) for x in service_configs]
 
         flat_l = [flatten(x) for x in service_status_l]
 
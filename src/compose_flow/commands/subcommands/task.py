@@ -1,7 +1,6 @@
 """
 Task subcommand
 """
-from functools import lru_cache
 import logging
 import shlex
 
@@ -9,6 +8,7 @@ from .base import BaseSubcommand
 
 from compose_flow.config import get_config
 from compose_flow.errors import CommandError
+from compose_flow.utils import cached_property
 
 
 ALLOWED_COMMANDS = ["compose-flow", "rancher"]
@@ -29,8 +29,7 @@ class Task(BaseSubcommand):
     def task_name(self):
         return self.workflow.args.name
 
-    @property
-    @lru_cache()
+    @cached_property
     def task_config(self):
         config = get_config(self.workflow)
         try:
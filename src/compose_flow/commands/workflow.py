@@ -11,20 +11,20 @@ import argparse
 import logging.config
 import os
 import pathlib
-import pkg_resources  # part of setuptools
 import sys
 
-from functools import lru_cache
-
-from .subcommands import find_subcommands, set_default_subparser
-from .subcommands.env import Env
-from .subcommands.profile import Profile
-from .subcommands.remote import Remote
+from .subcommands import (
+    get_subcommand_names,
+    load_subcommand,
+    resolve_subcommand_name,
+    set_default_subparser,
+)
 
-from .. import errors, settings
+from .. import errors, fanout, settings, timings
 from ..config import DC_CONFIG_ROOT, DEFAULT_DC_CONFIG_FILE
 from ..errors import CommandError, ErrorMessage
-from ..utils import get_repo_name, yaml_load
+from ..context import WorkflowContext, activate
+from ..utils import cached_property, get_package_version, get_repo_name, yaml_load_file
 
 PACKAGE_NAME = __name__.split(".", 1)[0].replace("_", "-")
 PROJECT_NAME = get_repo_name()
@@ -36,22 +36,43 @@ CF_REMOTES_CONFIG_PATH = os.path.expanduser(
 
 
 class Workflow(object):
-    def __init__(self, argv=None):
+    """
+    Runs a compose-flow command
+
+    Args:
+        argv: the command line arguments, `sys.argv` by default
+        context: the working directory and environment to run the command in;
+            by default the process working directory and a copy of `os.environ`
+    """
+
+    def __init__(self, argv=None, context: WorkflowContext = None):
         self.argv = argv if argv is not None else sys.argv[1:]
 
-        self.parser = self.get_argument_parser()
+        self.context = context or WorkflowContext(
+            cwd=os.getcwd(), environ=dict(os.environ)
+        )
+
+        # only the selected subcommand is imported and has its arguments setup
+        self.parser = self.get_argument_parser(
+            subcommand_name=self.get_subcommand_name()
+        )
         self.args, self.args_remainder = self.parser.parse_known_args(self.argv)
 
         self.config_basename = None
         self.config_name = None
 
+        # the directory compose-flow was run in, usually the root of the project
+        self.project_dir = self.context.cwd or os.getcwd()
+
         self._set_arg_defaults()
 
         # the subcommand that is being run; defined in run() below
-        self.subcommand = None
+        self._subcommand = None
 
-        if os.path.exists(DC_CONFIG_ROOT):
-            os.chdir(DC_CONFIG_ROOT)
+        # paths in the project config are relative to the directory it is in
+        config_root = self.context.path(DC_CONFIG_ROOT)
+        if os.path.exists(config_root):
+            self.context.cwd = os.path.abspath(config_root)
 
     @property
     def app_config(self) -> dict:
@@ -62,20 +83,20 @@ class Workflow(object):
 
         config_path = self.app_config_path
         if os.path.exists(config_path):
-            with open(config_path, "r") as fh:
-                app_config = yaml_load(fh)
+            app_config = yaml_load_file(config_path)
 
         return app_config
 
-    @property
-    @lru_cache()
+    @cached_property
     def app_config_path(self):
-        return os.environ.get("CF_REMOTES_CONFIG_PATH", CF_REMOTES_CONFIG_PATH)
+        return self.context.environ.get(
+            "CF_REMOTES_CONFIG_PATH", CF_REMOTES_CONFIG_PATH
+        )
 
     def _check_version_option(self):
         version_arg = self.args.version
         if version_arg:
-            version = pkg_resources.require(PACKAGE_NAME)[0].version
+            version = get_package_version(PACKAGE_NAME)
 
             print(f"{version}")
 
@@ -88,12 +109,13 @@ class Workflow(object):
 
         return docker_image_prefix
 
-    @property
-    @lru_cache()
+    @cached_property
     def environment(self):
         """
         Returns an Env instance
         """
+        from .subcommands.env import Env
+
         environment = Env(self)
 
         if self.subcommand.rw_env:
@@ -101,18 +123,38 @@ class Workflow(object):
 
         return environment
 
-    @property
-    @lru_cache()
+    @cached_property
     def environment_name(self):
         return self.args.environment
 
-    def get_argument_parser(self, doc: str = None):
+    def get_argument_parser(self, doc: str = None, subcommand_name: str = None):
+        """
+        Returns the argument parser
+
+        Every registered subcommand gets a subparser, but only the subparser for
+        `subcommand_name` is filled in; the others are placeholders so that the
+        subcommand modules are not imported unless they are selected.
+
+        Args:
+            doc: the epilog for the parser, defaults to this module's docstring
+            subcommand_name: the name of the subcommand that was selected
+        """
         argparse.ArgumentParser.set_default_subparser = set_default_subparser
 
+        parser = self._get_argument_parser(doc=doc, subcommand_name=subcommand_name)
+
+        parser.set_default_subparser("help")
+
+        return parser
+
+    def _get_argument_parser(self, doc: str = None, subcommand_name: str = None):
         doc = doc or __doc__
 
+        # the program is named explicitly, the daemon runs commands for the client
         parser = argparse.ArgumentParser(
-            epilog=doc, formatter_class=argparse.RawDescriptionHelpFormatter
+            prog=PACKAGE_NAME,
+            epilog=doc,
+            formatter_class=argparse.RawDescriptionHelpFormatter,
         )
 
         # defaults for these args are set in _set_arg_defaults() below
@@ -126,7 +168,11 @@ class Workflow(object):
             "--config-remote",
             help="the remote to use to retrieve the requested configuration",
         )
-        parser.add_argument("-e", "--environment")
+        parser.add_argument(
+            "-e",
+            "--environment",
+            help="the environment; several comma separated names or patterns, e.g. dev,prod-*, run the command in each",
+        )
         parser.add_argument(
             "-f",
             "--compose-flow-filename",
@@ -155,7 +201,18 @@ class Workflow(object):
             action="store_true",
             help="allow dirty working copy for this command",
         )
+        parser.add_argument(
+            "--fanout-workers",
+            type=int,
+            default=settings.FANOUT_WORKERS,
+            help="the number of environments to run in at the same time when given several",
+        )
         parser.add_argument("-l", "--loglevel", default="INFO")
+        parser.add_argument(
+            "--timings",
+            action="store_true",
+            help="print the time spent running commands at the end of the run",
+        )
         parser.add_argument(
             "--noop",
             "--dry-run",
@@ -169,21 +226,38 @@ class Workflow(object):
 
         self.subparsers = parser.add_subparsers(dest="command")
 
-        for subcommand in find_subcommands():
-            subcommand.setup_subparser(parser, self.subparsers)
-
-        parser.set_default_subparser("help")
+        for name, aliases in get_subcommand_names().items():
+            if name == subcommand_name:
+                load_subcommand(name).setup_subparser(parser, self.subparsers)
+            else:
+                self.subparsers.add_parser(name, aliases=aliases, add_help=False)
 
         return parser
 
-    @property
-    @lru_cache()
+    def get_subcommand_name(self) -> [str, None]:
+        """
+        Returns the name of the subcommand given on the command line
+
+        The command line is parsed with placeholder subparsers, which accept
+        any arguments, in order to find the subcommand without importing it.
+        """
+        args, _ = self._get_argument_parser().parse_known_args(self.argv)
+
+        if args.command is None:
+            return None
+
+        return resolve_subcommand_name(args.command)
+
+    @cached_property
     def profile(self):
+        from .subcommands.profile import Profile
+
         return Profile(self)
 
-    @property
-    @lru_cache()
+    @cached_property
     def remote(self):
+        from .subcommands.remote import Remote
+
         return Remote(self)
 
     def run(self):
@@ -195,17 +269,33 @@ class Workflow(object):
         if self._check_version_option():
             return
 
+        with activate(self.context):
+            # only this run's commands are summarized
+            timings.clear()
+
+            return self._run()
+
+    def _run(self):
         try:
-            self._setup_environment()
+            if fanout.is_fanout(self.args.environment):
+                with timings.phase("fanout"):
+                    return self._run_fanout()
+
+            with timings.phase("environment"):
+                self._setup_environment()
 
-            self._setup_remote()
+            with timings.phase("remote"):
+                self._setup_remote()
 
-            self._setup_profile()
+            with timings.phase("profile"):
+                self._setup_profile()
 
             # execute the subcommand
-            message = self.subcommand.handle()
+            with timings.phase(self.args.command):
+                message = self.subcommand.handle()
 
-            self._write_environment()
+            with timings.phase("write-environment"):
+                self._write_environment()
         except CommandError as exc:
             self.parser.print_help()
 
@@ -214,6 +304,25 @@ class Workflow(object):
             return f"\n{exc}"
         else:
             return message
+        finally:
+            if self.args.timings:
+                timings.print_summary()
+
+    def _run_fanout(self):
+        """
+        Runs the command in each of the environments given with `-e`
+        """
+        remotes = self.app_config.get("remotes") or {}
+
+        environments = fanout.get_environments(self.args.environment, remotes)
+
+        fanout.run(
+            self.argv,
+            environments,
+            command=self.args.command,
+            cwd=self.project_dir,
+            workers=self.args.fanout_workers,
+        )
 
     def _set_arg_defaults(self):
         """
@@ -223,7 +332,12 @@ class Workflow(object):
         """
         self.project_name = self.args.project_name
         if self.project_name is None:
-            self.project_name = PROJECT_NAME
+            # the project is named after the directory compose-flow was run in,
+            # which is not the process' when run by the daemon
+            if self.project_dir == os.getcwd():
+                self.project_name = PROJECT_NAME
+            else:
+                self.project_name = get_repo_name(self.project_dir)
 
         # when no profile or remote is given, they take on the same as the environment name
         if self.args.profile is None:
@@ -300,16 +414,17 @@ class Workflow(object):
 
         docker_host = self.remote.docker_host
         if docker_host:
-            # one of the very few exceptions of updating the os environment directly
             # the docker host is low level in that it's not possible to run docker
             # commands on remote hosts if this is not set before those commands are
-            # attempted.
-            os.environ.update({"DOCKER_HOST": docker_host})
+            # attempted; commands get it from the context, see `shell.execute`
+            self.context.environ["DOCKER_HOST"] = docker_host
 
     @property
-    @lru_cache()
     def subcommand(self):
-        return self.args.subcommand_cls(self)
+        if self._subcommand is None:
+            self._subcommand = self.args.subcommand_cls(self)
+
+        return self._subcommand
 
     @subcommand.setter
     def subcommand(self, value):
@@ -318,7 +433,7 @@ class Workflow(object):
         """
         assert value == None
 
-        self.__class__.subcommand.fget.cache_clear()  # pylint: disable=E1101
+        self._subcommand = None
 
     def _write_environment(self):
         """
@@ -1,12 +1,15 @@
 import logging
 import os
 
-from .utils import remerge, yaml_dump, yaml_load
+from .context import get_context
+from .utils import remerge, yaml_dump, yaml_load_file
 
 
 def get_overlay_filenames(overlay):
     logger = logging.getLogger("get_overlay_filenames")
 
+    context = get_context()
+
     overlay_filenames = []
 
     applied = []
@@ -29,7 +32,7 @@ def get_overlay_filenames(overlay):
         else:
             _filename = name
 
-        if _filename and os.path.exists(_filename) and os.path.isfile(_filename):
+        if _filename and os.path.isfile(context.path(_filename)):
             overlay_filenames.append(_filename)
         else:
             # prefix partial with a dot in order to complete the name
@@ -44,7 +47,7 @@ def get_overlay_filenames(overlay):
 
             logging.debug("_filename={}".format(_filename))
 
-            if os.path.exists(_filename):
+            if os.path.exists(context.path(_filename)):
                 overlay_filenames.append(_filename)
             else:
                 logger.warning(f"filename={_filename} does not exist, skipping")
@@ -63,6 +66,8 @@ def merge_profile(profile: dict) -> str:
     Args:
         profile: the profile data to merge
     """
+    context = get_context()
+
     filenames = get_overlay_filenames(profile)
 
     # merge multiple files together so that deploying stacks works
@@ -71,14 +76,13 @@ def merge_profile(profile: dict) -> str:
         yaml_contents = []
 
         for item in filenames:
-            with open(item, "r") as fh:
-                yaml_contents.append(yaml_load(fh))
+            yaml_contents.append(yaml_load_file(context.path(item)))
 
         merged = remerge(yaml_contents)
         content = yaml_dump(merged)
     else:
         try:
-            with open(filenames[0], "r") as fh:
+            with open(context.path(filenames[0]), "r") as fh:
                 content = fh.read()
         except FileNotFoundError:
             content = ""
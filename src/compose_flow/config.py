@@ -3,9 +3,8 @@ import os
 import pathlib
 import typing
 
-from functools import lru_cache
-
-from compose_flow.utils import remerge, yaml_dump, yaml_load
+from compose_flow.context import get_context
+from compose_flow.utils import remerge, yaml_dump, yaml_load_file
 
 if typing.TYPE_CHECKING:
     from .commands.workflow import Workflow
@@ -34,10 +33,11 @@ def check_config(workflow: "Workflow", data: dict) -> dict:
     if not extends:
         return data
 
+    context = get_context(workflow)
+
     configs = []
     for item in extends:
-        with open(item) as fh:
-            configs.append(yaml_load(fh))
+        configs.append(yaml_load_file(context.path(item)))
 
     # append the config that was read in to the configs list
     configs.append(data)
@@ -70,7 +70,6 @@ def get_base_config_name(workflow: "Workflow") -> str:
     return base_config_name
 
 
-@lru_cache()
 def get_config(workflow: "Workflow") -> DictNone:
     """Returns the compose-flow project config file
 
@@ -81,12 +80,16 @@ def get_config(workflow: "Workflow") -> DictNone:
 
     When `-f` is provided on the command line, that file is the only file searched,
     and an exception will be raised when it is not found.
+
+    The config is read once per workflow context.
     """
-    data = read_project_config(workflow) or {}
 
-    data = check_config(workflow, data)
+    def read():
+        data = read_project_config(workflow) or {}
 
-    return data
+        return check_config(workflow, data)
+
+    return get_context(workflow).cached(("config", workflow), read)
 
 
 def read_project_config(workflow: "Workflow") -> dict:
@@ -105,20 +108,23 @@ def read_project_config(workflow: "Workflow") -> dict:
 
         paths = [config_name_config_file, project_name_config_file, DC_CONFIG_PATH]
 
+    context = get_context(workflow)
+
     for item in paths:
-        filename = os.path.basename(item)
+        filename = context.path(os.path.basename(item))
 
         logger.debug(f"looking for {filename}")
 
         if os.path.exists(filename):
-            with open(filename, "r") as fh:
-                data = yaml_load(fh)
+            data = yaml_load_file(filename)
 
-                break
+            break
     else:
-        logger.warning(f"compose-flow config not found; tried {paths} in {os.getcwd()}")
+        logger.warning(
+            f"compose-flow config not found; tried {paths} in {context.path('.')}"
+        )
 
-    outfile = f"compose-flow-{workflow.config_name}-config.yml"
+    outfile = context.path(f"compose-flow-{workflow.config_name}-config.yml")
     with open(outfile, "w") as fh:
         fh.write(yaml_dump(data))
 
@@ -0,0 +1,114 @@
+"""
+Per-workflow state
+
+A `WorkflowContext` holds what a run used to keep process-wide: the directory
+relative paths are resolved against, the environment variables commands run
+with, e.g. `DOCKER_HOST`, and the caches that are only valid for the run.
+Workflows each get their own context, so that several of them can run in the
+threads of one process without clobbering each other's working directory or
+`DOCKER_HOST`.
+
+Code that is given a workflow finds its context with `get_context(workflow)`.
+Code that is not, e.g. `shell.execute`, uses the context active in the thread,
+see `activate()`; threads started on behalf of a workflow run their work through
+`bind()` to carry it over.  Outside of a workflow, the process context applies:
+the process working directory and `os.environ`.
+"""
+import functools
+import os
+import threading
+
+from contextlib import contextmanager
+from typing import Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class WorkflowContext(object):
+    """
+    The working directory, environment and caches of a workflow
+    """
+
+    def __init__(self, cwd: str = None, environ: dict = None):
+        # None uses the process working directory
+        self.cwd = os.path.abspath(cwd) if cwd else None
+
+        # commands run with the DOCKER_HOST, KUBECONFIG, etc. set here, see `shell.execute`
+        self.environ = os.environ if environ is None else environ
+
+        self.cache = {}
+        self._lock = threading.Lock()
+
+        # the workflow phase, commands run and events counted, see `compose_flow.timings`
+        self.phase = None
+        self.timings = []
+        self.counts = {}
+
+    def cached(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        Returns the cached value for the key, calling `fn` for it when it is not cached
+        """
+        with self._lock:
+            if key in self.cache:
+                return self.cache[key]
+
+        value = fn()
+
+        with self._lock:
+            return self.cache.setdefault(key, value)
+
+    def path(self, path) -> str:
+        """
+        Returns the given path relative to the working directory
+        """
+        path = os.fspath(path)
+        if self.cwd is None:
+            return path
+
+        return os.path.join(self.cwd, path)
+
+
+_process_context = WorkflowContext()
+_local = threading.local()
+
+
+def get_context(workflow=None) -> WorkflowContext:
+    """
+    Returns the context of the given workflow or else the one active in this thread
+
+    Args:
+        workflow: the workflow; objects standing in for workflows that do not
+            carry a context get the active one
+    """
+    context = getattr(workflow, "context", None)
+    if isinstance(context, WorkflowContext):
+        return context
+
+    return getattr(_local, "context", None) or _process_context
+
+
+@contextmanager
+def activate(context: WorkflowContext):
+    """
+    Makes the context the active one in this thread within the block
+    """
+    previous = getattr(_local, "context", None)
+    _local.context = context
+    try:
+        yield context
+    finally:
+        _local.context = previous
+
+
+def bind(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Returns a function that runs `fn` in the context active where `bind()` was called
+    """
+    context = get_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with activate(context):
+            return fn(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,378 @@
+"""
+compose-flow daemon
+
+Runs the commands handed over by the `compose-flow` client, see
+`compose_flow.client`, in a long-running process.  compose-flow and its
+subcommands are only imported once, and what compose-flow keeps in memory stays
+warm from one command to the next:
+
+- config files are only parsed again when they change, see `utils.yaml_load_file`
+- connections to the docker API, see `docker_api.get_client`
+- the kube contexts, for `KUBE_CONTEXT_TTL`; kube listings are fetched again for
+  each command unless they were cached less than `KUBE_INVENTORY_TTL` seconds ago
+
+Each command runs in a `WorkflowContext` with the client's working directory and
+environment, and its output is streamed back to the client.  The daemon runs one
+command at a time.  Commands sent while it is busy, commands that need the
+terminal, see `BaseSubcommand.interactive`, and commands whose environment
+changes compose-flow's settings are handed back to the client to run itself.
+
+The daemon exits when compose-flow's code changes on disk, e.g. on upgrade, and
+after `settings.DAEMON_IDLE_TIMEOUT` seconds without a command.
+"""
+import io
+import json
+import logging
+import os
+import socketserver
+import sys
+import threading
+import time
+import traceback
+
+from contextlib import contextmanager
+from typing import Iterator
+
+from . import client, errors
+from .commands import Workflow
+from .commands.subcommands import get_subcommand_names, load_subcommand
+from .context import WorkflowContext
+from .kube import inventory
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# environment variables read when compose-flow is imported, e.g. into `settings`;
+# a command given other values than the daemon's is run by the client
+SETTINGS_PREFIXES = ("CF_",)
+SETTINGS_VARIABLES = (
+    "DC_CONFIG_FILE",
+    "HOME",
+    "KUBECONFIG",
+    "RANCHER_CONFIG_DIR",
+    "USER",
+)
+
+
+def get_logger():
+    return logging.getLogger(__name__)
+
+
+def get_code_signature() -> float:
+    """
+    Returns the latest modification time of compose-flow's code
+    """
+    latest = 0.0
+    for root, _, filenames in os.walk(PACKAGE_DIR):
+        for filename in filenames:
+            if filename.endswith(".py"):
+                latest = max(latest, os.stat(os.path.join(root, filename)).st_mtime)
+
+    return latest
+
+
+def get_settings_environ(environ: dict) -> dict:
+    """
+    Returns the variables of the environment that compose-flow's settings are read from
+    """
+    return {
+        key: value
+        for key, value in environ.items()
+        if key.startswith(SETTINGS_PREFIXES) or key in SETTINGS_VARIABLES
+    }
+
+
+def get_exit_code(response) -> int:
+    """
+    Returns the exit code for a workflow's response, like `sys.exit()` does
+    """
+    if response is None:
+        return 0
+
+    if isinstance(response, int):
+        return response
+
+    print(response, file=sys.stderr)
+
+    return 1
+
+
+class Fallback(Exception):
+    """
+    Raised when a command is to be run by the client
+    """
+
+
+class Connection(object):
+    """
+    Connection to a client
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def send(self, message: dict) -> None:
+        """
+        Sends the message to the client
+
+        A client that went away, e.g. on ctrl-c, no longer gets the output of its
+        command, which runs to completion nonetheless.
+        """
+        with self._lock:
+            if self.closed:
+                return
+
+            try:
+                client.send(self.sock, message)
+            except OSError:
+                self.closed = True
+
+
+class Output(object):
+    """
+    Stands in for `sys.stdout` or `sys.stderr`, writing to the client of the running command
+
+    Between commands, output goes to the daemon's own stream.
+    """
+
+    def __init__(self, name: str, stream):
+        self.name = name
+        self.stream = stream
+
+        self.connection = None
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    def flush(self) -> None:
+        if self.connection is None:
+            self.stream.flush()
+
+    def isatty(self) -> bool:
+        return self.connection is None and self.stream.isatty()
+
+    def write(self, data: str) -> int:
+        connection = self.connection
+        if connection is None:
+            return self.stream.write(data)
+
+        connection.send({self.name: data})
+
+        return len(data)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        connection = Connection(self.request)
+
+        request = json.loads(line.decode("utf8"))
+        if request.get("stop"):
+            connection.send({"exit": 0})
+
+            self.server.stop()
+
+            return
+
+        try:
+            exit_code = self.server.run_command(request, connection)
+        except Fallback as exc:
+            get_logger().debug(f"handing {request['argv']} back to the client: {exc}")
+
+            connection.send({"fallback": str(exc)})
+        else:
+            connection.send({"exit": exit_code})
+
+
+class Daemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Runs compose-flow commands sent to the unix socket
+
+    Args:
+        socket_path: the path of the socket to listen on
+        idle_timeout: seconds without a command after which the daemon exits;
+            `None` or 0 keeps it running
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, idle_timeout: float = None):
+        # only the user running the daemon may connect to it
+        umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, Handler)
+        finally:
+            os.umask(umask)
+
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+
+        self.code_signature = get_code_signature()
+        self.settings_environ = get_settings_environ(os.environ)
+
+        self.last_used = time.monotonic()
+        self.running = threading.Lock()
+
+        self.stdout = Output("out", sys.stdout)
+        self.stderr = Output("err", sys.stderr)
+
+        self._stopping = False
+
+    def get_fallback_reason(self, request: dict) -> [str, None]:
+        """
+        Returns why the client should run the command itself, None when the daemon can run it
+        """
+        if get_settings_environ(request["environ"]) != self.settings_environ:
+            return "the command's settings differ from the daemon's"
+
+        if get_code_signature() != self.code_signature:
+            self.stop()
+
+            return "compose-flow changed since the daemon started"
+
+        return None
+
+    def preload(self) -> None:
+        """
+        Imports every subcommand ahead of the first command
+        """
+        for name in get_subcommand_names():
+            load_subcommand(name)
+
+    @contextmanager
+    def redirect(self, connection: Connection) -> Iterator[None]:
+        """
+        Sends the output written within the block to the client; commands get no input
+        """
+        stdin = sys.stdin
+        sys.stdin = io.StringIO()
+
+        self.stdout.connection = self.stderr.connection = connection
+        try:
+            yield
+        finally:
+            self.stdout.connection = self.stderr.connection = None
+
+            sys.stdin = stdin
+
+    def run_command(self, request: dict, connection: Connection) -> int:
+        """
+        Runs the requested command, streaming its output to the client
+
+        Returns:
+            the exit code of the command
+
+        Raises:
+            Fallback when the client is to run the command
+        """
+        reason = self.get_fallback_reason(request)
+        if reason:
+            raise Fallback(reason)
+
+        if not self.running.acquire(blocking=False):
+            raise Fallback("the daemon is busy")
+
+        try:
+            with self.redirect(connection):
+                return self.run_workflow(request)
+        finally:
+            self.last_used = time.monotonic()
+            self.running.release()
+
+    def run_workflow(self, request: dict) -> int:
+        context = WorkflowContext(cwd=request["cwd"], environ=dict(request["environ"]))
+
+        # listings held from an earlier command may be stale by now
+        inventory.get_inventory().clear()
+
+        try:
+            workflow = Workflow(argv=request["argv"], context=context)
+
+            subcommand_cls = getattr(workflow.args, "subcommand_cls", None)
+            if subcommand_cls and workflow.subcommand.is_interactive():
+                raise Fallback(f"{workflow.args.command} needs the terminal")
+
+            response = workflow.run()
+        except Fallback:
+            raise
+        except errors.NoSuchConfig as exc:
+            response = f"Error: {exc}"
+        except SystemExit as exc:
+            response = exc.code
+        except Exception:
+            traceback.print_exc()
+
+            response = 1
+
+        return get_exit_code(response)
+
+    def serve(self) -> None:
+        """
+        Runs commands until the daemon is stopped
+        """
+        self.preload()
+
+        sys.stdout, sys.stderr = self.stdout, self.stderr
+
+        get_logger().info(f"listening on {self.socket_path}")
+
+        try:
+            self.serve_forever()
+        finally:
+            sys.stdout, sys.stderr = self.stdout.stream, self.stderr.stream
+
+            self.server_close()
+
+    def server_close(self) -> None:
+        super().server_close()
+
+        try:
+            os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    def service_actions(self) -> None:
+        if not self.idle_timeout or self.running.locked():
+            return
+
+        if time.monotonic() - self.last_used > self.idle_timeout:
+            get_logger().info("exiting after being idle")
+
+            self.stop()
+
+    def stop(self) -> None:
+        """
+        Stops the daemon once the running command, if any, finished
+        """
+        if self._stopping:
+            return
+
+        self._stopping = True
+
+        # shutdown() waits for serve_forever() to return, do not wait in its thread
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+
+def serve(socket_path: str, idle_timeout: float = None) -> [str, None]:
+    """
+    Runs the daemon on the given socket
+
+    Returns:
+        an error message when the daemon could not start
+    """
+    sock = client.connect(socket_path)
+    if sock is not None:
+        sock.close()
+
+        return f"Error: a daemon is already listening on {socket_path}"
+
+    # the socket of a daemon that did not exit cleanly
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    Daemon(socket_path, idle_timeout=idle_timeout).serve()
@@ -1,13 +1,19 @@
 import base64
 import json
-import os
+import logging
 
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Iterable
+from typing import Iterable, List
 
-from compose_flow import shell
+from compose_flow import docker_api, settings, shell
+from compose_flow.context import bind, get_context
 
-from .errors import DockerError, NoSuchConfig, NotConnected
+from .errors import DockerError, NoSuchConfig, NoSuchService, NotConnected
+
+
+def get_logger():
+    return logging.getLogger(__name__)
 
 
 @contextmanager
@@ -24,44 +30,431 @@ def json_formatter(command: str) -> str:
     yield f'{command} --format "{{{{ json . }}}}"'
 
 
+class BaseTransport(object):
+    """
+    Base class for the ways of talking to the docker daemon
+
+    The return values follow the output of the docker command, so callers get the
+    same data regardless of the transport in use.
+    """
+
+    name = None
+
+    def get_config_names(self) -> List[str]:
+        raise NotImplementedError()
+
+    def get_configs(self, names: Iterable[str] = None) -> List[dict]:
+        """
+        Returns the configs in the swarm, including their data
+
+        Args:
+            names: only return the configs with these names
+
+        Raises:
+            NoSuchConfig when a config in `names` is not found
+        """
+        raise NotImplementedError()
+
+    def create_config(self, name: str, path: str) -> None:
+        raise NotImplementedError()
+
+    def remove_config(self, name: str) -> None:
+        """
+        Raises:
+            NoSuchConfig when the config does not exist
+        """
+        raise NotImplementedError()
+
+    def get_nodes(self) -> List[dict]:
+        """
+        Returns the summary of each node, as listed by `docker node ls`
+        """
+        raise NotImplementedError()
+
+    def get_services(self) -> List[dict]:
+        """
+        Returns the summary of each service, as listed by `docker service ls`
+        """
+        raise NotImplementedError()
+
+    def inspect_service(self, name: str) -> dict:
+        """
+        Returns the service, as shown by `docker service inspect`
+
+        Raises:
+            NoSuchService when the service does not exist
+        """
+        raise NotImplementedError()
+
+    def inspect_services(self, names: Iterable[str]) -> List[dict]:
+        """
+        Returns multiple services with a single call, in the order of `names`
+
+        Raises:
+            NoSuchService when any of the services does not exist
+        """
+        raise NotImplementedError()
+
+    def get_tasks(self, service: str) -> List[dict]:
+        """
+        Returns the tasks meant to be running for the service, as listed by `docker service ps --no-trunc`
+
+        Raises:
+            NoSuchService when the service does not exist
+        """
+        raise NotImplementedError()
+
+
+class CliTransport(BaseTransport):
+    """
+    Runs the docker command
+    """
+
+    name = "cli"
+
+    def get_config_names(self) -> List[str]:
+        output = get_docker_output(
+            'docker config ls --format "{{ .Name }}"', get_context().environ
+        )
+
+        return output.splitlines()
+
+    def get_configs(self, names: Iterable[str] = None) -> List[dict]:
+        if names is None:
+            output = get_docker_output(
+                "docker config ls --quiet", get_context().environ
+            )
+
+            names = output.split()
+            if not names:
+                return []
+
+        names = list(names)
+
+        try:
+            return list(
+                get_docker_json(
+                    f"docker config inspect {' '.join(names)}", get_context().environ
+                )
+            )[0]
+        except DockerError as exc:
+            if "no such config" in str(exc).lower():
+                raise NoSuchConfig(f"config names={names} not all found: {exc}")
+
+            raise
+
+    def create_config(self, name: str, path: str) -> None:
+        shell.execute(f"docker config create {name} {path}", get_context().environ)
+
+    def remove_config(self, name: str) -> None:
+        try:
+            get_docker_output(f"docker config rm {name}", get_context().environ)
+        except DockerError as exc:
+            if "no such config" in str(exc).lower():
+                raise NoSuchConfig(f"config name={name} not found")
+
+            raise
+
+    def get_nodes(self) -> List[dict]:
+        with json_formatter("docker node ls") as json_command:
+            return list(
+                get_docker_json(json_command, get_context().environ, jsonl=True)
+            )
+
+    def get_services(self) -> List[dict]:
+        with json_formatter("docker service ls") as json_command:
+            return list(
+                get_docker_json(json_command, get_context().environ, jsonl=True)
+            )
+
+    def inspect_service(self, name: str) -> dict:
+        try:
+            with json_formatter(f"docker service inspect {name}") as command:
+                return list(get_docker_json(command, get_context().environ))[0]
+        except DockerError as exc:
+            if "no such service" in str(exc).lower():
+                raise NoSuchService(f"service name={name} not found")
+
+            raise
+
+    def inspect_services(self, names: Iterable[str]) -> List[dict]:
+        names = list(names)
+        if not names:
+            return []
+
+        try:
+            return list(
+                get_docker_json(
+                    f"docker service inspect {' '.join(names)}", get_context().environ
+                )
+            )[0]
+        except DockerError as exc:
+            if "no such service" in str(exc).lower():
+                raise NoSuchService(f"service names={names} not all found: {exc}")
+
+            raise
+
+    def get_tasks(self, service: str) -> List[dict]:
+        command = (
+            f"docker service ps --no-trunc --filter desired-state=running {service}"
+        )
+
+        try:
+            with json_formatter(command) as json_command:
+                return list(
+                    get_docker_json(json_command, get_context().environ, jsonl=True)
+                )
+        except DockerError as exc:
+            if "no such service" in str(exc).lower():
+                raise NoSuchService(f"service name={service} not found")
+
+            raise
+
+
+class ApiTransport(BaseTransport):
+    """
+    Talks to the Docker Engine API over a keep-alive connection
+    """
+
+    name = "api"
+
+    def __init__(self, client: docker_api.DockerAPIClient):
+        self.client = client
+
+    def get_config_names(self) -> List[str]:
+        return [x["Spec"]["Name"] for x in self.client.get_configs()]
+
+    def get_configs(self, names: Iterable[str] = None) -> List[dict]:
+        if names is None:
+            return self.client.get_configs()
+
+        names = list(names)
+
+        configs = self.client.get_configs(names)
+
+        found = set(x["Spec"]["Name"] for x in configs)
+        missing = [x for x in names if x not in found]
+        if missing:
+            raise NoSuchConfig(f"config names={missing} not found")
+
+        return configs
+
+    def create_config(self, name: str, path: str) -> None:
+        with open(get_context().path(path), "rb") as fh:
+            self.client.create_config(name, fh.read())
+
+    def remove_config(self, name: str) -> None:
+        self.client.remove_config(name)
+
+    def get_nodes(self) -> List[dict]:
+        swarm = self.client.info().get("Swarm", {})
+
+        return [format_node(x, swarm) for x in self.client.get_nodes()]
+
+    def get_services(self) -> List[dict]:
+        return [format_service(x) for x in self.client.get_services()]
+
+    def inspect_service(self, name: str) -> dict:
+        return self.client.inspect_service(name)
+
+    def inspect_services(self, names: Iterable[str]) -> List[dict]:
+        names = list(names)
+        if not names:
+            return []
+
+        services = {
+            x["Spec"]["Name"]: x for x in self.client.get_services(status=False)
+        }
+
+        missing = [x for x in names if x not in services]
+        if missing:
+            raise NoSuchService(f"service names={missing} not found")
+
+        return [services[x] for x in names]
+
+    def get_tasks(self, service: str) -> List[dict]:
+        tasks = self.client.get_tasks(service)
+        if not tasks:
+            # the task listing does not tell a missing service apart
+            self.client.inspect_service(service)
+
+            return []
+
+        nodes = {
+            x["ID"]: x.get("Description", {}).get("Hostname", "")
+            for x in self.client.get_nodes()
+        }
+
+        return [format_task(x, service, nodes) for x in tasks]
+
+
+def format_node(node: dict, swarm: dict) -> dict:
+    """
+    Returns the `docker node ls` summary for a node from the API
+
+    Args:
+        node: the node from the API
+        swarm: the `Swarm` section of the daemon info
+    """
+    description = node.get("Description", {})
+
+    manager_status = ""
+    if "ManagerStatus" in node:
+        if node["ManagerStatus"].get("Leader"):
+            manager_status = "Leader"
+        else:
+            manager_status = node["ManagerStatus"].get("Reachability", "").title()
+
+    trust_root = description.get("TLSInfo", {}).get("TrustRoot")
+    cluster_trust_root = swarm.get("Cluster", {}).get("TLSInfo", {}).get("TrustRoot")
+    if not trust_root:
+        tls_status = "Unknown"
+    elif trust_root == cluster_trust_root:
+        tls_status = "Ready"
+    else:
+        tls_status = "Needs Rotation"
+
+    return {
+        "Availability": node["Spec"].get("Availability", "").title(),
+        "EngineVersion": description.get("Engine", {}).get("EngineVersion", ""),
+        "Hostname": description.get("Hostname", ""),
+        "ID": node["ID"],
+        "ManagerStatus": manager_status,
+        "Self": node["ID"] == swarm.get("NodeID"),
+        "Status": node.get("Status", {}).get("State", "").title(),
+        "TLSStatus": tls_status,
+    }
+
+
+def format_service(service: dict) -> dict:
+    """
+    Returns the `docker service ls` summary for a service from the API
+    """
+    spec = service["Spec"]
+
+    # the docker command does not show the image digest
+    image = spec["TaskTemplate"]["ContainerSpec"]["Image"].split("@", 1)[0]
+
+    mode = "global" if "Global" in spec.get("Mode", {}) else "replicated"
+
+    replicas = ""
+    status = service.get("ServiceStatus")
+    if status:
+        replicas = f"{status['RunningTasks']}/{status['DesiredTasks']}"
+
+    ports = []
+    for port in service.get("Endpoint", {}).get("Ports", []):
+        if "PublishedPort" in port:
+            ports.append(
+                f"*:{port['PublishedPort']}->{port['TargetPort']}/{port['Protocol']}"
+            )
+
+    return {
+        "ID": service["ID"][:12],
+        "Image": image,
+        "Mode": mode,
+        "Name": spec["Name"],
+        "Ports": ", ".join(ports),
+        "Replicas": replicas,
+    }
+
+
+def format_task(task: dict, service: str, nodes: dict) -> dict:
+    """
+    Returns the `docker service ps --no-trunc` summary for a task from the API
+
+    The current state is the task's state without the time it changed, e.g. `Running`.
+
+    Args:
+        task: the task from the API
+        service: the name of the task's service
+        nodes: node hostnames by ID
+    """
+    status = task.get("Status", {})
+
+    # replicated tasks are numbered, global ones are named after their node
+    slot = task.get("Slot") or task.get("NodeID", "")
+
+    return {
+        "CurrentState": status.get("State", "").title(),
+        "DesiredState": task.get("DesiredState", "").title(),
+        "Error": status.get("Err", ""),
+        "ID": task["ID"],
+        "Image": task["Spec"]["ContainerSpec"]["Image"],
+        "Name": f"{service}.{slot}",
+        "Node": nodes.get(task.get("NodeID"), ""),
+        "Ports": "",
+    }
+
+
+def is_running(task: dict) -> bool:
+    """
+    Returns whether the task listed by `get_tasks()` is running
+    """
+    return task["CurrentState"].split(" ", 1)[0] == "Running"
+
+
+def get_transport() -> BaseTransport:
+    """
+    Returns the transport for the current `DOCKER_HOST`
+
+    The API is used when it can be reached directly; the docker command is the fallback.
+    """
+    client = docker_api.get_client()
+    if client:
+        return ApiTransport(client)
+
+    return CliTransport()
+
+
 def get_configs() -> list:
     """
     Returns a list of config names found in the swarm
     """
-    output = get_docker_output('docker config ls --format "{{ .Name }}"', os.environ)
-
-    return output.splitlines()
+    return get_transport().get_config_names()
 
 
 def get_config(name: str) -> str:
     """
     Returns the content of the config in the swarm
     """
-    try:
-        data = list(get_docker_json(f"docker config inspect {name}", os.environ))[0]
-    except DockerError as exc:
-        exc_s = str(exc).lower()
+    return get_config_contents([name])[name]
+
 
-        # if the config does not exist in docker, raise NoSuchConfig
-        if "no such config" in exc_s:
-            raise NoSuchConfig(f"config name={name} not found")
+def get_config_contents(names: Iterable[str]) -> dict:
+    """
+    Returns the content of multiple configs in the swarm
+
+    The configs are read with a single request, or a single `docker config inspect`
+    when the docker API is not available.
+
+    Returns:
+        dict mapping the config name to its content
 
-        raise
+    Raises:
+        NoSuchConfig when any of the configs is not found
+    """
+    names = list(names)
+    if not names:
+        return {}
+
+    contents = {}
+    for config in get_transport().get_configs(names):
+        spec = config["Spec"]
 
-    config_data = data[0]["Spec"]["Data"]
+        contents[spec["Name"]] = base64.b64decode(spec["Data"]).decode("utf8")
 
-    return base64.b64decode(config_data).decode("utf8")
+    return contents
 
 
 def get_nodes() -> Iterable:
     """
     Returns a list of swarm nodes
     """
-    with json_formatter("docker node ls") as json_command:
-        return get_docker_json(json_command, os.environ, jsonl=True)
+    return get_transport().get_nodes()
 
 
-def get_service_config(name: str) -> dict:
+def get_service_config(name: str) -> list:
     """
     Returns `docker service inspect` as a data object
 
@@ -69,38 +462,88 @@ def get_service_config(name: str) -> dict:
         name: the name of the service
 
     Returns:
-        dict
+        list containing the service
+    """
+    return [get_transport().inspect_service(name)]
+
+
+def get_service_configs(names: Iterable[str], workers: int = None) -> List[dict]:
+    """
+    Returns `docker service inspect` for multiple services
+
+    The services are inspected with a single call.  When that fails, e.g. because a
+    service was removed after it was listed, each service is inspected on its own
+    in a pool of `workers` threads and services that no longer exist are skipped.
+
+    Args:
+        names: the names of the services
+        workers: the number of threads, `settings.DOCKER_INSPECT_WORKERS` by default
+
+    Returns:
+        list of services, in the order of `names`
     """
-    with json_formatter(f"docker service inspect {name}") as command:
-        data = list(get_docker_json(command, os.environ))
+    names = list(names)
+
+    transport = get_transport()
+
+    try:
+        return transport.inspect_services(names)
+    except (DockerError, NoSuchService) as exc:
+        get_logger().debug(f"inspecting services one by one: {exc}")
 
-        return data
+    def inspect(name):
+        try:
+            return transport.inspect_service(name)
+        except NoSuchService:
+            get_logger().warning(f"service {name} not found, skipping")
+
+    with ThreadPoolExecutor(workers or settings.DOCKER_INSPECT_WORKERS) as executor:
+        services = executor.map(bind(inspect), names)
+
+        return [x for x in services if x is not None]
+
+
+def get_tasks(service: str) -> List[dict]:
+    """
+    Returns the tasks meant to be running for the service
+
+    Raises:
+        NoSuchService when the service does not exist
+    """
+    return get_transport().get_tasks(service)
 
 
 def get_services() -> Iterable:
     """
     Returns an iterable of service objects
     """
-    with json_formatter("docker service ls") as json_command:
-        return get_docker_json(json_command, os.environ, jsonl=True)
+    return get_transport().get_services()
 
 
 def load_config(name: str, path: str) -> None:
     """
     Loads config into swarm
+
+    Any existing config with the same name is replaced
     """
-    configs = get_configs()
-    if name in configs:
-        remove_config(name)
+    transport = get_transport()
 
-    shell.execute(f"docker config create {name} {path}", os.environ)
+    try:
+        transport.remove_config(name)
+    except NoSuchConfig:
+        pass
+
+    transport.create_config(name, path)
 
 
 def remove_config(name: str) -> None:
     """
     Removes a config from the swarm
+
+    Raises:
+        NoSuchConfig when the config does not exist
     """
-    shell.execute(f"docker config rm {name}", os.environ)
+    get_transport().remove_config(name)
 
 
 def get_docker_json(command: str, env: dict, jsonl: bool = False) -> [dict, Iterable]:
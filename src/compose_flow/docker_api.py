@@ -0,0 +1,287 @@
+"""
+Docker Engine API client
+
+Talks HTTP to the Docker daemon at `DOCKER_HOST`, either a unix socket, such
+as the socket forwarded over SSH by `compose-flow remote connect`, or a plain
+tcp address.  A client holds on to a single keep-alive connection, so multiple
+requests only pay for one connection setup.
+"""
+import base64
+import http.client
+import json
+import logging
+import socket
+import threading
+
+from typing import Iterable, List
+from urllib.parse import quote, urlencode
+
+from compose_flow import settings
+from compose_flow.context import get_context
+
+from .errors import DockerAPIError, NoSuchConfig, NoSuchService, NotConnected
+
+UNIX_PREFIX = "unix://"
+TCP_PREFIX = "tcp://"
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    HTTP connection over a unix socket
+    """
+
+    def __init__(self, socket_path: str, timeout: float = None):
+        super().__init__("localhost")
+
+        self.socket_path = socket_path
+        self.socket_timeout = timeout
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.socket_timeout)
+
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+
+            raise
+
+        self.sock = sock
+
+
+class DockerAPIClient(object):
+    """
+    Client for the Docker Engine API
+    """
+
+    def __init__(self, docker_host: str, timeout: float = None):
+        self.docker_host = docker_host
+        self.timeout = timeout
+
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @property
+    def logger(self):
+        return logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+
+    def close(self) -> None:
+        if self._connection:
+            self._connection.close()
+
+        self._connection = None
+
+    def _make_connection(self) -> http.client.HTTPConnection:
+        if self.docker_host.startswith(UNIX_PREFIX):
+            return UnixHTTPConnection(
+                self.docker_host[len(UNIX_PREFIX) :], timeout=self.timeout
+            )
+
+        return http.client.HTTPConnection(
+            self.docker_host[len(TCP_PREFIX) :], timeout=self.timeout
+        )
+
+    def _send(self, method: str, url: str, body: bytes, headers: dict) -> tuple:
+        if self._connection is None:
+            self._connection = self._make_connection()
+
+        self._connection.request(method, url, body=body, headers=headers)
+
+        response = self._connection.getresponse()
+
+        return response.status, response.read()
+
+    def request(
+        self, method: str, path: str, params: dict = None, data: dict = None
+    ) -> object:
+        """
+        Makes a request to the API
+
+        Args:
+            method: the HTTP method
+            path: the API path, e.g. `/configs`
+            params: query string parameters
+            data: JSON-serializable request body
+
+        Returns:
+            the decoded JSON response or None when the response is empty
+
+        Raises:
+            NotConnected when the socket cannot be reached
+            DockerAPIError when the API returns an error
+        """
+        url = path
+        if params:
+            url = f"{url}?{urlencode(params)}"
+
+        body = None
+        headers = {}
+        if data is not None:
+            body = json.dumps(data).encode("utf8")
+            headers["Content-Type"] = "application/json"
+
+        self.logger.debug(f"{method} {url}")
+
+        with self._lock:
+            try:
+                status, content = self._send(method, url, body, headers)
+            except (
+                http.client.RemoteDisconnected,
+                ConnectionResetError,
+                BrokenPipeError,
+            ):
+                # the daemon closed the idle keep-alive connection, reconnect once
+                self.close()
+
+                try:
+                    status, content = self._send(method, url, body, headers)
+                except OSError as exc:
+                    self.close()
+
+                    raise NotConnected(f"unable to reach {self.docker_host}: {exc}")
+            except OSError as exc:
+                self.close()
+
+                raise NotConnected(f"unable to reach {self.docker_host}: {exc}")
+
+        if status >= 400:
+            try:
+                message = json.loads(content.decode("utf8"))["message"]
+            except (ValueError, KeyError, TypeError):
+                message = content.decode("utf8", "replace").strip()
+
+            raise DockerAPIError(
+                f"{method} {path} failed status={status}: {message}", status=status
+            )
+
+        if not content:
+            return None
+
+        return json.loads(content.decode("utf8"))
+
+    def get_configs(self, names: Iterable[str] = None) -> List[dict]:
+        """
+        Returns the configs in the swarm, including their data
+
+        Args:
+            names: only return the configs with these names
+        """
+        params = None
+        if names is not None:
+            names = list(names)
+            params = {"filters": json.dumps({"name": names})}
+
+        configs = self.request("GET", "/configs", params=params)
+
+        # the name filter matches on prefixes, keep exact matches only
+        if names is not None:
+            configs = [x for x in configs if x["Spec"]["Name"] in names]
+
+        return configs
+
+    def get_nodes(self) -> List[dict]:
+        return self.request("GET", "/nodes")
+
+    def get_services(self, status: bool = True) -> List[dict]:
+        """
+        Returns the services in the swarm
+
+        Args:
+            status: include the running and desired task counts of each service
+        """
+        params = {"status": "true"} if status else None
+
+        return self.request("GET", "/services", params=params)
+
+    def get_tasks(self, service: str) -> List[dict]:
+        """
+        Returns the tasks meant to be running for the service with the given name or ID
+        """
+        filters = {"desired-state": ["running"], "service": [service]}
+
+        return self.request("GET", "/tasks", params={"filters": json.dumps(filters)})
+
+    def inspect_service(self, name: str) -> dict:
+        """
+        Returns the service with the given name or ID
+
+        Raises:
+            NoSuchService when the service does not exist
+        """
+        try:
+            return self.request("GET", f"/services/{quote(name, safe='')}")
+        except DockerAPIError as exc:
+            if exc.status == 404:
+                raise NoSuchService(f"service name={name} not found")
+
+            raise
+
+    def info(self) -> dict:
+        return self.request("GET", "/info")
+
+    def create_config(self, name: str, content: bytes) -> str:
+        """
+        Creates a config in the swarm
+
+        Returns:
+            the ID of the new config
+        """
+        data = {"Name": name, "Data": base64.b64encode(content).decode("utf8")}
+
+        return self.request("POST", "/configs/create", data=data)["ID"]
+
+    def remove_config(self, name: str) -> None:
+        """
+        Removes a config from the swarm
+
+        Raises:
+            NoSuchConfig when the config does not exist
+        """
+        try:
+            self.request("DELETE", f"/configs/{quote(name, safe='')}")
+        except DockerAPIError as exc:
+            if exc.status == 404:
+                raise NoSuchConfig(f"config name={name} not found")
+
+            raise
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(docker_host: str = None) -> DockerAPIClient:
+    """
+    Returns the API client for the docker host
+
+    Args:
+        docker_host: the docker host, `DOCKER_HOST` in the context's environment by default
+
+    Returns:
+        DockerAPIClient or None when the API is disabled or the host is not supported
+    """
+    if not settings.DOCKER_API:
+        return None
+
+    environ = get_context().environ
+
+    docker_host = docker_host or environ.get("DOCKER_HOST")
+    if not docker_host:
+        return None
+
+    # ssh:// hosts and TLS are left to the docker command
+    if docker_host.startswith(TCP_PREFIX):
+        if environ.get("DOCKER_TLS_VERIFY"):
+            return None
+    elif not docker_host.startswith(UNIX_PREFIX):
+        return None
+
+    with _clients_lock:
+        client = _clients.get(docker_host)
+        if client is None:
+            client = _clients[docker_host] = DockerAPIClient(
+                docker_host, timeout=settings.DOCKER_API_TIMEOUT
+            )
+
+    return client
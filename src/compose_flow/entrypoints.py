@@ -2,27 +2,39 @@
 Entrypoints module
 
 Main console script entrypoints for the dc tool
+
+Commands handed to the daemon only import what the client needs, the rest is
+imported within the entrypoints.
 """
-import logging
-import logging.config
+import os
 import sys
 
-from compose_flow import errors
-
 MIN_VERSION = (3, 6)
 RUNTIME_VERSION = (sys.version_info.major, sys.version_info.minor)
 
 if RUNTIME_VERSION < MIN_VERSION:
     sys.exit("Error: compose-flow runs on Python3.6+")
 
-from . import settings
-from .commands import Workflow
+from . import client, settings
 
 
 def compose_flow():
     """
     Main entrypoint
+
+    When `CF_DAEMON_SOCKET` is set, the command is run by the daemon listening on
+    it; the rest of compose-flow is only imported when the command runs here.
     """
+    if settings.DAEMON_SOCKET:
+        exit_code = client.run(settings.DAEMON_SOCKET, sys.argv[1:])
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+    import logging.config
+
+    from . import errors
+    from .commands import Workflow
+
     logging.config.dictConfig(settings.LOGGING)
 
     try:
@@ -31,3 +43,47 @@ def compose_flow():
         response = f"Error: {exc}"
 
     sys.exit(response)
+
+
+def daemon():
+    """
+    Daemon entrypoint
+    """
+    import argparse
+    import logging.config
+
+    parser = argparse.ArgumentParser(
+        description="runs compose-flow commands sent by the compose-flow client"
+    )
+    parser.add_argument(
+        "--socket",
+        default=settings.DAEMON_SOCKET,
+        help="the unix socket to listen on, default=$CF_DAEMON_SOCKET",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=settings.DAEMON_IDLE_TIMEOUT,
+        help="seconds without a command before exiting, 0 to keep running",
+    )
+    parser.add_argument(
+        "--stop", action="store_true", help="stop the daemon listening on the socket"
+    )
+
+    args = parser.parse_args()
+    if not args.socket:
+        sys.exit("Error: set CF_DAEMON_SOCKET or pass --socket")
+
+    socket_path = os.path.abspath(args.socket)
+
+    if args.stop:
+        if not client.stop(socket_path):
+            sys.exit(f"Error: no daemon is listening on {socket_path}")
+
+        return
+
+    logging.config.dictConfig(settings.LOGGING)
+
+    from .daemon import serve
+
+    sys.exit(serve(socket_path, idle_timeout=args.idle_timeout))
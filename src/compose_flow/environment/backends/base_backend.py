@@ -4,6 +4,9 @@ from compose_flow.errors import BackendError
 
 
 class BaseBackend(object):
+    # whether read_many reads the environments with a single call
+    bulk_read = False
+
     def __init__(self, *args, **kwargs):
         workflow = kwargs.get("workflow")
         if workflow:
@@ -23,6 +26,17 @@ class BaseBackend(object):
         """Read a specific environment"""
         raise NotImplementedError()
 
+    def read_many(self, names: list) -> dict:
+        """
+        Reads multiple environments
+
+        Backends that are able to read environments in bulk override this
+
+        Returns:
+            dict mapping the environment name to its content
+        """
+        return {name: self.read(name) for name in names}
+
     def rm(self, name: str):
         """
         Removes an environment from the backend
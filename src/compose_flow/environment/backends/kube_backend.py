@@ -1,9 +1,8 @@
-import os
-
 from .base_backend import BaseBackend
 
 from compose_flow.kube.mixins import KubeMixIn
 from compose_flow import shell
+from compose_flow.context import get_context
 
 
 class KubeBackend(BaseBackend, KubeMixIn):
@@ -29,7 +28,7 @@ class KubeBackend(BaseBackend, KubeMixIn):
         return f"compose-flow-{self.workflow.args.profile}"
 
     def execute(self, command: str, **kwargs):
-        env = os.environ
+        env = get_context(self.workflow).environ
         return shell.execute(command, env, **kwargs)
 
     def ls(self) -> list:
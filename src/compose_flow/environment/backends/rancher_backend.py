@@ -1,9 +1,8 @@
-import os
-
 from .base_backend import BaseBackend
 
 from compose_flow.kube.mixins import KubeMixIn
 from compose_flow import shell
+from compose_flow.context import get_context
 
 
 class RancherBackend(BaseBackend, KubeMixIn):
@@ -28,7 +27,7 @@ class RancherBackend(BaseBackend, KubeMixIn):
         self._check_rancher_namespace()
 
     def execute(self, command: str, **kwargs):
-        env = os.environ
+        env = get_context(self.workflow).environ
         return shell.execute(command, env, **kwargs)
 
     def ls(self) -> list:
@@ -1,10 +1,12 @@
-import os
 import sys
 import sh
 
+from contextlib import contextmanager
+
 from .base_backend import BaseBackend
 
 from compose_flow import docker
+from compose_flow.context import get_context
 from compose_flow.commands.subcommands.remote import Remote
 
 
@@ -13,6 +15,8 @@ class SwarmBackend(BaseBackend):
     Manages `docker config` storage
     """
 
+    bulk_read = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -77,10 +81,17 @@ class SwarmBackend(BaseBackend):
     def ls(self) -> list:
         return docker.get_configs()
 
-    def read(self, name: str) -> str:
+    @contextmanager
+    def config_remote(self):
+        """
+        Points docker at the config remote, when one is given, for the duration of the context
+        """
         config_remote = self.workflow.args.config_remote
         remote = None
-        old_docker_host = os.environ.get("DOCKER_HOST")
+
+        # only the workflow's environment is changed, other workflows are not affected
+        environ = get_context(self.workflow).environ
+        old_docker_host = environ.get("DOCKER_HOST")
 
         try:
             if config_remote:
@@ -91,18 +102,25 @@ class SwarmBackend(BaseBackend):
 
                 docker_host = remote.docker_host
                 if docker_host:
-                    # one of the very few exceptions of updating the os environment directly
-                    # the docker host is low level in that it's not possible to run docker
-                    # commands on remote hosts if this is not set before those commands are
-                    # attempted.
-                    os.environ.update({"DOCKER_HOST": docker_host})
+                    environ["DOCKER_HOST"] = docker_host
 
-            return docker.get_config(name)
+            yield
         finally:
             if old_docker_host:
-                os.environ.update({"DOCKER_HOST": old_docker_host})
+                environ["DOCKER_HOST"] = old_docker_host
             else:
-                os.environ.pop("DOCKER_HOST", None)
+                environ.pop("DOCKER_HOST", None)
+
+    def read(self, name: str) -> str:
+        with self.config_remote():
+            return docker.get_config(name)
+
+    def read_many(self, names: list) -> dict:
+        """
+        Reads multiple configs with a single docker call
+        """
+        with self.config_remote():
+            return docker.get_config_contents(names)
 
     def rm(self, name: str) -> None:
         """
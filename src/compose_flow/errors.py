@@ -16,6 +16,17 @@ class DockerError(CommandError):
     """
 
 
+class DockerAPIError(DockerError):
+    """
+    Raised when the Docker API responds with an error
+    """
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+
+        self.status = status
+
+
 class ErrorMessage(Exception):
     """
     Subclass to print out error message instead of entire stack trace
@@ -34,6 +45,12 @@ class EnvError(ErrorMessage):
     """
 
 
+class CircularReference(EnvError):
+    """
+    Raised when environment variables reference each other in a loop
+    """
+
+
 class NoSuchConfig(Exception):
     """
     Raised when a requested config is not in the docker swarm
@@ -46,6 +63,12 @@ class NoSuchProfile(Exception):
     """
 
 
+class NoSuchService(Exception):
+    """
+    Raised when a requested service is not in the docker swarm
+    """
+
+
 class NotConnected(Exception):
     """
     Raised when not connected to a remote host
@@ -133,3 +156,19 @@ class PodNotFound(ErrorMessage):
 
 class PublishMajorMinorTagsError(ErrorMessage):
     """Raised when publish_with_major_minor_tags is called on an invalid PrivateImage"""
+
+
+class DeployFailed(ErrorMessage):
+    """Raised when a deploy step fails, with a summary of all the steps"""
+
+
+class InvalidDeployPlan(ErrorMessage):
+    """Raised when the depends_on and waves of apps and manifests cannot be satisfied"""
+
+
+class NoSuchEnvironment(ErrorMessage):
+    """Raised when an environment pattern does not match any remote"""
+
+
+class FanoutFailed(ErrorMessage):
+    """Raised when a command fails in some of the environments it ran in, with a summary of all of them"""
@@ -0,0 +1,217 @@
+"""
+Running a command across several environments
+
+When `-e` names several environments, e.g. `-e dev,stage,prod-*`, the command is
+run once for each of them, each in its own compose-flow process that sets up its
+own remote connection and `DOCKER_HOST`.  The processes start with the
+environment of the workflow fanning out, see `compose_flow.context`, rather than
+this process' `os.environ`.  Patterns are matched against the remotes in
+`~/.compose/config.yml`.
+
+The runs are processes rather than workflows in threads of this process because
+their output could not be told apart otherwise: subcommands print to
+`sys.stdout` and hand the terminal over to the docker, kubectl and helm CLIs
+they run, whereas the output of a process can be captured and prefixed as a
+whole.
+
+Up to `settings.FANOUT_WORKERS` environments run at the same time.  Their output
+is interleaved line by line, prefixed with the environment name, and a summary
+of the runs is printed once they all finished.
+"""
+import fnmatch
+import shlex
+import sys
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, NamedTuple
+
+from compose_flow import errors, shell
+from compose_flow.context import bind, get_context
+
+OK = "ok"
+FAILED = "failed"
+
+GLOB_CHARS = "*?["
+
+
+class FanoutResult(NamedTuple):
+    environment: str
+    status: str
+    duration: float
+    exit_code: int
+
+    # the last line of output of a failed run
+    error: str = None
+
+
+_output_lock = threading.Lock()
+
+
+def is_fanout(environment: str) -> bool:
+    """
+    Returns whether the given `-e` value names more than one environment
+    """
+    if not environment:
+        return False
+
+    return "," in environment or any(x in environment for x in GLOB_CHARS)
+
+
+def get_environments(spec: str, known: Iterable[str]) -> List[str]:
+    """
+    Returns the environments named by the spec, in order
+
+    Args:
+        spec: comma separated environment names and patterns
+        known: the names patterns are matched against
+
+    Raises:
+        NoSuchEnvironment when a pattern does not match any name
+    """
+    known = sorted(known)
+
+    environments = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+
+        if any(x in item for x in GLOB_CHARS):
+            matches = fnmatch.filter(known, item)
+            if not matches:
+                raise errors.NoSuchEnvironment(f"no remotes match {item}")
+        else:
+            matches = [item]
+
+        environments.extend(x for x in matches if x not in environments)
+
+    return environments
+
+
+def get_argv(argv: List[str], environment: str, command: str = None) -> List[str]:
+    """
+    Returns the command line with `-e` replaced by the given environment
+
+    Args:
+        argv: the command line
+        environment: the environment to run the command in
+        command: the subcommand, options after it are left untouched
+    """
+    new_argv = ["-e", environment]
+
+    argv = list(argv)
+    while argv:
+        arg = argv.pop(0)
+
+        if arg == command:
+            new_argv.append(arg)
+            new_argv.extend(argv)
+
+            break
+
+        if arg in ("-e", "--environment"):
+            argv = argv[1:]
+        elif arg.startswith("--environment=") or (
+            arg.startswith("-e") and not arg.startswith("--")
+        ):
+            continue
+        else:
+            new_argv.append(arg)
+
+    return new_argv
+
+
+def format_summary(results: List[FanoutResult]) -> str:
+    lines = []
+    for result in results:
+        line = f"{result.status:<8} {result.environment} ({result.duration:.1f}s)"
+
+        if result.error:
+            line += f": {result.error}"
+
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+def run_environment(
+    argv: List[str], environment: str, command: str = None, cwd: str = None, stream=None
+) -> FanoutResult:
+    """
+    Runs compose-flow for a single environment, prefixing its output with the environment name
+    """
+    args = " ".join(shlex.quote(x) for x in get_argv(argv, environment, command))
+
+    last_line = []
+
+    def write(line: str) -> None:
+        line = line.rstrip()
+        if line.strip():
+            last_line[:] = [line.strip()]
+
+        with _output_lock:
+            (stream or sys.stdout).write(f"[{environment}] {line}\n")
+
+    start = time.perf_counter()
+    try:
+        shell.execute(
+            f"{sys.executable} -m compose_flow {args}",
+            get_context().environ,
+            _cwd=cwd,
+            _out=write,
+            _err_to_out=True,
+        )
+    except shell.ErrorReturnCode as exc:
+        return FanoutResult(
+            environment,
+            FAILED,
+            time.perf_counter() - start,
+            exc.exit_code,
+            last_line[0] if last_line else None,
+        )
+
+    return FanoutResult(environment, OK, time.perf_counter() - start, 0)
+
+
+def run(
+    argv: List[str],
+    environments: List[str],
+    command: str = None,
+    cwd: str = None,
+    workers: int = 1,
+    stream=None,
+) -> List[FanoutResult]:
+    """
+    Runs compose-flow for each of the environments
+
+    Returns:
+        the result of each environment, in order
+
+    Raises:
+        FanoutFailed with a summary of the results when a run fails
+    """
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        futures = [
+            executor.submit(
+                bind(run_environment),
+                argv,
+                environment,
+                command,
+                cwd=cwd,
+                stream=stream,
+            )
+            for environment in environments
+        ]
+
+        results = [x.result() for x in futures]
+
+    summary = format_summary(results)
+
+    if any(x.status == FAILED for x in results):
+        raise errors.FanoutFailed(f"some environments failed:\n{summary}")
+
+    print(f"\n{summary}", file=stream or sys.stdout)
+
+    return results
@@ -0,0 +1,344 @@
+"""
+Git repository state
+
+The state of a repository is made up of the commit checked out, the tags in the
+repository and the changes in the working copy.
+
+By default the commit and working copy changes are read with a single
+`git status` command.  When `CF_GIT_READ_FILES` is set, they are read directly
+from the `.git` directory instead, without running git.  In this mode tracked
+files are compared against the index, but untracked files and changes that are
+staged but not committed are not detected.
+
+In both modes the tags are read from the `.git` directory.
+"""
+import hashlib
+import logging
+import os
+import shlex
+import struct
+
+from typing import List, NamedTuple, Tuple
+
+from compose_flow import settings, shell
+from compose_flow.context import get_context
+
+# index entries are stored in this mode for submodules
+GITLINK_MODE = 0o160000
+
+INDEX_SIGNATURE = b"DIRC"
+INDEX_ENTRY = struct.Struct(">10I20sH")
+
+# flags on an index entry
+INDEX_EXTENDED_FLAG = 0x4000
+INDEX_STAGE_MASK = 0x3000
+
+
+class GitState(NamedTuple):
+    # the top-level directory of the working copy
+    work_tree: str
+
+    # the sha of the commit checked out
+    head: str
+
+    # fingerprint of the tags in the repository
+    tags: str
+
+    # paths that differ from the commit checked out
+    changes: Tuple[str, ...]
+
+    @property
+    def is_clean(self) -> bool:
+        return not self.changes
+
+
+def get_logger():
+    return logging.getLogger(__name__)
+
+
+def find_git_dir(path: str = None) -> Tuple[str, str]:
+    """
+    Returns the git directory and working copy for the given path
+
+    Returns:
+        a tuple of (git dir, work tree) or (None, None) when not in a repository
+    """
+    path = os.path.abspath(path or get_context().path("."))
+
+    while True:
+        dot_git = os.path.join(path, ".git")
+
+        if os.path.isdir(dot_git):
+            return dot_git, path
+        elif os.path.isfile(dot_git):
+            # worktrees and submodules point to the git dir with `gitdir: <path>`
+            with open(dot_git, "r") as fh:
+                content = fh.read().strip()
+
+            if content.startswith("gitdir:"):
+                git_dir = content.split(":", 1)[1].strip()
+
+                return os.path.normpath(os.path.join(path, git_dir)), path
+
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None, None
+
+        path = parent
+
+
+def get_common_dir(git_dir: str) -> str:
+    """
+    Returns the directory holding the refs shared by all worktrees
+    """
+    try:
+        with open(os.path.join(git_dir, "commondir"), "r") as fh:
+            common_dir = fh.read().strip()
+    except FileNotFoundError:
+        return git_dir
+
+    return os.path.normpath(os.path.join(git_dir, common_dir))
+
+
+def read_packed_refs(common_dir: str) -> dict:
+    refs = {}
+
+    try:
+        with open(os.path.join(common_dir, "packed-refs"), "r") as fh:
+            for line in fh:
+                # skip the header and peeled tag lines
+                if line.startswith(("#", "^")):
+                    continue
+
+                sha, name = line.split()
+                refs[name] = sha
+    except FileNotFoundError:
+        pass
+
+    return refs
+
+
+def read_ref(git_dir: str, ref: str) -> str:
+    """
+    Returns the sha that the given ref points to, following symbolic refs
+
+    Returns:
+        the sha or None when the ref does not exist, e.g. in a repository without commits
+    """
+    common_dir = get_common_dir(git_dir)
+
+    # refs like HEAD are per worktree, everything under refs/ is shared
+    for _ in range(10):
+        base_dir = common_dir if ref.startswith("refs/") else git_dir
+
+        try:
+            with open(os.path.join(base_dir, ref), "r") as fh:
+                content = fh.read().strip()
+        except FileNotFoundError:
+            return read_packed_refs(common_dir).get(ref)
+
+        if not content.startswith("ref:"):
+            return content
+
+        ref = content.split(":", 1)[1].strip()
+
+    raise ValueError(f"too many levels of symbolic refs for {ref}")
+
+
+def get_tags_fingerprint(git_dir: str) -> str:
+    """
+    Returns a digest of all the tags in the repository
+    """
+    common_dir = get_common_dir(git_dir)
+
+    digest = hashlib.sha1()
+
+    packed_refs = read_packed_refs(common_dir)
+    for name in sorted(packed_refs):
+        if name.startswith("refs/tags/"):
+            digest.update(f"{name} {packed_refs[name]}\n".encode("utf8"))
+
+    tags_dir = os.path.join(common_dir, "refs", "tags")
+    for dirpath, dirnames, filenames in os.walk(tags_dir):
+        dirnames.sort()
+
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+
+            with open(path, "rb") as fh:
+                sha = fh.read().strip()
+
+            name = os.path.relpath(path, common_dir).replace(os.sep, "/")
+
+            digest.update(name.encode("utf8") + b" " + sha + b"\n")
+
+    return digest.hexdigest()
+
+
+def get_blob_sha(path: str, is_link: bool = False) -> str:
+    """
+    Returns the sha git would store for the file's content
+    """
+    if is_link:
+        content = os.readlink(path).encode("utf8")
+    else:
+        with open(path, "rb") as fh:
+            content = fh.read()
+
+    digest = hashlib.sha1(f"blob {len(content)}\0".encode("utf8"))
+    digest.update(content)
+
+    return digest.hexdigest()
+
+
+def read_index_changes(git_dir: str, work_tree: str) -> List[str]:
+    """
+    Returns the tracked files in the working copy that differ from the index
+
+    Files whose stat information matches the index are considered unchanged,
+    otherwise their content is compared to the sha in the index.
+
+    Returns:
+        list of changed paths or None when the index format is not supported
+    """
+    index_path = os.path.join(git_dir, "index")
+
+    try:
+        with open(index_path, "rb") as fh:
+            data = fh.read()
+
+        index_mtime = os.stat(index_path).st_mtime
+    except FileNotFoundError:
+        return []
+
+    signature, version, count = struct.unpack(">4sII", data[:12])
+    if signature != INDEX_SIGNATURE or version not in (2, 3):
+        return None
+
+    changes = []
+
+    offset = 12
+    for _ in range(count):
+        (
+            _ctime_s,
+            _ctime_ns,
+            mtime_s,
+            _mtime_ns,
+            _dev,
+            _ino,
+            mode,
+            _uid,
+            _gid,
+            size,
+            sha,
+            flags,
+        ) = INDEX_ENTRY.unpack_from(data, offset)
+
+        header_size = INDEX_ENTRY.size
+        if flags & INDEX_EXTENDED_FLAG:
+            header_size += 2
+
+        name_end = data.index(b"\0", offset + header_size)
+        name = data[offset + header_size : name_end].decode("utf8")
+
+        # entries are padded with 1-8 null bytes to a multiple of 8
+        entry_size = name_end - offset
+        offset += (entry_size + 8) & ~7
+
+        # merge conflicts are changes
+        if flags & INDEX_STAGE_MASK:
+            changes.append(name)
+
+            continue
+
+        if mode == GITLINK_MODE:
+            continue
+
+        path = os.path.join(work_tree, name)
+
+        try:
+            stat = os.lstat(path)
+        except FileNotFoundError:
+            changes.append(name)
+
+            continue
+
+        stat_matches = (
+            int(stat.st_mtime) == mtime_s
+            and stat.st_size & 0xFFFFFFFF == size
+            # files modified right as the index was written may not show in their stat
+            and stat.st_mtime < index_mtime
+        )
+        if stat_matches:
+            continue
+
+        is_link = (mode & 0o170000) == 0o120000
+        if get_blob_sha(path, is_link=is_link) != sha.hex():
+            changes.append(name)
+
+    return changes
+
+
+def read_state_from_files(git_dir: str, work_tree: str) -> GitState:
+    """
+    Returns the repository state read from the `.git` directory
+    """
+    changes = read_index_changes(git_dir, work_tree)
+    if changes is None:
+        get_logger().debug("unsupported index version, running git status")
+
+        return read_state_from_status(git_dir, work_tree)
+
+    return GitState(
+        work_tree=work_tree,
+        head=read_ref(git_dir, "HEAD"),
+        tags=get_tags_fingerprint(git_dir),
+        changes=tuple(changes),
+    )
+
+
+def read_state_from_status(git_dir: str, work_tree: str) -> GitState:
+    """
+    Returns the repository state from the output of `git status`
+    """
+    proc = shell.execute(
+        f"git -C {shlex.quote(work_tree)} status --porcelain=v2 --branch --untracked-files=all",
+        get_context().environ,
+    )
+
+    head = None
+    changes = []
+
+    for line in str(proc).splitlines():
+        if line.startswith("# branch.oid "):
+            head = line.split()[-1]
+
+            # a repository without commits
+            if head == "(initial)":
+                head = None
+        elif line and not line.startswith("#"):
+            changes.append(line)
+
+    return GitState(
+        work_tree=work_tree,
+        head=head,
+        tags=get_tags_fingerprint(git_dir),
+        changes=tuple(changes),
+    )
+
+
+def get_state(path: str = None) -> GitState:
+    """
+    Returns the state of the repository containing the given path
+
+    Returns:
+        GitState or None when the path is not in a repository
+    """
+    git_dir, work_tree = find_git_dir(path)
+    if not git_dir:
+        return None
+
+    if settings.GIT_READ_FILES:
+        return read_state_from_files(git_dir, work_tree)
+
+    return read_state_from_status(git_dir, work_tree)
@@ -6,6 +6,8 @@ from typing import List
 
 import yaml
 
+from compose_flow.utils import YAML_SAFE_LOADER
+
 POD_TEMPLATE_RESOURCES = [
     "DaemonSet",
     "Deployment",
@@ -58,7 +60,7 @@ class BaseChecker(ABC):
 
     def _load_rendered_yaml(self, rendered: str) -> dict:
         """Load the rendered YAML which is passed in to the `check` method."""
-        return [d for d in yaml.safe_load_all(rendered)]
+        return [d for d in yaml.load_all(rendered, Loader=YAML_SAFE_LOADER)]
 
 
 class ManifestChecker(BaseChecker):
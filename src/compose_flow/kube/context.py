@@ -0,0 +1,179 @@
+"""
+Tracking of the active Rancher and kubectl contexts
+
+Checking and switching contexts runs the rancher or kubectl CLI, which is slow
+to start.  The context compose-flow last found or switched to is tracked per
+process along with a fingerprint of the CLI's config files, and persisted to
+the cache for `settings.KUBE_CONTEXT_TTL` seconds so that following runs can use
+it too.  A switch is skipped when its target is the tracked context and the
+config files have not been modified since; any change to the files, including a
+switch made outside of compose-flow, results in a check with the CLI.
+"""
+import json
+import logging
+import os
+
+from collections import Counter
+from functools import lru_cache
+from typing import List
+
+from compose_flow import settings, timings
+from compose_flow.cache import DiskCache
+from compose_flow.context import get_context
+
+RANCHER = "rancher"
+KUBE = "kube"
+
+# entries are tiny, this holds thousands of them
+CONTEXT_CACHE_MAX_BYTES = 1024 * 1024
+
+
+def get_rancher_config_paths() -> List[str]:
+    config_dir = get_context().environ.get(
+        "RANCHER_CONFIG_DIR", os.path.expanduser("~/.rancher")
+    )
+
+    return [os.path.join(config_dir, "cli2.json")]
+
+
+def get_kube_config_paths() -> List[str]:
+    kubeconfig = get_context().environ.get("KUBECONFIG")
+    if kubeconfig:
+        return [x for x in kubeconfig.split(os.pathsep) if x]
+
+    return [os.path.expanduser("~/.kube/config")]
+
+
+def get_rancher_server() -> str:
+    """
+    Returns the URL of the server the rancher CLI is logged into or None when it is not
+    """
+    try:
+        with open(get_rancher_config_paths()[0], "r") as fh:
+            config = json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    servers = config.get("Servers") or {}
+
+    return (servers.get(config.get("CurrentServer")) or {}).get("url")
+
+
+CONFIG_PATHS = {RANCHER: get_rancher_config_paths, KUBE: get_kube_config_paths}
+
+
+def get_fingerprint(kind: str) -> str:
+    """
+    Returns a fingerprint of the config files holding the given kind of context
+    """
+    stats = []
+    for path in CONFIG_PATHS[kind]():
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            stats.append([path, None, None])
+        else:
+            stats.append([path, stat.st_mtime_ns, stat.st_size])
+
+    return DiskCache.make_key(kind, stats)
+
+
+class ContextTracker(object):
+    """
+    Tracks the active context of each kind
+
+    A context is identified by a string, e.g. the name of a kubectl context.
+
+    The `counts` keep track of how contexts were made active:
+
+    - `skipped`: the tracked context was current, the CLI was not run
+    - `checked`: the CLI found the context current, no switch was needed
+    - `switched`: the CLI switched to the context
+
+    They are counted for the process and for the run, see `timings.count`.
+    """
+
+    def __init__(self, cache: DiskCache = None):
+        self.cache = cache
+        self.counts = Counter()
+
+        # the fingerprint and context of each kind
+        self._contexts = {}
+
+    @property
+    def logger(self):
+        return logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+
+    def count(self, name: str) -> None:
+        self.counts[name] += 1
+
+        timings.count("kube contexts", name)
+
+    def get(self, kind: str) -> str:
+        """
+        Returns the tracked context or None when the config files changed since it was tracked
+        """
+        fingerprint = get_fingerprint(kind)
+
+        entry = self._contexts.get(kind)
+        if entry and entry[0] == fingerprint:
+            return entry[1]
+
+        if not self.cache:
+            return None
+
+        context = self.cache.get(fingerprint)
+        if context is not None:
+            self._contexts[kind] = (fingerprint, context)
+
+        return context
+
+    def is_current(self, kind: str, context: str) -> bool:
+        """
+        Returns whether the given context is the tracked one, counting a skipped switch when it is
+        """
+        if self.get(kind) != context:
+            return False
+
+        self.count("skipped")
+
+        self.logger.debug(
+            f"{kind} context {context} is current, {self.counts['skipped']} switches skipped"
+        )
+
+        return True
+
+    def record(self, kind: str, context: str, switched: bool = True) -> None:
+        """
+        Tracks the given context as current
+
+        Args:
+            kind: the kind of context
+            context: the context
+            switched: whether the CLI switched to the context or found it current
+        """
+        self.count("switched" if switched else "checked")
+
+        # switching writes to the config files, so the fingerprint is taken afterwards
+        fingerprint = get_fingerprint(kind)
+
+        self._contexts[kind] = (fingerprint, context)
+
+        if self.cache:
+            self.cache.set(fingerprint, context)
+
+
+@lru_cache()
+def get_tracker() -> ContextTracker:
+    """
+    Returns the tracker for this process
+    """
+    cache = None
+    if settings.KUBE_CONTEXT_TTL:
+        cache = DiskCache(
+            os.path.join(settings.CACHE_ROOT, "kube-context"),
+            max_bytes=CONTEXT_CACHE_MAX_BYTES,
+            ttl=settings.KUBE_CONTEXT_TTL,
+        )
+
+    return ContextTracker(cache=cache)
@@ -0,0 +1,154 @@
+"""
+Record of what was deployed to each cluster
+
+The digest of a deploy step covers its command, which names the chart and
+version of an app, and the content of the rendered files the command applies.
+After a deploy, the digest of each step that succeeded is recorded per cluster
+along with when it was deployed; a step whose digest matches the record is left
+out of deploys for `settings.DEPLOY_DIGEST_TTL` seconds after that.  Each step
+expires on its own, deploying some steps does not renew the others.
+
+The record is kept locally, so changes made to the cluster by other means, or
+by compose-flow on another machine, are not noticed until it expires.
+"""
+import hashlib
+import os
+import shlex
+import threading
+import time
+
+from typing import Dict
+
+from compose_flow import settings
+from compose_flow.cache import DiskCache, file_digest
+from compose_flow.context import get_context
+
+# one small document per cluster and project
+DIGEST_CACHE_MAX_BYTES = 10 * 1024 * 1024
+
+
+def get_path_digest(path: str) -> str:
+    """
+    Returns the digest of a file or of all the files in a directory
+    """
+    if not os.path.isdir(path):
+        return file_digest(path)
+
+    digest = hashlib.sha256()
+
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+
+        for filename in sorted(filenames):
+            file_path = os.path.join(dirpath, filename)
+
+            digest.update(os.path.relpath(file_path, path).encode("utf8") + b"\0")
+            digest.update(file_digest(file_path).encode("utf8") + b"\n")
+
+    return digest.hexdigest()
+
+
+def get_command_digest(command: str) -> str:
+    """
+    Returns the digest of the command along with the files it references
+    """
+    context = get_context()
+
+    digest = hashlib.sha256(command.encode("utf8"))
+
+    for arg in shlex.split(command):
+        path = context.path(arg)
+        if os.path.exists(path):
+            digest.update(f"\0{arg}\0{get_path_digest(path)}".encode("utf8"))
+
+    return digest.hexdigest()
+
+
+class DeployRecord(object):
+    """
+    The digests of the steps deployed to a cluster
+
+    Each step is recorded as `{"digest": ..., "deployed_at": ...}` by name.
+
+    Args:
+        cache: where the record is kept
+        key: the key of the cluster's record
+        ttl: seconds a recorded step is considered deployed; None keeps it forever
+    """
+
+    def __init__(self, cache: DiskCache, key: str, ttl: float = None):
+        self.cache = cache
+        self.key = key
+        self.ttl = ttl
+
+        self.entries = self._load()
+
+        self._deployed = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, dict]:
+        """
+        Returns the entries of the record that have not expired
+        """
+        entries = (self.cache.get(self.key) or {}) if self.cache else {}
+
+        return {
+            name: entry for name, entry in entries.items() if not self.is_expired(entry)
+        }
+
+    def is_expired(self, entry: dict) -> bool:
+        # entries recorded by earlier versions are bare digests
+        if not isinstance(entry, dict):
+            return True
+
+        return bool(self.ttl) and time.time() - entry["deployed_at"] >= self.ttl
+
+    def is_unchanged(self, name: str, digest: str) -> bool:
+        if digest is None:
+            return False
+
+        entry = self.entries.get(name)
+
+        return (
+            entry is not None
+            and not self.is_expired(entry)
+            and entry["digest"] == digest
+        )
+
+    def deployed(self, name: str, digest: str) -> None:
+        """
+        Records the step as deployed; safe to call from the threads running steps
+        """
+        if digest is None:
+            return
+
+        with self._lock:
+            self._deployed[name] = {"digest": digest, "deployed_at": time.time()}
+
+    def save(self) -> None:
+        if not self.cache or not self._deployed:
+            return
+
+        # only the steps deployed now are renewed, the others keep their deploy time
+        entries = self._load()
+        entries.update(self._deployed)
+
+        self.cache.set(self.key, entries)
+        self.entries = entries
+
+
+def get_record(*scope) -> DeployRecord:
+    """
+    Returns the record of the deploys to the given scope
+    """
+    cache = None
+    if settings.DEPLOY_DIGEST_TTL:
+        # entries expire one by one, see `DeployRecord.is_expired`
+        cache = DiskCache(
+            os.path.join(settings.CACHE_ROOT, "deploy-digests"),
+            max_bytes=DIGEST_CACHE_MAX_BYTES,
+        )
+
+    return DeployRecord(
+        cache, DiskCache.make_key(*scope), ttl=settings.DEPLOY_DIGEST_TTL
+    )
@@ -0,0 +1,130 @@
+"""
+Cache of cluster inventory listings
+
+Listing clusters, namespaces and apps runs the rancher or helm CLI.  Each
+listing is fetched at most once per run, and persisted to the cache for
+`settings.KUBE_INVENTORY_TTL` seconds so that following runs can use it too.
+A process running several commands, e.g. the daemon, forgets the listings it
+holds between them, see `Inventory.clear`.
+Listings are identified by their kind and a scope, e.g. the Rancher project the
+namespaces were listed in, and are invalidated when compose-flow changes what
+they list.
+"""
+import os
+
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, TypeVar
+
+from compose_flow import settings, timings
+from compose_flow.cache import DiskCache
+
+# Dict[str, str]: the ID of each Rancher cluster by name
+CLUSTERS = "clusters"
+
+# List[str]: the namespaces in a Rancher project
+RANCHER_NAMESPACES = "rancher-namespaces"
+
+# List[str]: the apps in a Rancher project
+RANCHER_APPS = "rancher-apps"
+
+# List[str]: the helm releases in a cluster
+HELM_APPS = "helm-apps"
+
+# listings of large clusters can be a few hundred kilobytes
+INVENTORY_CACHE_MAX_BYTES = 10 * 1024 * 1024
+
+T = TypeVar("T")
+
+
+class Inventory(object):
+    """
+    Listings of the resources in clusters
+
+    The `counts` keep track of where listings came from:
+
+    - `process`: the listing was already fetched in this run
+    - `cache`: the listing was read from the cache
+    - `fetched`: the listing was fetched with the CLI
+
+    They are counted for the process and for the run, see `timings.count`.
+    """
+
+    def __init__(self, cache: DiskCache = None):
+        self.cache = cache
+        self.counts = Counter()
+
+        self._listings = {}
+
+    def count(self, name: str) -> None:
+        self.counts[name] += 1
+
+        timings.count("kube listings", name)
+
+    @staticmethod
+    def get_key(kind: str, scope: str) -> str:
+        return DiskCache.make_key(kind, scope)
+
+    def get(self, kind: str, scope: str, fetch: Callable[[], T]) -> T:
+        """
+        Returns the listing of the given kind in the scope
+
+        Args:
+            kind: the kind of listing
+            scope: where the listing comes from
+            fetch: returns the listing when it is not cached
+        """
+        key = self.get_key(kind, scope)
+
+        if key in self._listings:
+            self.count("process")
+
+            return self._listings[key]
+
+        listing = self.cache.get(key) if self.cache else None
+        if listing is None:
+            self.count("fetched")
+
+            listing = fetch()
+
+            if self.cache:
+                self.cache.set(key, listing)
+        else:
+            self.count("cache")
+
+        self._listings[key] = listing
+
+        return listing
+
+    def invalidate(self, kind: str, scope: str) -> None:
+        """
+        Discards the listing so that it is fetched again on its next use
+        """
+        key = self.get_key(kind, scope)
+
+        self._listings.pop(key, None)
+
+        if self.cache:
+            self.cache.remove(key)
+
+    def clear(self) -> None:
+        """
+        Forgets the listings held in memory; those in the cache are kept until they expire
+        """
+        self._listings.clear()
+
+
+@lru_cache()
+def get_inventory() -> Inventory:
+    """
+    Returns the inventory for this process
+    """
+    cache = None
+    if settings.KUBE_INVENTORY_TTL:
+        cache = DiskCache(
+            os.path.join(settings.CACHE_ROOT, "kube-inventory"),
+            max_bytes=INVENTORY_CACHE_MAX_BYTES,
+            ttl=settings.KUBE_INVENTORY_TTL,
+        )
+
+    return Inventory(cache=cache)
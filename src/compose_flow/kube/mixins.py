@@ -4,11 +4,8 @@
 Compose subcommand
 """
 import base64
-from functools import lru_cache
 import os
-import pathlib
 import sh
-import shutil
 import typing
 from typing import List
 import urllib
@@ -17,13 +14,30 @@ import yaml
 
 from compose_flow import errors
 from compose_flow.config import get_config
+from compose_flow.context import get_context
 from compose_flow.kube.checks import (
     BaseChecker,
     ManifestChecker,
     AnswersChecker,
     ValuesChecker,
 )
-from compose_flow.utils import render, render_jinja, get_kv, yaml_dump, yaml_load
+from compose_flow.kube import inventory
+from compose_flow.kube.context import (
+    KUBE,
+    RANCHER,
+    get_kube_config_paths,
+    get_rancher_server,
+    get_tracker,
+)
+from compose_flow.kube.render import ManifestRenderer, render_directory
+from compose_flow.utils import (
+    YAML_SAFE_LOADER,
+    cached_method,
+    cached_property,
+    render,
+    yaml_dump,
+    yaml_load,
+)
 
 CLUSTER_LS_FORMAT = "{{.Cluster.Name}}: {{.Cluster.ID}}"
 PROJECT_LS_FORMAT = "{{.Project.Name}}: {{.Project.ID}}"
@@ -55,13 +69,11 @@ class KubeMixIn(object):
 
     kubectl_command = "rancher kubectl"
 
-    @property
-    @lru_cache()
+    @cached_property
     def config(self):
         return get_config(self.workflow)
 
-    @property
-    @lru_cache()
+    @cached_property
     def rendered_config(self):
         return render_config(self.workflow, self.config)
 
@@ -131,14 +143,16 @@ class KubeMixIn(object):
 
         If not found, attempt to create it.
         """
-        namespaces = self.execute("rancher namespace ls --quiet").strip().split("\n")
-
-        if self.namespace not in namespaces:
+        if self.namespace not in self.list_rancher_namespaces():
             self.logger.warning(
                 "Namespace '%s' not found - attempting to create it...", self.namespace
             )
             self.execute(f"rancher namespaces create {self.namespace}")
 
+            inventory.get_inventory().invalidate(
+                inventory.RANCHER_NAMESPACES, self.rancher_scope
+            )
+
     # Secret management methods for use by Backends
     def _list_secrets(self):
         return self.execute(
@@ -168,7 +182,7 @@ class KubeMixIn(object):
 
             raise
 
-        secret_yaml = yaml.safe_load(raw_secret.stdout)
+        secret_yaml = yaml.load(raw_secret.stdout, Loader=YAML_SAFE_LOADER)
         payload = secret_yaml.get("data")
         if not payload or "_env" not in payload:
             raise errors.NoSuchConfig("secret name={self.secret_name} is empty")
@@ -179,7 +193,7 @@ class KubeMixIn(object):
         """
         Saves an environment into a Secret
         """
-        with open(path, "r") as stream:
+        with open(get_context(self.workflow).path(path), "r") as stream:
             b64_env = base64.b64encode(stream.read().encode()).decode("utf8")
 
         patch_string = f'{{"data": {{"{self.env_key}": "{b64_env}"}}}}'
@@ -207,14 +221,34 @@ class KubeMixIn(object):
         )
 
     # Native Kube context management logic
+    @property
+    def kube_context_name(self) -> str:
+        """
+        The kubectl context for the target environment
+        """
+        profile_name = self.workflow.args.profile
+        context_mapping = self.config.get("kubecontexts", {})
+
+        return context_mapping.get(profile_name, profile_name)
+
+    @property
+    def kube_scope(self) -> str:
+        """
+        The scope of inventory listings made with kubectl and helm
+        """
+        return f"{os.pathsep.join(get_kube_config_paths())}/{self.kube_context_name}"
+
     def switch_kube_context(self):
         """
         Switch current kubectl context to target specified cluster based on environment
         """
         profile_name = self.workflow.args.profile
-        context_mapping = self.config.get("kubecontexts", {})
+        target_context = self.kube_context_name
+
+        tracker = get_tracker()
+        if tracker.is_current(KUBE, target_context):
+            return
 
-        target_context = context_mapping.get(profile_name, profile_name)
         try:
             self.execute(f"kubectl config use-context {target_context}")
         except sh.ErrorReturnCode_1:  # pylint: disable=E1101
@@ -225,10 +259,16 @@ class KubeMixIn(object):
                 "in the 'kubecontexts' section of compose-flow.yml".format(profile_name)
             )
 
+        tracker.record(KUBE, target_context)
+
     # Rancher context management logic
     @property
-    @lru_cache()
     def cluster_listing(self):
+        return inventory.get_inventory().get(
+            inventory.CLUSTERS, get_rancher_server(), self._list_clusters
+        )
+
+    def _list_clusters(self) -> dict:
         cluster_ls_command = f"rancher cluster ls --format '{CLUSTER_LS_FORMAT}'"
         output = str(self.execute(cluster_ls_command)).strip()
         for err in NONFATAL_ERROR_MESSAGES:
@@ -290,6 +330,13 @@ class KubeMixIn(object):
                 "to use Rancher as a backend or deployment target!"
             )
 
+    @property
+    def rancher_scope(self) -> str:
+        """
+        The scope of inventory listings made with the rancher CLI within a project
+        """
+        return f"{get_rancher_server()}/{self.cluster_name}/{self.project_name}"
+
     def switch_rancher_context(self):
         """
         Switch Rancher CLI context to target specified cluster based on environment
@@ -298,12 +345,20 @@ class KubeMixIn(object):
         # Get the project name specified in compose-flow.yml
         target_project_name = self.project_name
 
+        target_context = f"{self.cluster_name}/{target_project_name}"
+
+        tracker = get_tracker()
+        if tracker.is_current(RANCHER, target_context):
+            return
+
         current_context = self.execute("rancher context current").strip().split(" ")
         correct_cluster = current_context[0] == f"Cluster:{self.cluster_name}"
         correct_project = current_context[1] == f"Project:{target_project_name}"
 
         if correct_cluster and correct_project:
             # Don't do anything if context is already correct
+            tracker.record(RANCHER, target_context, switched=False)
+
             return
 
         base_context_switch_command = "rancher context switch "
@@ -331,6 +386,8 @@ class KubeMixIn(object):
             else:
                 raise
 
+        tracker.record(RANCHER, target_context)
+
     # YAML rendering and deployment methods
     def get_app_deploy_command(self, app: dict, target: str = "rancher") -> str:
         """
@@ -377,12 +434,38 @@ class KubeMixIn(object):
                 app_name, rendered_path, namespace, chart, version, use_answers
             )
         else:
+            # the app listing is stale once the install command is run
+            self._app_installs = getattr(self, "_app_installs", set()) | {target}
+
             return install_command_method(
                 app_name, rendered_path, namespace, chart, version, use_answers
             )
 
+    def invalidate_app_listings(self) -> None:
+        """
+        Discards the app listings that apps were installed into since the last call
+        """
+        for target in getattr(self, "_app_installs", ()):
+            if target == "helm":
+                inventory.get_inventory().invalidate(
+                    inventory.HELM_APPS, self.kube_scope
+                )
+            else:
+                inventory.get_inventory().invalidate(
+                    inventory.RANCHER_APPS, self.rancher_scope
+                )
+
+        self._app_installs = set()
+
+    def _list_lines(self, command: str) -> List[str]:
+        return str(self.execute(command)).split("\n")
+
     def list_helm_apps(self) -> List[str]:
-        return str(self.execute("helm ls -q --all --all-namespaces")).split("\n")
+        return inventory.get_inventory().get(
+            inventory.HELM_APPS,
+            self.kube_scope,
+            lambda: self._list_lines("helm ls -q --all --all-namespaces"),
+        )
 
     def get_helm_app_install_command(
         self,
@@ -414,7 +497,11 @@ class KubeMixIn(object):
         return str(self.execute(f"{self.kubectl_command} get pods {namespace_command}"))
 
     def list_rancher_apps(self) -> List[str]:
-        return str(self.execute("rancher apps ls --format '{{.App.Name}}'")).split("\n")
+        return inventory.get_inventory().get(
+            inventory.RANCHER_APPS,
+            self.rancher_scope,
+            lambda: self._list_lines("rancher apps ls --format '{{.App.Name}}'"),
+        )
 
     def get_rancher_app_install_command(
         self,
@@ -452,9 +539,13 @@ class KubeMixIn(object):
         return cmd + f" {app_name} {version}"
 
     def list_rancher_namespaces(self) -> List[str]:
-        return str(
-            self.execute("rancher namespaces ls --format '{{.Namespace.ID}}'")
-        ).split("\n")
+        return inventory.get_inventory().get(
+            inventory.RANCHER_NAMESPACES,
+            self.rancher_scope,
+            lambda: self._list_lines(
+                "rancher namespaces ls --format '{{.Namespace.ID}}'"
+            ),
+        )
 
     def create_rancher_namespace(self, namespace, dry_run=False):
         creation_command = f"rancher namespaces create {namespace}"
@@ -472,6 +563,10 @@ class KubeMixIn(object):
                 else:
                     raise
 
+            inventory.get_inventory().invalidate(
+                inventory.RANCHER_NAMESPACES, self.rancher_scope
+            )
+
     def upsert_rancher_namespaces(self, dry_run) -> str:
         namespaces = self.get_rancher_namespaces()
         existing = self.list_rancher_namespaces()
@@ -507,10 +602,11 @@ class KubeMixIn(object):
             self.logger.info("Skip rendering for URL manifest %s", raw_path)
             command += raw_path
         else:
-            if os.path.isdir(raw_path):
+            path = get_context(self.workflow).path(raw_path)
+            if os.path.isdir(path):
                 rendered_path = self.render_nested_manifests(raw_path, raw)
                 command += rendered_path + " --recursive"
-            elif os.path.isfile(raw_path):
+            elif os.path.isfile(path):
                 rendered_path = self.render_manifest(raw_path, raw)
                 command += rendered_path
             else:
@@ -579,6 +675,13 @@ class KubeMixIn(object):
     def get_values_filename(self, app_name: str) -> str:
         return f"compose-flow-{self.cluster_name}-{app_name}-values.yml"
 
+    @property
+    def render_env(self) -> dict:
+        """
+        The environment manifests are rendered with
+        """
+        return self.workflow.environment.resolved.values
+
     def render_single_yaml(
         self,
         input_path: str,
@@ -590,29 +693,19 @@ class KubeMixIn(object):
         Read in single YAML file from specified path, render environment variables,
         then write out to a known location in the working dir.
         """
-        self.logger.info("Rendering YAML at %s to %s", input_path, output_path)
+        env = None if raw else self.render_env
 
-        with open(input_path, "r") as fh:
-            content = fh.read()
+        renderer = ManifestRenderer(env, checker=checker, raw=raw)
 
-        if not raw:
-            env = dict(get_kv(self.workflow.environment.render(), multiple=True))
+        context = get_context(self.workflow)
 
-            rendered = render(content, env=env)
-            rendered = render_jinja(rendered, env=env)
-        else:
-            rendered = content
-
-        if checker:
-            check_errors = checker.check(rendered)
-
-            if check_errors:
-                raise errors.ManifestCheck("\n".join(check_errors))
-
-        with open(output_path, "w") as fh:
-            fh.write(rendered)
+        result = renderer.render_file(
+            context.path(input_path), context.path(output_path)
+        )
+        if result.errors:
+            raise errors.ManifestCheck("\n".join(result.errors))
 
-    @lru_cache()
+    @cached_method
     def render_manifest(self, manifest_path: str, raw: bool) -> str:
         """Render the specified manifest YAML and return the path to the rendered file."""
         rendered_path = self.get_manifest_filename(manifest_path)
@@ -620,26 +713,28 @@ class KubeMixIn(object):
 
         return rendered_path
 
-    @lru_cache()
+    @cached_method
     def render_nested_manifests(self, dir_path: str, raw: bool) -> str:
-        directory = pathlib.Path(dir_path)
-        manifests = directory.glob("**/*.y*ml")
         rendered_path = self.get_manifest_filename(dir_path)
 
-        # reset rendered_path to avoid deploying lingering files
-        if os.path.isdir(rendered_path):
-            shutil.rmtree(rendered_path)
+        env = None if raw else self.render_env
+
+        context = get_context(self.workflow)
+
+        rendered = render_directory(
+            context.path(dir_path),
+            context.path(rendered_path),
+            env,
+            checker=ManifestChecker(),
+            raw=raw,
+        )
 
-        for manifest in manifests:
-            render_dest = os.path.join(rendered_path, str(manifest).lstrip(dir_path))
-            print(render_dest)
-            parent_dest = os.path.dirname(render_dest)
+        for relative_path in rendered:
+            print(os.path.join(rendered_path, relative_path))
 
-            os.makedirs(parent_dest, mode=0o750, exist_ok=True)
-            self.render_single_yaml(manifest, render_dest, ManifestChecker(), raw)
         return rendered_path
 
-    @lru_cache()
+    @cached_method
     def render_answers(self, answers_path: str, app_name: str, raw: bool) -> str:
         """Render the specified manifest YAML and return the path to the rendered file."""
         rendered_path = self.get_answers_filename(app_name)
@@ -647,7 +742,7 @@ class KubeMixIn(object):
 
         return rendered_path
 
-    @lru_cache()
+    @cached_method
     def render_values(self, answers_path: str, app_name: str, raw: bool) -> str:
         """Render the specified manifest YAML and return the path to the rendered file."""
         rendered_path = self.get_values_filename(app_name)
@@ -0,0 +1,379 @@
+"""
+Manifest rendering
+
+Manifests are rendered with the environment variable substitutions and then
+Jinja, checked, and written out.  The environment and the Jinja environment are
+set up once per process, so rendering a tree of manifests only pays for
+reading, rendering and checking each file.
+
+Large trees are rendered in a pool of processes.  Outputs are written to a
+temp file and moved in place, so a partially written manifest is never left
+behind.
+
+Rendering a directory is incremental.  A state file next to the rendered
+directory records, for each manifest, the digest of its content, the variables
+it references along with the digest of their values, and the digest of the
+rendered output.  Manifests whose entry still matches are neither rendered nor
+checked again, and outputs whose manifest no longer exists are removed.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import pathlib
+import shutil
+import tempfile
+
+from typing import Iterable, List, NamedTuple
+
+from compose_flow import errors, settings
+from compose_flow.cache import file_digest
+from compose_flow.kube.checks import BaseChecker
+from compose_flow.template import get_template
+from compose_flow.utils import get_jinja_environment, render
+
+# content without any of these is not a Jinja template
+JINJA_MARKERS = ("{{", "{%", "{#")
+
+# below this many files, rendering in the current process is faster than starting a pool
+PARALLEL_MIN_FILES = 16
+
+# bump when the rendering changes so that existing state is discarded
+RENDER_STATE_VERSION = 1
+
+
+class RenderJob(NamedTuple):
+    input_path: str
+    output_path: str
+
+
+class RenderResult(NamedTuple):
+    job: RenderJob
+
+    # check errors; the output is not written when there are any
+    errors: List[str]
+
+    # names of the variables the manifest references
+    variables: List[str]
+
+    # sha256 of the rendered output
+    digest: str
+
+
+def get_logger():
+    return logging.getLogger(__name__)
+
+
+class ManifestRenderer(object):
+    """
+    Renders, checks and writes manifests with a fixed environment
+    """
+
+    def __init__(self, env: dict, checker: BaseChecker = None, raw: bool = False):
+        self.env = env
+        self.checker = checker
+        self.raw = raw
+
+    @property
+    def logger(self):
+        return logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+
+    def render(self, content: str) -> tuple:
+        """
+        Returns the rendered content along with the names of the variables referenced
+        """
+        if self.raw:
+            return content, []
+
+        variables = set()
+
+        if "${" in content:
+            variables.update(x.name for x in get_template(content).variables)
+
+            content = render(content, env=self.env)
+
+        # compiling a template is the most expensive step, skip it when there is nothing to render
+        if not any(x in content for x in JINJA_MARKERS):
+            return content, sorted(variables)
+
+        from jinja2 import meta
+
+        jinja_env = get_jinja_environment()
+        ast = jinja_env.parse(content)
+
+        variables.update(meta.find_undeclared_variables(ast))
+
+        return jinja_env.from_string(ast).render(self.env), sorted(variables)
+
+    def render_file(self, input_path: str, output_path: str) -> RenderResult:
+        """
+        Renders the input file to the output path
+        """
+        self.logger.info("Rendering YAML at %s to %s", input_path, output_path)
+
+        job = RenderJob(input_path, output_path)
+
+        with open(input_path, "r") as fh:
+            content = fh.read()
+
+        rendered, variables = self.render(content)
+
+        if self.checker:
+            check_errors = self.checker.check(rendered)
+            if check_errors:
+                return RenderResult(job, check_errors, variables, None)
+
+        write_file(output_path, rendered)
+
+        digest = hashlib.sha256(rendered.encode("utf8")).hexdigest()
+
+        return RenderResult(job, [], variables, digest)
+
+
+def write_file(path: str, content: str) -> None:
+    """
+    Writes the content to a temp file in the destination directory and moves it in place
+    """
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=".compose-flow-", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as fh:
+            fh.write(content)
+
+        # mkstemp creates files only readable by the owner
+        os.chmod(temp_path, 0o644)
+
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+
+        raise
+
+
+# the renderer in a pool worker process, set up once by _init_worker
+_worker_renderer = None
+
+
+def _init_worker(env: dict, checker: BaseChecker, raw: bool) -> None:
+    global _worker_renderer
+
+    _worker_renderer = ManifestRenderer(env, checker=checker, raw=raw)
+
+
+def _render_job(job: RenderJob) -> RenderResult:
+    return _worker_renderer.render_file(job.input_path, job.output_path)
+
+
+def render_files(
+    jobs: Iterable[RenderJob],
+    env: dict,
+    checker: BaseChecker = None,
+    raw: bool = False,
+    workers: int = None,
+) -> List[RenderResult]:
+    """
+    Renders the given files, in a pool of processes when there are enough of them
+
+    Args:
+        jobs: the files to render
+        env: the environment to render with
+        checker: the checker to run against every rendered file
+        raw: when True, files are copied without rendering
+        workers: the number of processes, `settings.RENDER_WORKERS` by default
+
+    Returns:
+        the result for each job, in order
+
+    Raises:
+        ManifestCheck listing the errors of every file that failed its checks
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+
+    workers = min(workers or settings.RENDER_WORKERS, len(jobs))
+
+    if workers <= 1 or len(jobs) < PARALLEL_MIN_FILES:
+        renderer = ManifestRenderer(env, checker=checker, raw=raw)
+
+        results = [renderer.render_file(x.input_path, x.output_path) for x in jobs]
+    else:
+        with multiprocessing.Pool(
+            workers, initializer=_init_worker, initargs=(env, checker, raw)
+        ) as pool:
+            chunksize = max(1, len(jobs) // (workers * 4))
+
+            results = pool.map(_render_job, jobs, chunksize=chunksize)
+
+    check_errors = []
+    for result in results:
+        check_errors.extend(f"{result.job.input_path}: {x}" for x in result.errors)
+
+    if check_errors:
+        raise errors.ManifestCheck("\n".join(check_errors))
+
+    return results
+
+
+def get_env_digest(env: dict, variables: Iterable[str]) -> str:
+    """
+    Returns a digest of the values of the given variables
+    """
+    env = env or {}
+    values = [[x, env.get(x)] for x in sorted(variables)]
+
+    return hashlib.sha256(json.dumps(values).encode("utf8")).hexdigest()
+
+
+def get_state_path(rendered_path: str) -> str:
+    """
+    Returns the path of the state file for a rendered directory
+
+    The state is kept next to the directory rather than in it so that it is not
+    applied along with the manifests.
+    """
+    rendered_path = os.path.normpath(rendered_path)
+
+    return os.path.join(
+        os.path.dirname(rendered_path),
+        f".{os.path.basename(rendered_path)}.render.json",
+    )
+
+
+def load_state(path: str) -> dict:
+    try:
+        with open(path, "r") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        get_logger().warning(f"ignoring corrupt render state {path}")
+
+        return {}
+
+
+def prune(rendered_path: str, keep: set) -> List[str]:
+    """
+    Removes files that are not in `keep` from the rendered directory, along with empty directories
+
+    Returns:
+        the relative paths of the removed files
+    """
+    removed = []
+
+    for dirpath, dirnames, filenames in os.walk(rendered_path, topdown=False):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            relative_path = os.path.relpath(path, rendered_path)
+
+            if relative_path not in keep:
+                os.remove(path)
+
+                removed.append(relative_path)
+
+        if dirpath != rendered_path and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+    return sorted(removed)
+
+
+def render_directory(
+    source_path: str,
+    rendered_path: str,
+    env: dict,
+    checker: BaseChecker = None,
+    raw: bool = False,
+    workers: int = None,
+) -> List[str]:
+    """
+    Renders the manifests under `source_path` into `rendered_path`
+
+    Only manifests that changed since the previous render, or that reference
+    variables whose values changed, are rendered and checked.  The rendered files
+    are moved into `rendered_path` once all of them passed their checks, so a
+    failed render leaves the previous render in place.
+
+    Returns:
+        the relative paths of the manifests that were rendered
+
+    Raises:
+        ManifestCheck listing the errors of every file that failed its checks
+    """
+    state_path = get_state_path(rendered_path)
+    state_key = {
+        "checker": checker.__class__.__name__ if checker else None,
+        "raw": raw,
+        "version": RENDER_STATE_VERSION,
+    }
+
+    state = load_state(state_path)
+    previous = {}
+    if state.get("key") == state_key and os.path.isdir(rendered_path):
+        previous = state.get("files", {})
+
+    relative_paths = sorted(
+        os.path.relpath(str(x), source_path)
+        for x in pathlib.Path(source_path).glob("**/*.y*ml")
+    )
+
+    files = {}
+    changed = []
+    for relative_path in relative_paths:
+        input_digest = file_digest(os.path.join(source_path, relative_path))
+
+        entry = previous.get(relative_path)
+        is_current = (
+            entry is not None
+            and entry["input"] == input_digest
+            and entry["env"] == get_env_digest(env, entry["variables"])
+            and entry["output"]
+            == file_digest(os.path.join(rendered_path, relative_path))
+        )
+        if is_current:
+            files[relative_path] = entry
+        else:
+            changed.append((relative_path, input_digest))
+
+    get_logger().info(
+        f"rendering {len(changed)} of {len(relative_paths)} manifests in {source_path}"
+    )
+
+    os.makedirs(rendered_path, mode=0o750, exist_ok=True)
+
+    temp_path = tempfile.mkdtemp(
+        dir=os.path.dirname(os.path.normpath(rendered_path)) or ".",
+        prefix=f".{os.path.basename(os.path.normpath(rendered_path))}-",
+    )
+    try:
+        jobs = []
+        for relative_path, _ in changed:
+            temp_dest = os.path.join(temp_path, relative_path)
+            os.makedirs(os.path.dirname(temp_dest), exist_ok=True)
+
+            jobs.append(RenderJob(os.path.join(source_path, relative_path), temp_dest))
+
+        results = render_files(jobs, env, checker=checker, raw=raw, workers=workers)
+
+        for (relative_path, input_digest), result in zip(changed, results):
+            dest = os.path.join(rendered_path, relative_path)
+            os.makedirs(os.path.dirname(dest), mode=0o750, exist_ok=True)
+
+            os.replace(result.job.output_path, dest)
+
+            files[relative_path] = {
+                "env": get_env_digest(env, result.variables),
+                "input": input_digest,
+                "output": result.digest,
+                "variables": result.variables,
+            }
+    finally:
+        shutil.rmtree(temp_path)
+
+    for relative_path in prune(rendered_path, set(relative_paths)):
+        get_logger().info(f"removed stale {os.path.join(rendered_path, relative_path)}")
+
+    write_file(state_path, json.dumps({"files": files, "key": state_key}, indent=2))
+
+    return [x for x, _ in changed]
@@ -0,0 +1,307 @@
+"""
+Concurrent execution of deploy steps
+
+Steps are run wave by wave: a wave starts once every step of the previous wave
+finished.  Within a wave, a step starts once the steps it depends on finished:
+
+- the steps named in its `depends_on`
+- the steps listed before it in the same `group`
+
+Steps whose dependencies are met run concurrently.  A step that has nothing to
+do, e.g. because its output is already deployed, still counts as finished for
+the steps depending on it.
+
+Once a step fails no more steps are started; steps that are already running are
+left to finish and the remaining ones are reported as skipped.
+"""
+import sys
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, NamedTuple, Set, Tuple
+
+from compose_flow import errors
+from compose_flow.context import bind
+
+# the waves apps and manifests are deployed in unless configured otherwise
+APPS_WAVE = 1
+MANIFESTS_WAVE = 2
+
+OK = "ok"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class Step(NamedTuple):
+    command: str
+
+    # referenced by `depends_on`, prefixed to the step's output and used in the summary
+    name: str
+
+    wave: int = APPS_WAVE
+
+    # steps in the same group and wave run in the order they are listed
+    group: str = None
+
+    # names of the steps that must finish before this one starts
+    depends_on: Tuple[str, ...] = ()
+
+    # digest of what the step deploys, None when it cannot be known in advance
+    digest: str = None
+
+
+class StepResult(NamedTuple):
+    step: Step
+    status: str
+    duration: float = 0.0
+    error: str = None
+
+
+_output_lock = threading.Lock()
+
+
+def get_output(name: str, stream=None) -> Callable[[str], None]:
+    """
+    Returns a callback that writes lines of output prefixed with the step name
+    """
+
+    def write(line: str) -> None:
+        with _output_lock:
+            (stream or sys.stdout).write(f"[{name}] {line.rstrip()}\n")
+
+    return write
+
+
+def get_dependencies(steps: List[Step]) -> Dict[int, Set[int]]:
+    """
+    Returns the indexes of the steps each step waits for within its wave
+
+    Raises:
+        InvalidDeployPlan when a step depends on a missing step or on a step in a later wave
+    """
+    indexes = {}
+    for idx, step in enumerate(steps):
+        indexes.setdefault(step.name, []).append(idx)
+
+    dependencies = {}
+    last_in_group = {}
+
+    for idx, step in enumerate(steps):
+        dependencies[idx] = set()
+
+        for name in step.depends_on:
+            if name not in indexes:
+                raise errors.InvalidDeployPlan(
+                    f"{step.name} depends on {name}, which is not deployed"
+                )
+
+            for dependency in indexes[name]:
+                wave = steps[dependency].wave
+                if wave > step.wave:
+                    raise errors.InvalidDeployPlan(
+                        f"{step.name} in wave {step.wave} depends on {name} "
+                        f"in the later wave {wave}"
+                    )
+
+                # steps in earlier waves have finished by the time the wave starts
+                if wave == step.wave:
+                    dependencies[idx].add(dependency)
+
+        if step.group is not None:
+            key = (step.wave, step.group)
+            if key in last_in_group:
+                dependencies[idx].add(last_in_group[key])
+
+            last_in_group[key] = idx
+
+    return dependencies
+
+
+def get_order(steps: List[Step], dependencies: Dict[int, Set[int]]) -> List[int]:
+    """
+    Returns the step indexes in an order that satisfies the dependencies
+
+    Steps are ordered by wave and then kept in the order they are listed as far
+    as their dependencies allow.
+
+    Raises:
+        InvalidDeployPlan when steps depend on each other in a loop
+    """
+    order = []
+    done = set()
+
+    for wave in sorted(set(x.wave for x in steps)):
+        pending = [idx for idx, step in enumerate(steps) if step.wave == wave]
+
+        while pending:
+            ready = [x for x in pending if dependencies[x] <= done]
+            if not ready:
+                raise errors.InvalidDeployPlan(
+                    f"circular depends_on: {format_cycle(steps, dependencies, pending)}"
+                )
+
+            # one at a time so that listed order wins among steps that are ready
+            order.append(ready[0])
+            done.add(ready[0])
+            pending.remove(ready[0])
+
+    return order
+
+
+def format_cycle(
+    steps: List[Step], dependencies: Dict[int, Set[int]], pending: List[int]
+) -> str:
+    """
+    Returns the names of steps in a loop found among the pending steps
+    """
+    path = [pending[0]]
+
+    # every pending step waits for another pending step, follow them until one repeats
+    while True:
+        idx = min(x for x in dependencies[path[-1]] if x in pending)
+        if idx in path:
+            chain = path[path.index(idx) :] + [idx]
+
+            return " -> ".join(steps[x].name for x in chain)
+
+        path.append(idx)
+
+
+def format_plan(steps: List[Step], notes: Dict[str, str] = None) -> str:
+    """
+    Returns the order the steps are deployed in, wave by wave
+
+    Args:
+        steps: the steps
+        notes: text to show next to the steps, by step name
+    """
+    notes = notes or {}
+
+    dependencies = get_dependencies(steps)
+
+    lines = []
+    wave = None
+    for idx in get_order(steps, dependencies):
+        step = steps[idx]
+
+        if step.wave != wave:
+            wave = step.wave
+            lines.append(f"wave {wave}:")
+
+        line = f"  {step.name}"
+
+        after = sorted(set(steps[x].name for x in dependencies[idx]))
+        if after:
+            line += f" (after {', '.join(after)})"
+        if step.name in notes:
+            line += f" [{notes[step.name]}]"
+
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+def format_summary(results: List[StepResult]) -> str:
+    lines = []
+    for result in results:
+        line = f"{result.status:<8} {result.step.name}"
+
+        if result.status not in (SKIPPED, UNCHANGED):
+            line += f" ({result.duration:.1f}s)"
+        if result.error:
+            line += f": {result.error}"
+
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+def run_steps(
+    steps: List[Step], run: Callable[[Step], str], workers: int = 1
+) -> List[StepResult]:
+    """
+    Runs the steps
+
+    Args:
+        steps: the steps to run
+        run: runs a single step, raising an exception when it fails; it may return
+            UNCHANGED when the step had nothing to do
+        workers: the number of steps to run at the same time
+
+    Returns:
+        the result of each step, in order
+
+    Raises:
+        InvalidDeployPlan when the dependencies between steps cannot be satisfied
+        DeployFailed with a summary of the results when a step fails
+    """
+    dependencies = get_dependencies(steps)
+    order = get_order(steps, dependencies)
+
+    results = {}
+    failed = threading.Event()
+
+    def run_step(idx: int) -> None:
+        step = steps[idx]
+
+        start = time.perf_counter()
+        try:
+            status = run(step) or OK
+        except Exception as exc:
+            failed.set()
+
+            error = str(exc).strip().splitlines()
+            results[idx] = StepResult(
+                step,
+                FAILED,
+                time.perf_counter() - start,
+                error[0] if error else exc.__class__.__name__,
+            )
+        else:
+            results[idx] = StepResult(step, status, time.perf_counter() - start)
+
+    if workers <= 1:
+        for idx in order:
+            if failed.is_set():
+                break
+
+            run_step(idx)
+    else:
+        for wave in sorted(set(x.wave for x in steps)):
+            if failed.is_set():
+                break
+
+            pending = [x for x in order if steps[x].wave == wave]
+            done = set()
+            running = {}
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                while pending or running:
+                    ready = []
+                    if not failed.is_set():
+                        ready = [x for x in pending if dependencies[x] <= done]
+
+                    for idx in ready:
+                        pending.remove(idx)
+                        running[executor.submit(bind(run_step), idx)] = idx
+
+                    if not running:
+                        break
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        # surface errors in run_step itself rather than losing them
+                        future.result()
+
+                        done.add(running.pop(future))
+
+    ordered = [
+        results.get(idx) or StepResult(step, SKIPPED) for idx, step in enumerate(steps)
+    ]
+
+    if failed.is_set():
+        raise errors.DeployFailed(f"deploy failed:\n{format_summary(ordered)}")
+
+    return ordered
@@ -17,3 +17,64 @@ USER = os.environ.get("USER", "nobody")
 DEFAULT_CF_REMOTE_USER = os.environ.get("CF_REMOTE_USER", USER)
 
 DOCKER_IMAGE_PREFIX = os.environ.get("CF_DOCKER_IMAGE_PREFIX", "localhost.localdomain")
+
+CACHE_ROOT = os.environ.get("CF_CACHE_ROOT", os.path.join(APP_CONFIG_ROOT, "cache"))
+
+# setting the max size to 0 disables the compiled profile cache
+PROFILE_CACHE_MAX_BYTES = int(
+    os.environ.get("CF_PROFILE_CACHE_MAX_BYTES", 50 * 1024 * 1024)
+)
+
+# how long to reuse a version generated by tag-version for a clean working copy;
+# setting this to 0 disables the version cache
+TAG_VERSION_CACHE_TTL = int(os.environ.get("CF_TAG_VERSION_CACHE_TTL", 24 * 60 * 60))
+
+# read the git repository state from the .git directory instead of running git
+GIT_READ_FILES = os.environ.get("CF_GIT_READ_FILES", "").lower() in ("1", "true", "yes")
+
+# talk to the docker daemon through its API when DOCKER_HOST is a unix socket or tcp address
+# instead of running the docker cli for every operation
+DOCKER_API = os.environ.get("CF_DOCKER_API", "1").lower() not in ("0", "false", "no")
+DOCKER_API_TIMEOUT = float(os.environ.get("CF_DOCKER_API_TIMEOUT", 60))
+
+# threads used to inspect services one by one when they cannot be inspected in bulk
+DOCKER_INSPECT_WORKERS = int(os.environ.get("CF_DOCKER_INSPECT_WORKERS", 8))
+
+# processes used to render trees of kubernetes manifests
+RENDER_WORKERS = int(os.environ.get("CF_RENDER_WORKERS", os.cpu_count() or 1))
+
+# how long to trust the rancher and kubectl contexts compose-flow last switched to while
+# their config files are unchanged; setting this to 0 only tracks them within a run
+KUBE_CONTEXT_TTL = int(os.environ.get("CF_KUBE_CONTEXT_TTL", 5 * 60))
+
+# how long to reuse listings of rancher clusters, namespaces and apps and of helm releases;
+# setting this to 0 only reuses them within a run
+KUBE_INVENTORY_TTL = int(os.environ.get("CF_KUBE_INVENTORY_TTL", 60))
+
+# number of apps and manifests deployed at the same time by default
+DEPLOY_WORKERS = int(os.environ.get("CF_DEPLOY_WORKERS", 4))
+
+# how long deploys skip apps and manifests whose rendered output was already deployed;
+# setting this to 0 deploys everything every time
+DEPLOY_DIGEST_TTL = int(os.environ.get("CF_DEPLOY_DIGEST_TTL", 24 * 60 * 60))
+
+# append a line of JSON to this file for every command run
+TRACE_FILE = os.environ.get("CF_TRACE_FILE")
+
+# how long `remote connect` keeps an idle ssh tunnel open, in ssh's ControlPersist format,
+# e.g. `30m`; `yes` keeps it open until `remote close`
+REMOTE_CONTROL_PERSIST = os.environ.get("CF_REMOTE_CONTROL_PERSIST", "yes")
+
+# seconds to wait for docker to answer through the ssh tunnel
+REMOTE_PING_TIMEOUT = float(os.environ.get("CF_REMOTE_PING_TIMEOUT", 2))
+REMOTE_CONNECT_TIMEOUT = float(os.environ.get("CF_REMOTE_CONNECT_TIMEOUT", 15))
+
+# number of environments a command given several environments with `-e` runs in at the same time
+FANOUT_WORKERS = int(os.environ.get("CF_FANOUT_WORKERS", 4))
+
+# unix socket of the compose-flow daemon started with `compose-flow-daemon`; when set,
+# commands are handed to the daemon listening on it and run locally when none is
+DAEMON_SOCKET = os.environ.get("CF_DAEMON_SOCKET")
+
+# seconds the daemon waits for a command before exiting; 0 keeps it running
+DAEMON_IDLE_TIMEOUT = float(os.environ.get("CF_DAEMON_IDLE_TIMEOUT", 60 * 60))
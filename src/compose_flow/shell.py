@@ -1,13 +1,18 @@
-import os
 import sh
 import shlex
 
+from compose_flow import timings
+from compose_flow.context import get_context
+
+from sh import ErrorReturnCode
 from sh import ErrorReturnCode_1  # noqa: F401 pylint: disable=E1101
 
 # these runtime environment variables should be injected into
 # the compose flow environment prior to executing a command
 OS_ENV_INCLUDES = (
     "DOCKER_HOST",
+    "DOCKER_TLS_VERIFY",
+    "DOCKER_CERT_PATH",
     "HOME",
     "PATH",
     "USER",
@@ -22,19 +27,51 @@ OS_ENV_INCLUDES = (
 def execute(command: str, env, **kwargs):
     """
     Executes a shell command
+
+    The command runs in the working directory of the active workflow context,
+    with the `OS_ENV_INCLUDES` variables of the context's environment.
     """
     command_split = shlex.split(command)
 
+    context = get_context()
+
     # make a copy of the environment and inject the DOCKER_HOST
     _env = env.copy()
 
     for env_var in OS_ENV_INCLUDES:
-        env_val = os.environ.get(env_var)
+        env_val = context.environ.get(env_var)
         if env_val:
             _env.update({env_var: env_val})
 
     kwargs.update(dict(_env=_env))
 
+    if context.cwd and "_cwd" not in kwargs:
+        kwargs["_cwd"] = context.cwd
+
     proc = getattr(sh, command_split[0])
 
-    return proc(*command_split[1:], **kwargs)
+    with timings.timed(command) as result:
+        # output streamed to a callback is not kept by sh, count it on the way through
+        out = kwargs.get("_out")
+        if callable(out):
+
+            def count_out(data):
+                result["bytes_out"] += len(data)
+
+                return out(data)
+
+            kwargs["_out"] = count_out
+
+        try:
+            output = proc(*command_split[1:], **kwargs)
+        except ErrorReturnCode as exc:
+            result["exit_code"] = exc.exit_code
+            result["bytes_out"] += len(exc.stdout or b"")
+
+            raise
+
+        # older versions of sh return the command rather than its output
+        result["exit_code"] = getattr(output, "exit_code", 0)
+        result["bytes_out"] += len(getattr(output, "stdout", output) or b"")
+
+    return output
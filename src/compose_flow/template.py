@@ -0,0 +1,221 @@
+"""
+Compiled templates for `${VAR}` style variable substitutions
+
+Content is parsed once into literal text and variable segments; rendering a
+template is a single join over its segments.  Parsed templates are cached by
+the digest of their content.
+"""
+import hashlib
+import logging
+import re
+import threading
+
+from collections import OrderedDict
+from typing import List, NamedTuple
+
+from .errors import CircularReference, EnvError
+
+# regular expression for finding variables in docker compose files
+VAR_RE = re.compile(r"\${(?P<expression>[^}\n]*)}")
+
+# splits a variable expression into its name and the modifier that follows it
+EXPRESSION_RE = re.compile(
+    r"(?P<name>[^:?-]*)(?:(?P<modifier>:-|:\?|-|\?)(?P<argument>.*))?", re.DOTALL
+)
+
+MISSING_VAR = "*** MISSING_ENVIRONMENT_VAR ***"
+
+TEMPLATE_CACHE_SIZE = 256
+
+
+class Variable(NamedTuple):
+    """
+    A variable substitution within a template
+
+    The modifiers follow docker-compose:
+
+    - `${VAR:-default}` is `default` when VAR is unset or empty
+    - `${VAR-default}` is `default` when VAR is unset
+    - `${VAR:?error}` is an error when VAR is unset or empty
+    - `${VAR?error}` is an error when VAR is unset
+    """
+
+    name: str
+    modifier: str = None
+    argument: str = ""
+
+    @classmethod
+    def parse(cls, expression: str) -> "Variable":
+        match = EXPRESSION_RE.match(expression)
+
+        modifier = match.group("modifier")
+        if modifier:
+            return cls(match.group("name"), modifier, match.group("argument"))
+
+        # unsupported modifiers are ignored
+        return cls(match.group("name"))
+
+    def render(self, env: dict, errors: List[str]) -> str:
+        value = env.get(self.name)
+
+        if self.modifier == ":-":
+            return value or self.argument
+        elif self.modifier == "-":
+            return self.argument if value is None else value
+
+        if value is None or (self.modifier == ":?" and not value):
+            if self.modifier and self.argument:
+                errors.append(f"{self.name}: {self.argument}")
+            else:
+                errors.append(f"{self.name} not found in environment")
+
+            return MISSING_VAR
+
+        return value
+
+
+class Template(object):
+    """
+    Content parsed into literal text and variable segments
+    """
+
+    def __init__(self, content: str):
+        self.segments = []
+
+        # variables are usually repeated throughout the content, parse each one once
+        variables = {}
+
+        previous_idx = 0
+        for match in VAR_RE.finditer(content):
+            expression = match.group("expression")
+
+            variable = variables.get(expression)
+            if variable is None:
+                variable = variables[expression] = Variable.parse(expression)
+
+            self.segments.append(content[previous_idx : match.start()])
+            self.segments.append(variable)
+
+            previous_idx = match.end()
+
+        self.segments.append(content[previous_idx:])
+
+        # segments alternate between literal text and variables
+        self.variables = list(variables.values())
+
+    @property
+    def logger(self):
+        return logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+
+    def render(self, env: dict) -> str:
+        """
+        Returns the content with the variables substituted from the given env
+
+        Raises:
+            EnvError when variables are missing from the env
+        """
+        errors = []
+
+        values = {x: x.render(env, errors) for x in self.variables}
+
+        segments = list(self.segments)
+        segments[1::2] = [values[x] for x in self.segments[1::2]]
+
+        rendered = "".join(segments)
+
+        if errors:
+            self.logger.error(rendered)
+            self.logger.error("\n".join(errors))
+
+            raise EnvError("Rendering error")
+
+        return rendered
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_template(content: str) -> Template:
+    """
+    Returns the parsed template for the given content
+    """
+    key = hashlib.sha1(content.encode("utf8")).hexdigest()
+
+    with _cache_lock:
+        template = _cache.get(key)
+        if template is not None:
+            _cache.move_to_end(key)
+
+            return template
+
+    template = Template(content)
+
+    with _cache_lock:
+        _cache[key] = template
+
+        while len(_cache) > TEMPLATE_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return template
+
+
+def resolve_references(values: dict) -> dict:
+    """
+    Renders values that reference other values in the same dict
+
+    Values are rendered in dependency order so that each one is rendered once,
+    after the values it references.
+
+    Returns:
+        a new dict with the rendered values
+
+    Raises:
+        CircularReference when values reference each other in a loop
+    """
+    templates = {}
+    dependencies = {}
+
+    for key, value in values.items():
+        if "${" not in value:
+            continue
+
+        template = templates[key] = Template(value)
+
+        dependencies[key] = [x.name for x in template.variables if x.name in values]
+
+    resolved = dict(values)
+    done = set()
+
+    # depth first search through the references, rendering on the way back up
+    for root in templates:
+        if root in done:
+            continue
+
+        path = [root]
+        stack = [iter(dependencies[root])]
+
+        while stack:
+            for dependency in stack[-1]:
+                # values without references are used as-is
+                if dependency in done or dependency not in templates:
+                    continue
+
+                if dependency in path:
+                    chain = path[path.index(dependency) :] + [dependency]
+
+                    raise CircularReference(f"circular reference: {' -> '.join(chain)}")
+
+                path.append(dependency)
+                stack.append(iter(dependencies[dependency]))
+
+                break
+            else:
+                key = path.pop()
+                stack.pop()
+
+                resolved[key] = templates[key].render(resolved)
+
+                done.add(key)
+
+    return resolved
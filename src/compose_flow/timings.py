@@ -0,0 +1,311 @@
+"""
+Timing of the commands compose-flow runs
+
+Every command run through `shell.execute` is timed and recorded along with the
+phase of the workflow and the subcommand that ran it, its exit code and the
+number of bytes it wrote to stdout.
+
+Timings and the current phase are kept on the active `WorkflowContext`, so that
+workflows running at the same time each record their own commands; commands run
+outside of a workflow are recorded on the process context.
+
+Work compose-flow skipped along the way, e.g. kube context switches and cluster
+listings, is counted on the context as well, see `count()`.
+
+With `--timings`, a summary of where the time went and of the counts is printed
+at the end of the run.  When `CF_TRACE_FILE` is set, each command is also appended to that file
+as a line of JSON as soon as it finishes; `scripts/trace_to_chrome.py` converts
+the file for `chrome://tracing`.
+
+Commands are recorded with long arguments elided, since those may carry the
+content of environments.
+"""
+import json
+import logging
+import os
+import shlex
+import sys
+import threading
+import time
+
+from contextlib import contextmanager
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple
+
+from compose_flow import settings
+from compose_flow.context import WorkflowContext, get_context
+
+# longer arguments are elided in recorded commands
+MAX_ARG_LENGTH = 64
+
+# number of commands listed in the summary
+SLOWEST_COUNT = 10
+
+
+class CommandTiming(NamedTuple):
+    command: str
+
+    # the phase of the workflow, e.g. `profile` or the subcommand handling the run
+    phase: str
+
+    # the subcommand that ran the command, None when it was run directly
+    subcommand: str
+
+    # seconds since the epoch
+    start: float
+    duration: float
+
+    # None when the command could not be started
+    exit_code: int
+    bytes_out: int
+
+    thread: int
+
+
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_logger():
+    return logging.getLogger(__name__)
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Records the commands run within the block as part of the given workflow phase
+    """
+    context = get_context()
+
+    previous = context.phase
+    context.phase = name
+    try:
+        yield
+    finally:
+        context.phase = previous
+
+
+@contextmanager
+def subcommand(name: str):
+    """
+    Records the commands run within the block, in this thread, as run by the given subcommand
+    """
+    previous = getattr(_local, "subcommand", None)
+    _local.subcommand = name
+    try:
+        yield
+    finally:
+        _local.subcommand = previous
+
+
+def redact(command: str) -> str:
+    try:
+        args = shlex.split(command)
+    except ValueError:
+        return command[:MAX_ARG_LENGTH]
+
+    args = [x if len(x) <= MAX_ARG_LENGTH else f"<{len(x)} chars>" for x in args]
+
+    return " ".join(shlex.quote(x) for x in args)
+
+
+def record(
+    command: str, start: float, duration: float, exit_code: int, bytes_out: int
+) -> CommandTiming:
+    context = get_context()
+
+    timing = CommandTiming(
+        command=redact(command),
+        phase=context.phase,
+        subcommand=getattr(_local, "subcommand", None),
+        start=start,
+        duration=duration,
+        exit_code=exit_code,
+        bytes_out=bytes_out,
+        thread=threading.get_ident(),
+    )
+
+    with _lock:
+        context.timings.append(timing)
+
+        if settings.TRACE_FILE:
+            try:
+                with open(settings.TRACE_FILE, "a") as fh:
+                    fh.write(json.dumps(timing._asdict()) + "\n")
+            except OSError as exc:
+                get_logger().warning(f"unable to write trace: {exc}")
+
+    return timing
+
+
+def count(group: str, name: str) -> None:
+    """
+    Counts an event of the group, e.g. a `skipped` kube context switch, in the active context
+    """
+    context = get_context()
+
+    with _lock:
+        context.counts.setdefault(group, Counter())[name] += 1
+
+
+def get_counts(context: WorkflowContext = None) -> Dict[str, Counter]:
+    """
+    Returns the events counted in the given context, the active one by default
+    """
+    context = context or get_context()
+
+    with _lock:
+        return {group: Counter(x) for group, x in context.counts.items()}
+
+
+def get_timings(context: WorkflowContext = None) -> List[CommandTiming]:
+    """
+    Returns the commands recorded in the given context, the active one by default
+    """
+    context = context or get_context()
+
+    with _lock:
+        return list(context.timings)
+
+
+def clear(context: WorkflowContext = None) -> None:
+    """
+    Forgets the commands and events recorded in the given context, the active one by default
+    """
+    context = context or get_context()
+
+    with _lock:
+        del context.timings[:]
+        context.counts.clear()
+
+    context.phase = None
+
+
+@contextmanager
+def timed(command: str):
+    """
+    Times the command run within the block
+
+    The block is given a dict in which to set the `exit_code` and `bytes_out`
+    of the command; the exit code defaults to 0 when the block succeeds.
+    """
+    result = {"exit_code": None, "bytes_out": 0}
+
+    start = time.time()
+    perf_start = time.perf_counter()
+    try:
+        yield result
+
+        if result["exit_code"] is None:
+            result["exit_code"] = 0
+    finally:
+        record(
+            command,
+            start,
+            time.perf_counter() - perf_start,
+            result["exit_code"],
+            result["bytes_out"],
+        )
+
+
+def format_summary(timings: Iterable[CommandTiming]) -> str:
+    """
+    Returns the time spent running commands, by phase and program, and the slowest commands
+    """
+    timings = list(timings)
+    if not timings:
+        return "no commands run"
+
+    totals = {}
+    for timing in timings:
+        program = os.path.basename(timing.command.split(" ", 1)[0])
+        key = (timing.phase or "-", program)
+
+        count, total, slowest = totals.get(key, (0, 0.0, 0.0))
+        totals[key] = (
+            count + 1,
+            total + timing.duration,
+            max(slowest, timing.duration),
+        )
+
+    lines = [f"{'phase':<20} {'program':<16} {'count':>5} {'total':>8} {'max':>8}"]
+    for (phase_name, program), (count, total, slowest) in sorted(
+        totals.items(), key=lambda x: -x[1][1]
+    ):
+        lines.append(
+            f"{phase_name:<20} {program:<16} {count:>5} {total:>7.2f}s {slowest:>7.2f}s"
+        )
+
+    lines.append("")
+    lines.append("slowest commands:")
+
+    for timing in sorted(timings, key=lambda x: -x.duration)[:SLOWEST_COUNT]:
+        lines.append(
+            f"{timing.duration:>7.2f}s exit={timing.exit_code} "
+            f"bytes={timing.bytes_out} {timing.command}"
+        )
+
+    total = sum(x.duration for x in timings)
+    lines.append("")
+    lines.append(f"{len(timings)} commands, {total:.2f}s")
+
+    return "\n".join(lines)
+
+
+def format_counts(counts: Dict[str, Counter]) -> str:
+    """
+    Returns a line per group of counted events, e.g. `kube contexts: 1 switched, 3 skipped`
+    """
+    lines = []
+    for group, counter in sorted(counts.items()):
+        events = ", ".join(f"{n} {name}" for name, n in sorted(counter.items()))
+        lines.append(f"{group}: {events}")
+
+    return "\n".join(lines)
+
+
+def print_summary(stream=None) -> None:
+    summary = format_summary(get_timings())
+
+    counts = get_counts()
+    if counts:
+        summary += f"\n\n{format_counts(counts)}"
+
+    print(summary, file=stream or sys.stderr)
+
+
+def read_trace(path: str) -> List[CommandTiming]:
+    """
+    Returns the timings in a trace file
+    """
+    with open(path, "r") as fh:
+        return [CommandTiming(**json.loads(x)) for x in fh if x.strip()]
+
+
+def to_chrome_trace(timings: Iterable[CommandTiming]) -> dict:
+    """
+    Returns the timings in the Chrome trace event format
+
+    Each command is a complete event on the row of the thread that ran it, with
+    times in microseconds.
+    """
+    events = []
+    for timing in timings:
+        events.append(
+            {
+                "name": timing.command,
+                "cat": timing.phase or "-",
+                "ph": "X",
+                "ts": int(timing.start * 1e6),
+                "dur": int(timing.duration * 1e6),
+                "pid": 1,
+                "tid": timing.thread,
+                "args": {
+                    "subcommand": timing.subcommand,
+                    "exit_code": timing.exit_code,
+                    "bytes_out": timing.bytes_out,
+                },
+            }
+        )
+
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
@@ -0,0 +1,249 @@
+"""
+SSH tunnels to remote Docker daemons
+
+`compose-flow remote connect` forwards the Docker socket of a remote host to
+`/tmp/compose-flow-{host}.sock`.  The tunnel is held by an SSH control master
+that stays in the background for `settings.REMOTE_CONTROL_PERSIST` and is found
+again through its control socket, so that following runs reuse it rather than
+paying for a new SSH handshake.
+
+A tunnel is up when the Docker daemon answers a `_ping` through the forwarded
+socket; a leftover socket file or an SSH process whose connection went away
+does not count.  When the control master is still running, only the forward is
+set up again.
+
+The time taken to bring each tunnel up is kept in the cache, per host, so that
+`compose-flow remote status` can report it.
+"""
+import http.client
+import logging
+import os
+import statistics
+import time
+
+from collections import Counter
+from typing import Callable, List
+
+from compose_flow import settings, shell
+from compose_flow.cache import DiskCache
+from compose_flow.context import get_context
+from compose_flow.docker_api import UnixHTTPConnection
+from compose_flow.errors import NotConnected
+
+REMOTE_DOCKER_SOCKET = "/var/run/docker.sock"
+
+# seconds between pings while waiting for a new tunnel to come up
+POLL_INTERVAL = 0.1
+
+# the number of reconnect latencies kept per host
+LATENCY_HISTORY = 20
+
+# a handful of floats per host
+TUNNEL_CACHE_MAX_BYTES = 1024 * 1024
+
+
+def ping(socket_path: str, timeout: float = None) -> bool:
+    """
+    Returns whether a Docker daemon answers on the given unix socket
+    """
+    if not os.path.exists(socket_path):
+        return False
+
+    if timeout is None:
+        timeout = settings.REMOTE_PING_TIMEOUT
+
+    connection = UnixHTTPConnection(socket_path, timeout=timeout)
+    try:
+        connection.request("GET", "/_ping")
+
+        response = connection.getresponse()
+        response.read()
+    except (OSError, http.client.HTTPException):
+        return False
+    finally:
+        connection.close()
+
+    return response.status == 200
+
+
+def execute(command: str) -> str:
+    # very low-level command that does not need workflow environment
+    return shell.execute(command, get_context().environ)
+
+
+def format_latencies(latencies: List[float]) -> str:
+    count = len(latencies)
+
+    return (
+        f"last reconnect took {latencies[-1]:.2f}s, "
+        f"median {statistics.median(latencies):.2f}s over {count} "
+        f"reconnect{'s' if count != 1 else ''}"
+    )
+
+
+class Tunnel(object):
+    """
+    Forwards the Docker socket of a remote host to a local unix socket
+
+    The `counts` keep track of how the tunnel was brought up:
+
+    - `reused`: the tunnel was already up
+    - `forwarded`: the control master was running, the forward was set up again
+    - `connected`: a new control master was started
+    """
+
+    def __init__(
+        self,
+        host: str,
+        socket_path: str,
+        control_path: str = None,
+        cache: DiskCache = None,
+        execute: Callable[[str], object] = execute,
+    ):
+        self.host = host
+        self.socket_path = socket_path
+        self.control_path = control_path or f"{os.path.splitext(socket_path)[0]}.ctl"
+        self.cache = cache
+        self.execute = execute
+
+        self.counts = Counter()
+
+        # seconds taken by each reconnect in this process
+        self.latencies = []
+
+    @property
+    def logger(self):
+        return logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+
+    @property
+    def forward(self) -> str:
+        return f"-L {self.socket_path}:{REMOTE_DOCKER_SOCKET}"
+
+    def _ssh(self, args: str) -> object:
+        return self.execute(
+            f"ssh -o ControlPath={self.control_path} {args} {self.host}"
+        )
+
+    def close(self) -> None:
+        """
+        Stops the control master and removes the forwarded socket
+        """
+        if os.path.exists(self.control_path):
+            try:
+                self._ssh("-O exit")
+            except shell.ErrorReturnCode as exc:
+                self.logger.debug(f"unable to stop control master: {exc}")
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def connect(self) -> bool:
+        """
+        Brings the tunnel up unless it already is
+
+        Returns:
+            True when the tunnel was brought up, False when it was already up
+
+        Raises:
+            NotConnected when the Docker daemon does not answer through the new tunnel
+        """
+        if self.is_alive():
+            self.counts["reused"] += 1
+
+            return False
+
+        start = time.perf_counter()
+
+        if self.is_master_running() and self._forward_again():
+            self.counts["forwarded"] += 1
+        else:
+            # the master may be running with its connection gone, start over
+            self.close()
+
+            self._ssh(
+                f"-o ControlMaster=auto"
+                f" -o ControlPersist={settings.REMOTE_CONTROL_PERSIST}"
+                f" -o ExitOnForwardFailure=yes -o StreamLocalBindUnlink=yes"
+                f" -Nf {self.forward}"
+            )
+
+            if not self.wait(settings.REMOTE_CONNECT_TIMEOUT):
+                raise NotConnected(
+                    f"docker on {self.host} does not respond at {self.socket_path}"
+                )
+
+            self.counts["connected"] += 1
+
+        latency = time.perf_counter() - start
+        self.record_latency(latency)
+
+        self.logger.debug(f"tunnel to {self.host} up in {latency:.2f}s")
+
+        return True
+
+    def _forward_again(self) -> bool:
+        try:
+            self._ssh(f"-O forward {self.forward}")
+        except shell.ErrorReturnCode:
+            return False
+
+        return self.wait(settings.REMOTE_PING_TIMEOUT)
+
+    def get_latencies(self) -> List[float]:
+        """
+        Returns the seconds taken by the latest reconnects to the host, oldest first
+        """
+        if not self.cache:
+            return list(self.latencies)
+
+        return self.cache.get(DiskCache.make_key("latencies", self.host)) or []
+
+    def is_alive(self) -> bool:
+        return ping(self.socket_path)
+
+    def is_master_running(self) -> bool:
+        if not os.path.exists(self.control_path):
+            return False
+
+        try:
+            self._ssh("-O check")
+        except shell.ErrorReturnCode:
+            return False
+
+        return True
+
+    def record_latency(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+        if not self.cache:
+            return
+
+        key = DiskCache.make_key("latencies", self.host)
+        latencies = (self.cache.get(key) or []) + [latency]
+
+        self.cache.set(key, latencies[-LATENCY_HISTORY:])
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Returns whether the tunnel comes up within the given number of seconds
+        """
+        deadline = time.perf_counter() + timeout
+        while not self.is_alive():
+            if time.perf_counter() >= deadline:
+                return False
+
+            time.sleep(POLL_INTERVAL)
+
+        return True
+
+
+def get_tunnel(host: str, socket_path: str, **kwargs) -> Tunnel:
+    """
+    Returns the tunnel to the given host, recording its latencies in the cache
+    """
+    cache = DiskCache(
+        os.path.join(settings.CACHE_ROOT, "remote-tunnels"),
+        max_bytes=TUNNEL_CACHE_MAX_BYTES,
+    )
+
+    return Tunnel(host, socket_path, cache=cache, **kwargs)
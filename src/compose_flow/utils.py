@@ -1,22 +1,75 @@
 import base64
+import copy
 import logging
-import re
 import os
+import random
+import threading
 
-from typing import Iterable
+from typing import Iterable, Iterator
 from collections import OrderedDict
+from collections.abc import Mapping
+from functools import lru_cache, wraps
 
 import yaml
 
-from boltons.iterutils import remap, get_path, default_enter, default_visit
-from jinja2 import Environment
+# use the libyaml bindings when PyYAML was built with them
+try:
+    from yaml import CDumper as YAML_DUMPER, CLoader as YAML_LOADER
+    from yaml import CSafeLoader as YAML_SAFE_LOADER
+except ImportError:
+    from yaml import Dumper as YAML_DUMPER, Loader as YAML_LOADER
+    from yaml import SafeLoader as YAML_SAFE_LOADER
 
-from compose_flow import shell
+from . import settings
+from .cache import DiskCache
+from .context import get_context
+from .errors import TagVersionError, ProfileError
+from .template import get_template
 
-from .errors import TagVersionError, EnvError, ProfileError
+TAG_VERSION_CACHE_MAX_BYTES = 1024 * 1024
 
-# regular expression for finding variables in docker compose files
-VAR_RE = re.compile(r"\${(?P<varname>.*?)(?P<junk>[:?].*)?}")
+
+class cached_property(object):
+    """
+    Property computed on first access and stored on the instance
+
+    Unlike stacking `@property` and `@lru_cache()`, the value is dropped along with
+    the instance instead of keeping the instance alive in a cache shared by the
+    class.  Deleting the attribute has it computed again on next access.  When
+    first accessed by several threads at once, it may be computed more than once.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.name = fn.__name__
+        self.__doc__ = fn.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        value = instance.__dict__[self.name] = self.fn(instance)
+
+        return value
+
+
+def cached_method(fn):
+    """
+    Caches the return value of a method per instance and arguments
+
+    Like `cached_property`, the cache is kept on the instance.
+    """
+    attr = f"_{fn.__name__}_cache"
+
+    @wraps(fn)
+    def wrapper(self, *args):
+        cache = self.__dict__.setdefault(attr, {})
+        if args not in cache:
+            cache[args] = fn(self, *args)
+
+        return cache[args]
+
+    return wrapper
 
 
 def _get_kv(item: str) -> tuple:
@@ -34,6 +87,22 @@ def _get_kv(item: str) -> tuple:
     return key, val
 
 
+def get_backoff_delays(
+    attempts: int, base: float = 0.1, cap: float = 2.0
+) -> Iterator[float]:
+    """
+    Yields the seconds to wait between attempts
+
+    The delays double from `base` up to `cap`, and each one is picked at random
+    below that bound, so that clients retrying at the same time spread out.
+
+    Args:
+        attempts: the number of attempts; one less delay is yielded
+    """
+    for attempt in range(attempts - 1):
+        yield random.uniform(0, min(cap, base * 2**attempt))
+
+
 def get_kv(item: str, multiple: bool = False) -> Iterable[tuple]:
     """Wrapper around _get_kv() to support multiple items in the string"""
     items = [_get_kv(line) for line in item.splitlines()]
@@ -44,8 +113,22 @@ def get_kv(item: str, multiple: bool = False) -> Iterable[tuple]:
     return items[0]
 
 
-def get_repo_name() -> str:
-    repo_name = os.path.basename(os.getcwd())
+def get_package_version(package_name: str) -> str:
+    """
+    Returns the installed version of the given package
+    """
+    try:
+        from importlib.metadata import version
+    except ImportError:  # python < 3.8
+        import pkg_resources  # part of setuptools
+
+        return pkg_resources.require(package_name)[0].version
+
+    return version(package_name)
+
+
+def get_repo_name(path: str = None) -> str:
+    repo_name = os.path.basename(path or os.getcwd())
 
     return repo_name
 
@@ -54,14 +137,27 @@ def get_tag_version(default: str = None) -> str:
     """
     Returns the version of code as returned by the `tag-version` cli command
 
+    Versions generated for a clean working copy are cached by the commit and tags
+    in the repository, so `tag-version` only runs once for the same git state.
+
     Args:
         default: the default version if it cannot be found, `unknown` by default
         print_warning: when `tag-version` results in error, print a warning
     """
+    from compose_flow import shell
+
+    cache, cache_key = _get_tag_version_cache()
+    if cache_key:
+        tag_version = cache.get(cache_key)
+        if tag_version:
+            return tag_version
+
     # inject the version from tag-version command into the loaded environment
     tag_version = default or "unknown"
     try:
-        proc = shell.execute("tag-version version --format docker", os.environ)
+        proc = shell.execute(
+            "tag-version version --format docker", get_context().environ
+        )
     except Exception as exc:
         error_message = str(exc)
 
@@ -74,115 +170,147 @@ def get_tag_version(default: str = None) -> str:
     else:
         tag_version = proc.strip()
 
+    if cache_key:
+        cache.set(cache_key, tag_version)
+
     return tag_version
 
 
-# https://gist.github.com/mahmoud/db02d16ac89fa401b968
+def _get_tag_version_cache() -> tuple:
+    """
+    Returns the tag-version cache and the key for the current git state
+
+    Returns:
+        a tuple of (cache, key); the key is None when the version should not be cached
+    """
+    from compose_flow import git
+
+    if not settings.TAG_VERSION_CACHE_TTL:
+        return None, None
+
+    try:
+        state = git.get_state()
+    except Exception as exc:
+        logging.getLogger(__name__).debug(f"unable to read git state: {exc}")
+
+        return None, None
+
+    # dirty working copies are left to tag-version to report
+    if not state or not state.head or not state.is_clean:
+        return None, None
+
+    cache = DiskCache(
+        os.path.join(settings.CACHE_ROOT, "tag-version"),
+        max_bytes=TAG_VERSION_CACHE_MAX_BYTES,
+        ttl=settings.TAG_VERSION_CACHE_TTL,
+    )
+
+    return cache, DiskCache.make_key(state.work_tree, state.head, state.tags)
+
+
 def remerge(target_list, sourced=False):
-    """Takes a list of containers (e.g., dicts) and merges them using
-    boltons.iterutils.remap. Containers later in the list take
-    precedence (last-wins).
+    """Takes a list of containers (e.g., dicts) and deep merges them.
+    Containers later in the list take precedence (last-wins).
     By default, returns a new, merged top-level container. With the
     *sourced* option, `remerge` expects a list of (*name*, container*)
     pairs, and will return a source map: a dictionary mapping between
     path and the name of the container it came from.
+
+    Mappings are merged key by key, lists are purely additive and any other
+    value replaces what was there before, including when the type of a value
+    changes from one container to the next.
+
+    The merge holds on to the destination container while walking each target,
+    so every node is visited once instead of looking up its path from the root.
+    Items within lists are not copied and are not part of the source map.
     """
 
     if not sourced:
-        target_list = [(id(t), t) for t in target_list]
+        target_list = [(None, t) for t in target_list]
 
     ret = None
     source_map = {}
 
-    def remerge_enter(path, key, value):
-        new_parent, new_items = default_enter(path, key, value)
-        if ret and not path and key is None:
-            new_parent = ret
-        try:
-            cur_val = get_path(ret, path + (key,))
-        except KeyError:
-            pass
-        else:
-            # TODO: type check?
-            new_parent = cur_val
-
-        if isinstance(value, list):
-            # lists are purely additive. See https://github.com/mahmoud/boltons/issues/81
-            new_parent.extend(value)
-            new_items = []
-
-        return new_parent, new_items
-
     for t_name, target in target_list:
-        if sourced:
+        if not ret or not _is_same_container_type(ret, target):
+            ret = target.__class__()
+
+        stack = [(ret, target, ())]
+        while stack:
+            dest, src, path = stack.pop()
+
+            if isinstance(dest, list):
+                dest.extend(src)
+
+                continue
+
+            for key, value in src.items():
+                item_path = None
+                if sourced:
+                    item_path = path + (key,)
 
-            def remerge_visit(path, key, value):
-                source_map[path + (key,)] = t_name
-                return True
+                    source_map[item_path] = t_name
 
-        else:
-            remerge_visit = default_visit
+                if isinstance(value, (Mapping, list)):
+                    cur_val = dest.get(key)
+                    if cur_val is None or not _is_same_container_type(cur_val, value):
+                        cur_val = dest[key] = value.__class__()
 
-        ret = remap(target, enter=remerge_enter, visit=remerge_visit)
+                    stack.append((cur_val, value, item_path))
+                else:
+                    dest[key] = value
 
     if not sourced:
         return ret
     return ret, source_map
 
 
-def render(content: str, env: dict = None) -> str:
+def _is_same_container_type(a, b) -> bool:
     """
-    Renders the variables in the file
+    Returns whether both values are mappings or both are lists
     """
-    previous_idx = 0
-    rendered = ""
-
-    env = env or os.environ
-
-    errors = []
+    for container_type in (Mapping, list):
+        if isinstance(b, container_type):
+            return isinstance(a, container_type)
 
-    for x in VAR_RE.finditer(content):
-        rendered += content[
-            previous_idx : x.start("varname") - 2
-        ]  # -2 to get rid of variable's `${`
+    return False
 
-        varname = x.group("varname")
-        try:
-            rendered += env[varname]
-        except KeyError:
-            rendered += "*** MISSING_ENVIRONMENT_VAR ***"
 
-            errors.append(f"{varname} not found in environment")
+def render(content: str, env: dict = None) -> str:
+    """
+    Renders the variables in the file
 
-        end = x.end("junk")
-        if end == -1:
-            end = x.end("varname")
+    See `compose_flow.template.Variable` for the supported substitutions
+    """
+    # nothing to substitute, skip parsing the content
+    if "${" not in content:
+        return content
 
-        previous_idx = end + 1  # +1 to get rid of variable's `}`
+    env = env or get_context().environ
 
-    rendered += content[previous_idx:]
+    return get_template(content).render(env)
 
-    logger = logging.getLogger(__name__)
 
-    if errors:
-        logger.error(rendered)
-        logger.error("\n".join(errors))
+@lru_cache()
+def get_jinja_environment():
+    """
+    Returns the Jinja environment used to render templates
+    """
+    from jinja2 import Environment
 
-        raise EnvError("Rendering error")
+    jinja_env = Environment()
+    jinja_env.filters["b64encode"] = lambda s: base64.b64encode(s.encode()).decode(
+        "utf-8"
+    )
 
-    return rendered
+    return jinja_env
 
 
 def render_jinja(content: str, env: dict = None) -> str:
     if env is None:
         env = {}
 
-    jinja_env = Environment()
-    jinja_env.filters["b64encode"] = lambda s: base64.b64encode(s.encode()).decode(
-        "utf-8"
-    )
-
-    return jinja_env.from_string(content).render(env)
+    return get_jinja_environment().from_string(content).render(env)
 
 
 ##
@@ -192,44 +320,110 @@ def render_jinja(content: str, env: dict = None) -> str:
 ##
 
 
-def yaml_load(stream, Loader=yaml.Loader, object_pairs_hook=OrderedDict):
+def _construct_ordered_mapping(loader, node, object_pairs_hook=OrderedDict):
+    loader.flatten_mapping(node)
+    return object_pairs_hook(loader.construct_pairs(node))
+
+
+def _represent_ordered_mapping(dumper, data):
+    return dumper.represent_mapping(
+        yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, data.items()
+    )
+
+
+class OrderedLoader(YAML_LOADER):
+    """
+    YAML loader that loads mappings into OrderedDicts
+    """
+
+
+OrderedLoader.add_constructor(
+    yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, _construct_ordered_mapping
+)
+
+
+class OrderedDumper(YAML_DUMPER):
+    """
+    YAML dumper that writes out OrderedDicts as regular mappings
+    """
+
+
+OrderedDumper.add_representer(OrderedDict, _represent_ordered_mapping)
+
+
+def yaml_load(stream, Loader=None, object_pairs_hook=OrderedDict):
     """
     Ordered YAML loader
 
-    >>> ordered_load(stream, yaml.SafeLoader)
+    The libyaml based loader is used unless another Loader is given
+
+    >>> yaml_load(stream, yaml.SafeLoader)
     """
+    if Loader is None and object_pairs_hook is OrderedDict:
+        return yaml.load(stream, OrderedLoader)
 
-    class OrderedLoader(Loader):
+    class _OrderedLoader(Loader or YAML_LOADER):
         pass
 
     def construct_mapping(loader, node):
-        loader.flatten_mapping(node)
-        return object_pairs_hook(loader.construct_pairs(node))
+        return _construct_ordered_mapping(loader, node, object_pairs_hook)
 
-    OrderedLoader.add_constructor(
+    _OrderedLoader.add_constructor(
         yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, construct_mapping
     )
-    return yaml.load(stream, OrderedLoader)
+    return yaml.load(stream, _OrderedLoader)
+
+
+_yaml_files = {}
+_yaml_files_lock = threading.Lock()
 
 
-def yaml_dump(data, stream=None, Dumper=yaml.Dumper, **kwds):
+def yaml_load_file(path: str):
     """
-    Ordered YAML dumper
+    Returns the ordered YAML data in the given file
+
+    The data is parsed once per modification of the file; it is kept keyed by the
+    file's modification time and size, so that long-running processes, e.g. the
+    daemon, only re-read files that changed.  Callers get a copy they may modify.
 
-    >>> ordered_dump(data, Dumper=yaml.SafeDumper)
+    Raises:
+        FileNotFoundError when the file does not exist
     """
+    path = os.path.abspath(path)
 
-    class OrderedDumper(Dumper):
-        pass
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
 
-    def _dict_representer(dumper, data):
-        return dumper.represent_mapping(
-            yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, data.items()
-        )
+    with _yaml_files_lock:
+        cached = _yaml_files.get(path)
+
+    if cached is None or cached[0] != signature:
+        with open(path, "r") as fh:
+            cached = (signature, yaml_load(fh))
+
+        with _yaml_files_lock:
+            _yaml_files[path] = cached
+
+    return copy.deepcopy(cached[1])
 
-    OrderedDumper.add_representer(OrderedDict, _dict_representer)
 
+def yaml_dump(data, stream=None, Dumper=None, **kwds):
+    """
+    Ordered YAML dumper
+
+    The libyaml based dumper is used unless another Dumper is given
+
+    >>> yaml_dump(data, Dumper=yaml.SafeDumper)
+    """
     # set the default_flow_style to False if not set
     kwds.setdefault("default_flow_style", False)
 
-    return yaml.dump(data, stream, OrderedDumper, **kwds)
+    if Dumper is None:
+        return yaml.dump(data, stream, OrderedDumper, **kwds)
+
+    class _OrderedDumper(Dumper):
+        pass
+
+    _OrderedDumper.add_representer(OrderedDict, _represent_ordered_mapping)
+
+    return yaml.dump(data, stream, _OrderedDumper, **kwds)
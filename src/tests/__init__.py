@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from unittest import TestCase, mock
 
@@ -6,6 +7,9 @@ CF_DOCKER_IMAGE_PREFIX = "test.registry.prefix.com"
 
 os.environ["CF_DOCKER_IMAGE_PREFIX"] = CF_DOCKER_IMAGE_PREFIX
 
+# keep caches written by the tests out of the user's config directory
+os.environ["CF_CACHE_ROOT"] = tempfile.mkdtemp(prefix="compose-flow-tests-")
+
 
 class BaseTestCase(TestCase):
     def setUp(self):
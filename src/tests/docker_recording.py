@@ -0,0 +1,72 @@
+"""
+Replays recorded docker responses
+
+Recordings are JSON files in `tests/files/docker/`, written by
+`scripts/record_docker.py`, with two sections:
+
+- `api`: maps `<method> <url>` to the `status` and `body` of the API response
+- `cli`: maps a docker command to its output, or to `{"error": <message>}` for a
+  command that fails
+"""
+import json
+
+from compose_flow import docker_api
+from compose_flow.errors import DockerError
+
+from tests.utils import get_content
+
+
+def load_recording(name: str) -> dict:
+    return json.loads(get_content(f"docker/{name}.json"))
+
+
+class RecordedClient(docker_api.DockerAPIClient):
+    """
+    API client that answers requests from a recording
+    """
+
+    def __init__(self, recording: dict):
+        super().__init__("unix:///recorded/docker.sock")
+
+        self.responses = recording["api"]
+
+        # `<method> <url>` of every request made
+        self.requests = []
+
+    def _send(self, method: str, url: str, body: bytes, headers: dict) -> tuple:
+        key = f"{method} {url}"
+        self.requests.append(key)
+
+        response = self.responses.get(key)
+        if response is None:
+            response = {"status": 404, "body": {"message": f"not recorded: {key}"}}
+
+        content = b""
+        if response["body"] is not None:
+            content = json.dumps(response["body"]).encode("utf8")
+
+        return response["status"], content
+
+
+class RecordedCli(object):
+    """
+    Stand-in for `docker.get_docker_output` that answers commands from a recording
+    """
+
+    def __init__(self, recording: dict):
+        self.outputs = recording["cli"]
+
+        # every command run
+        self.commands = []
+
+    def __call__(self, command: str, env: dict) -> str:
+        self.commands.append(command)
+
+        output = self.outputs.get(command)
+        if output is None:
+            raise DockerError(f"not recorded: {command}")
+
+        if isinstance(output, dict):
+            raise DockerError(output["error"])
+
+        return output
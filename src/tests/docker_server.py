@@ -0,0 +1,159 @@
+"""
+Fake Docker Engine API server listening on a unix socket
+"""
+import base64
+import json
+import socketserver
+import threading
+import uuid
+
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class FakeDockerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+
+        self.server.connections += 1
+
+    def address_string(self):
+        return self.server.server_address
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, data) -> None:
+        body = json.dumps(data).encode("utf8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        self.wfile.write(body)
+
+        # drop the connection without telling the client, like an idle timeout would
+        if self.server.drop_connections:
+            self.close_connection = True
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+
+        return json.loads(self.rfile.read(length).decode("utf8"))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.requests.append(("GET", url.path))
+
+        if url.path == "/_ping":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+
+            self.wfile.write(b"OK")
+
+            return
+
+        if url.path == "/configs":
+            configs = list(self.server.configs.values())
+
+            filters = parse_qs(url.query).get("filters")
+            if filters:
+                names = json.loads(filters[0]).get("name", [])
+                configs = [
+                    x
+                    for x in configs
+                    if any(x["Spec"]["Name"].startswith(name) for name in names)
+                ]
+
+            return self.send_json(200, configs)
+
+        self.send_json(404, {"message": f"page not found: {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self.server.requests.append(("POST", url.path))
+
+        if url.path == "/configs/create":
+            data = self.read_json()
+
+            name = data["Name"]
+            if name in self.server.configs:
+                return self.send_json(409, {"message": f"config {name} exists"})
+
+            config_id = uuid.uuid4().hex
+            self.server.configs[name] = {
+                "ID": config_id,
+                "Spec": {"Name": name, "Data": data["Data"]},
+            }
+
+            return self.send_json(201, {"ID": config_id})
+
+        self.send_json(404, {"message": f"page not found: {url.path}"})
+
+    def do_DELETE(self):
+        url = urlparse(self.path)
+        self.server.requests.append(("DELETE", url.path))
+
+        if url.path.startswith("/configs/"):
+            name = unquote(url.path.split("/", 2)[-1])
+            if name not in self.server.configs:
+                return self.send_json(404, {"message": f"config {name} not found"})
+
+            del self.server.configs[name]
+
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+            return
+
+        self.send_json(404, {"message": f"page not found: {url.path}"})
+
+
+class FakeDockerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serves the config endpoints of the Docker Engine API from memory
+    """
+
+    block_on_close = False
+    daemon_threads = True
+
+    def __init__(self, socket_path: str):
+        super().__init__(socket_path, FakeDockerHandler)
+
+        # configs keyed by name
+        self.configs = {}
+
+        # (method, path) of every request received
+        self.requests = []
+
+        # the number of connections accepted
+        self.connections = 0
+
+        # when True, the connection is closed after each response
+        self.drop_connections = False
+
+    def add_config(self, name: str, content: str) -> None:
+        self.configs[name] = {
+            "ID": uuid.uuid4().hex,
+            "Spec": {
+                "Name": name,
+                "Data": base64.b64encode(content.encode("utf8")).decode("utf8"),
+            },
+        }
+
+    def get_config(self, name: str) -> str:
+        return base64.b64decode(self.configs[name]["Spec"]["Data"]).decode("utf8")
+
+    def start(self) -> None:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
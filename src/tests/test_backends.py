@@ -75,6 +75,16 @@ class SwarmBackendTestCase(TestCase):
 
         self.docker_mock.get_config.assert_called_with(name)
 
+    def test_read_many(self, *mocks):
+        self._setup_mocks(*mocks)
+
+        names = ["foo", "bar"]
+
+        self.backend.read_many(names)
+
+        self.docker_mock.get_config_contents.assert_called_with(names)
+        self.docker_mock.get_config.assert_not_called()
+
     def test_write(self, *mocks):
         self._setup_mocks(*mocks)
 
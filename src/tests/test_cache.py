@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase, mock
+
+from compose_flow.cache import DiskCache
+
+
+class DiskCacheTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_get_set(self, *mocks):
+        cache = DiskCache(self.root)
+
+        key = cache.make_key(["docker-compose.yml"], "stack")
+
+        self.assertEqual(None, cache.get(key))
+
+        cache.set(key, "services: {}")
+
+        self.assertEqual("services: {}", cache.get(key))
+
+    def test_make_key_depends_on_parts(self, *mocks):
+        self.assertEqual(DiskCache.make_key("a", 1), DiskCache.make_key("a", 1))
+        self.assertNotEqual(DiskCache.make_key("a", 1), DiskCache.make_key("a", 2))
+
+    def test_evict_least_recently_used(self, *mocks):
+        """
+        Ensures the least recently used entries are removed when the cache is full
+        """
+        cache = DiskCache(self.root)
+        cache.set("a", "x" * 100)
+        cache.set("b", "x" * 100)
+
+        # the entry sizes vary slightly with the length of their timestamp
+        entry_size = max(x.size for x in cache.entries()) + 10
+
+        # make `a` the most recently used entry
+        os.utime(cache.get_path("a"), (1000, 1000))
+        os.utime(cache.get_path("b"), (500, 500))
+        cache.get("a")
+
+        cache.max_bytes = entry_size * 2
+        cache.set("c", "x" * 100)
+
+        self.assertEqual(["a", "c"], sorted(x.key for x in cache.entries()))
+
+    @mock.patch("compose_flow.cache.time.time")
+    def test_ttl(self, *mocks):
+        time_mock = mocks[0]
+        time_mock.return_value = 1000
+
+        cache = DiskCache(self.root, ttl=60)
+        cache.set("a", [1, 2])
+
+        time_mock.return_value = 1059
+        self.assertEqual([1, 2], cache.get("a"))
+
+        time_mock.return_value = 1061
+        self.assertEqual(None, cache.get("a"))
+        self.assertEqual([], cache.entries())
+
+    def test_corrupt_entry(self, *mocks):
+        cache = DiskCache(self.root)
+
+        with open(cache.get_path("a"), "w") as fh:
+            fh.write("{not json")
+
+        self.assertEqual(None, cache.get("a"))
+        self.assertEqual([], cache.entries())
+
+    def test_clear(self, *mocks):
+        cache = DiskCache(self.root)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        self.assertEqual(2, cache.clear())
+        self.assertEqual([], cache.entries())
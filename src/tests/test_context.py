@@ -0,0 +1,201 @@
+import gc
+import os
+import shlex
+import shutil
+import tempfile
+import threading
+import weakref
+
+from unittest import TestCase, mock
+
+from compose_flow import shell
+from compose_flow.commands import Workflow
+from compose_flow.context import WorkflowContext, activate, bind, get_context
+from compose_flow.utils import cached_method, cached_property
+
+from tests import BaseTestCase
+
+
+class Thing(object):
+    def __init__(self):
+        self.calls = 0
+
+    @cached_property
+    def value(self):
+        self.calls += 1
+
+        return self.calls
+
+    @cached_method
+    def double(self, x):
+        self.calls += 1
+
+        return x * 2
+
+
+class WorkflowContextTestCase(TestCase):
+    def test_path(self, *mocks):
+        self.assertEqual("compose.yml", WorkflowContext().path("compose.yml"))
+        self.assertEqual(
+            "/project/compose/compose.yml",
+            WorkflowContext(cwd="/project/compose").path("compose.yml"),
+        )
+        self.assertEqual(
+            "/abs/compose.yml",
+            WorkflowContext(cwd="/project/compose").path("/abs/compose.yml"),
+        )
+
+    def test_process_context(self, *mocks):
+        context = get_context()
+
+        self.assertIs(os.environ, context.environ)
+        self.assertEqual(None, context.cwd)
+
+    def test_workflow_context(self, *mocks):
+        """
+        Ensure the workflow's own context wins over the active one
+        """
+        context = WorkflowContext(environ={})
+        workflow = mock.Mock(context=context)
+
+        with activate(WorkflowContext(environ={})):
+            self.assertIs(context, get_context(workflow))
+
+        # objects standing in for workflows get the active context
+        self.assertIs(get_context(), get_context(mock.Mock()))
+
+    def test_bind(self, *mocks):
+        """
+        Ensure bound functions run in the binding thread's context
+        """
+        context = WorkflowContext(environ={})
+        found = []
+
+        with activate(context):
+            fn = bind(lambda: found.append(get_context()))
+
+        thread = threading.Thread(target=fn)
+        thread.start()
+        thread.join()
+
+        self.assertIs(context, found[0])
+        self.assertIsNot(context, get_context())
+
+    def test_cached(self, *mocks):
+        context = WorkflowContext(environ={})
+        fetch = mock.Mock(return_value=1)
+
+        context.cached("key", fetch)
+        context.cached("key", fetch)
+
+        fetch.assert_called_once()
+
+
+class CachedPropertyTestCase(TestCase):
+    def test_cached_per_instance(self, *mocks):
+        thing = Thing()
+
+        self.assertEqual(1, thing.value)
+        self.assertEqual(1, thing.value)
+        self.assertEqual(1, Thing().value)
+
+        del thing.value
+
+        self.assertEqual(2, thing.value)
+
+    def test_cached_method(self, *mocks):
+        thing = Thing()
+
+        self.assertEqual(4, thing.double(2))
+        self.assertEqual(4, thing.double(2))
+        self.assertEqual(6, thing.double(3))
+        self.assertEqual(2, thing.calls)
+
+    def test_instances_are_not_kept(self, *mocks):
+        thing = Thing()
+        thing.value
+        thing.double(1)
+
+        ref = weakref.ref(thing)
+        del thing
+        gc.collect()
+
+        self.assertEqual(None, ref())
+
+
+class WorkflowInContextTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.project_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.project_dir)
+
+        os.makedirs(os.path.join(self.project_dir, "compose"))
+
+    def get_workflow(self, docker_host: str) -> Workflow:
+        context = WorkflowContext(
+            cwd=self.project_dir, environ={"DOCKER_HOST": docker_host}
+        )
+
+        return Workflow(argv=shlex.split("-e dev env cat"), context=context)
+
+    def test_no_chdir(self, *mocks):
+        cwd = os.getcwd()
+
+        workflow = self.get_workflow("unix:///tmp/dev.sock")
+
+        self.assertEqual(cwd, os.getcwd())
+        self.assertEqual(self.project_dir, workflow.project_dir)
+        self.assertEqual(
+            os.path.join(self.project_dir, "compose"), workflow.context.cwd
+        )
+
+    def test_commands_run_in_context(self, *mocks):
+        """
+        Ensure workflows in different threads run commands with their own cwd and DOCKER_HOST
+        """
+        workflows = {
+            "dev": self.get_workflow("unix:///tmp/dev.sock"),
+            "prod": self.get_workflow("unix:///tmp/prod.sock"),
+        }
+
+        def run(workflow):
+            with activate(workflow.context):
+                shell.execute("docker ps", {})
+
+        threads = [threading.Thread(target=run, args=(x,)) for x in workflows.values()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        calls = self.sh_mock.docker.call_args_list
+
+        self.assertEqual(
+            ["unix:///tmp/dev.sock", "unix:///tmp/prod.sock"],
+            sorted(x[1]["_env"]["DOCKER_HOST"] for x in calls),
+        )
+        for call in calls:
+            self.assertEqual(os.path.join(self.project_dir, "compose"), call[1]["_cwd"])
+
+        self.assertNotIn("DOCKER_HOST", os.environ)
+
+    def test_run_resets_timings(self, *mocks):
+        """
+        Ensure a run only summarizes its own commands
+        """
+        workflow = self.get_workflow("unix:///tmp/dev.sock")
+        workflow.context.timings.append("previous run")
+        workflow.context.phase = "deploy"
+
+        recorded = []
+        with mock.patch.object(
+            workflow,
+            "_run",
+            side_effect=lambda: recorded.append(
+                (list(workflow.context.timings), workflow.context.phase)
+            ),
+        ):
+            workflow.run()
+
+        self.assertEqual([([], None)], recorded)
@@ -0,0 +1,178 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+from unittest import mock
+
+from compose_flow import client, daemon, shell
+from compose_flow.kube import inventory
+
+from tests import BaseTestCase
+
+
+class FakeWorkflow(object):
+    """
+    Stands in for workflows, recording the context they run in
+    """
+
+    contexts = []
+
+    def __init__(self, argv=None, context=None):
+        self.argv = argv
+        self.context = context
+
+        self.args = mock.Mock(spec=[])
+
+    def run(self):
+        self.contexts.append(self.context)
+
+        print(f"running {' '.join(self.argv)}")
+        print("warning", file=sys.stderr)
+
+        if "fail" in self.argv:
+            return "\nError: failed"
+
+
+class ListingWorkflow(FakeWorkflow):
+    """
+    Lists the helm releases of the dev cluster, like deploys do
+    """
+
+    fetch = None
+
+    def run(self):
+        inventory.get_inventory().get(inventory.HELM_APPS, "dev", self.fetch)
+
+
+class DaemonTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+        self.socket_path = os.path.join(self.temp_dir, "daemon.sock")
+
+        FakeWorkflow.contexts = []
+
+        with mock.patch("compose_flow.daemon.Daemon.preload"):
+            self.daemon = daemon.Daemon(self.socket_path)
+
+            self.thread = threading.Thread(target=self.daemon.serve)
+            self.thread.start()
+
+        self.addCleanup(self.stop)
+
+    def stop(self):
+        if self.thread.is_alive():
+            client.stop(self.socket_path)
+
+            self.thread.join()
+
+    def run_command(self, argv, environ=None):
+        stdout, stderr = io.StringIO(), io.StringIO()
+
+        exit_code = client.run(
+            self.socket_path,
+            argv,
+            cwd=self.temp_dir,
+            environ=os.environ if environ is None else environ,
+            stdout=stdout,
+            stderr=stderr,
+        )
+
+        return exit_code, stdout.getvalue(), stderr.getvalue()
+
+    @mock.patch("compose_flow.daemon.Workflow", new=FakeWorkflow)
+    def test_run(self, *mocks):
+        """
+        Ensure commands run in the client's context and their output is sent back
+        """
+        environ = dict(os.environ, DOCKER_HOST="unix:///tmp/dev.sock")
+
+        exit_code, stdout, stderr = self.run_command(
+            ["-e", "dev", "env", "cat"], environ
+        )
+
+        self.assertEqual(0, exit_code)
+        self.assertEqual("running -e dev env cat\n", stdout)
+        self.assertEqual("warning\n", stderr)
+
+        context = FakeWorkflow.contexts[0]
+        self.assertEqual(self.temp_dir, context.cwd)
+        self.assertEqual("unix:///tmp/dev.sock", context.environ["DOCKER_HOST"])
+
+    @mock.patch.dict("os.environ", {"DOCKER_HOST": "unix:///tmp/daemon.sock"})
+    @mock.patch.object(
+        daemon.Workflow,
+        "_run",
+        autospec=True,
+        side_effect=lambda workflow: shell.execute("docker ps", {}) and None,
+    )
+    def test_run_client_environ(self, *mocks):
+        """
+        Ensure the commands run by the daemon get the client's environment rather than the daemon's
+        """
+        os.makedirs(os.path.join(self.temp_dir, "compose"))
+
+        environ = dict(os.environ, DOCKER_TLS_VERIFY="1")
+        environ.pop("DOCKER_HOST")
+
+        exit_code, _, stderr = self.run_command(["-e", "dev", "env", "cat"], environ)
+
+        self.assertEqual(0, exit_code, stderr)
+
+        env = self.sh_mock.docker.call_args[1]["_env"]
+        self.assertNotIn("DOCKER_HOST", env)
+        self.assertEqual("1", env["DOCKER_TLS_VERIFY"])
+
+    @mock.patch(
+        "compose_flow.kube.inventory.get_inventory", return_value=inventory.Inventory()
+    )
+    @mock.patch("compose_flow.daemon.Workflow", new=ListingWorkflow)
+    def test_listings_per_command(self, *mocks):
+        """
+        Ensure listings held in memory are not reused by the following commands
+        """
+        ListingWorkflow.fetch = mock.Mock(side_effect=[["web"], ["web", "db"]])
+
+        self.assertEqual(0, self.run_command(["-e", "dev", "deploy", "helm"])[0])
+        self.assertEqual(0, self.run_command(["-e", "dev", "deploy", "helm"])[0])
+
+        self.assertEqual(2, ListingWorkflow.fetch.call_count)
+
+    @mock.patch("compose_flow.daemon.Workflow", new=FakeWorkflow)
+    def test_run_failed(self, *mocks):
+        exit_code, _, stderr = self.run_command(["fail"])
+
+        self.assertEqual(1, exit_code)
+        self.assertEqual("warning\n\nError: failed\n", stderr)
+
+    @mock.patch("compose_flow.daemon.Workflow", new=FakeWorkflow)
+    def test_fallback(self, *mocks):
+        """
+        Ensure the client runs commands the daemon cannot
+        """
+        environ = dict(os.environ, CF_DEPLOY_WORKERS="1")
+        self.assertEqual(None, self.run_command(["deploy"], environ)[0])
+
+        with self.daemon.running:
+            self.assertEqual(None, self.run_command(["deploy"])[0])
+
+        self.assertEqual([], FakeWorkflow.contexts)
+
+    def test_fallback_interactive(self, *mocks):
+        exit_code, stdout, _ = self.run_command(["-e", "dev", "service", "exec", "app"])
+
+        self.assertEqual(None, exit_code)
+        self.assertEqual("", stdout)
+
+    def test_no_daemon(self, *mocks):
+        self.stop()
+
+        self.assertFalse(os.path.exists(self.socket_path))
+        self.assertEqual(None, self.run_command(["deploy"])[0])
+        self.assertFalse(client.stop(self.socket_path))
@@ -224,3 +224,116 @@ class DeployTestCase(BaseTestCase):
 
         # make sure the command contains the manifest URL
         self.assertTrue(MANIFEST_URL in command)
+
+    @mock.patch(
+        "compose_flow.commands.subcommands.deploy.Deploy.switch_rancher_context"
+    )
+    @mock.patch(
+        "compose_flow.commands.subcommands.deploy.Deploy.get_apps",
+        return_value=[
+            {"name": "web", "depends_on": "db"},
+            {"name": "db"},
+            {"name": "migrations", "wave": 2, "depends_on": ["web"]},
+        ],
+    )
+    @mock.patch(
+        "compose_flow.commands.subcommands.deploy.Deploy.get_app_deploy_command",
+        side_effect=lambda app, target: f"rancher apps install {app['name']}",
+    )
+    @mock.patch(
+        "compose_flow.commands.subcommands.deploy.Deploy.get_rancher_manifests",
+        return_value=[],
+    )
+    @mock.patch(
+        "compose_flow.commands.subcommands.deploy.Deploy.upsert_rancher_namespaces"
+    )
+    @mock.patch(
+        "compose_flow.commands.subcommands.deploy.Deploy.rancher_scope",
+        new="https://rancher/dev/app",
+    )
+    @mock.patch("compose_flow.commands.subcommands.deploy.Deploy.execute")
+    @mock.patch("compose_flow.commands.subcommands.deploy.print")
+    def test_dry_run_plan(self, *mocks):
+        """
+        Ensures the deploy plan is printed on a dry run without deploying anything
+        """
+        command = shlex.split("-e dev --dry-run deploy rancher")
+        workflow = Workflow(argv=command)
+
+        workflow.environment.write = mock.Mock()
+        workflow.profile.check = mock.Mock()
+
+        workflow.run()
+
+        print_mock = mocks[0]
+        print_mock.assert_called_once_with(
+            "wave 1:\n  db\n  web (after db)\nwave 2:\n  migrations"
+        )
+
+        execute_mock = mocks[1]
+        execute_mock.assert_not_called()
+
+    @mock.patch(
+        "compose_flow.commands.subcommands.deploy.Deploy.switch_rancher_context"
+    )
+    @mock.patch(
+        "compose_flow.commands.subcommands.deploy.Deploy.get_apps",
+        return_value=[{"name": "web"}, {"name": "db"}],
+    )
+    @mock.patch(
+        "compose_flow.commands.subcommands.deploy.Deploy.get_app_deploy_command",
+        side_effect=lambda app, target: f"rancher apps upgrade {app['name']} 1.0",
+    )
+    @mock.patch(
+        "compose_flow.commands.subcommands.deploy.Deploy.get_rancher_manifests",
+        return_value=[],
+    )
+    @mock.patch(
+        "compose_flow.commands.subcommands.deploy.Deploy.upsert_rancher_namespaces"
+    )
+    @mock.patch(
+        "compose_flow.commands.subcommands.deploy.Deploy.rancher_scope",
+        new="https://rancher/dev/unchanged",
+    )
+    @mock.patch("compose_flow.commands.subcommands.deploy.Deploy.execute")
+    @mock.patch("compose_flow.commands.subcommands.deploy.print")
+    def test_unchanged_skipped(self, *mocks):
+        """
+        Ensures apps are only deployed again when they changed or with --force
+        """
+        print_mock, execute_mock, get_command_mock = mocks[0], mocks[1], mocks[4]
+
+        def deploy(args: str = ""):
+            workflow = Workflow(argv=shlex.split(f"-e dev deploy rancher {args}"))
+            workflow.environment.write = mock.Mock()
+            workflow.profile.check = mock.Mock()
+
+            execute_mock.reset_mock()
+
+            workflow.run()
+
+            return [x[0][0] for x in execute_mock.call_args_list]
+
+        self.assertEqual(
+            ["rancher apps upgrade web 1.0", "rancher apps upgrade db 1.0"], deploy()
+        )
+        self.assertEqual([], deploy())
+
+        get_command_mock.side_effect = (
+            lambda app, target: f"rancher apps upgrade {app['name']} 2.0"
+            if app["name"] == "db"
+            else f"rancher apps upgrade {app['name']} 1.0"
+        )
+
+        deploy("--plan")
+        print_mock.assert_called_with("wave 1:\n  web [unchanged]\n  db")
+
+        # apps only wait for the ones listed before them with --serial-apps
+        deploy("--plan --serial-apps")
+        print_mock.assert_called_with("wave 1:\n  web [unchanged]\n  db (after web)")
+
+        self.assertEqual(["rancher apps upgrade db 2.0"], deploy())
+        self.assertEqual(
+            ["rancher apps upgrade web 1.0", "rancher apps upgrade db 2.0"],
+            deploy("--force"),
+        )
@@ -1,7 +1,9 @@
 from unittest import TestCase, mock
 
 from compose_flow import docker
-from compose_flow.errors import DockerError, NoSuchConfig
+from compose_flow.errors import DockerError, NoSuchConfig, NoSuchService
+
+from tests.docker_recording import RecordedCli, RecordedClient, load_recording
 
 
 class DockerTestCase(TestCase):
@@ -21,3 +23,166 @@ class DockerTestCase(TestCase):
         get_docker_json_mock.side_effect = DockerError("No such config")
 
         self.assertRaises(NoSuchConfig, docker.get_config, "test")
+
+
+class TransportTestCase(TestCase):
+    def setUp(self):
+        recording = load_recording("swarm")
+
+        self.client = RecordedClient(recording)
+        self.cli = RecordedCli(recording)
+
+        patcher = mock.patch("compose_flow.docker.get_docker_output", new=self.cli)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.api_transport = docker.ApiTransport(self.client)
+        self.cli_transport = docker.CliTransport()
+
+    def assertTransportsEqual(self, method: str, *args):
+        api_result = getattr(self.api_transport, method)(*args)
+        cli_result = getattr(self.cli_transport, method)(*args)
+
+        self.assertEqual(cli_result, api_result)
+
+    def test_same_output(self, *mocks):
+        """
+        Ensures both transports return the same data for the same swarm
+        """
+        cases = (
+            ("get_config_names",),
+            ("get_configs", ["dev-app"]),
+            ("get_nodes",),
+            ("get_services",),
+            ("inspect_service", "dev-app_app"),
+            ("inspect_service", "dev-app_worker"),
+            ("inspect_services", ["dev-app_app", "dev-app_worker"]),
+        )
+
+        for case in cases:
+            with self.subTest(case=case):
+                self.assertTransportsEqual(*case)
+
+    def test_no_such_service(self, *mocks):
+        for transport in (self.api_transport, self.cli_transport):
+            with self.subTest(transport=transport.name):
+                with self.assertRaises(NoSuchService):
+                    transport.inspect_service("dev-app_missing")
+
+                with self.assertRaises(NoSuchService):
+                    transport.get_tasks("dev-app_missing")
+
+    def test_tasks(self, *mocks):
+        """
+        Ensures both transports list the same tasks
+
+        The docker command also tells how long ago the state changed.
+        """
+        api_tasks = self.api_transport.get_tasks("dev-app_app")
+        cli_tasks = self.cli_transport.get_tasks("dev-app_app")
+
+        self.assertEqual(
+            ["Running", "Starting"], [x["CurrentState"] for x in api_tasks]
+        )
+        self.assertEqual(
+            [True, False],
+            [docker.is_running(x) for x in cli_tasks],
+        )
+
+        for api_task, cli_task in zip(api_tasks, cli_tasks):
+            self.assertTrue(
+                cli_task["CurrentState"].startswith(api_task["CurrentState"])
+            )
+            self.assertEqual(
+                dict(api_task, CurrentState=None), dict(cli_task, CurrentState=None)
+            )
+
+    def test_no_such_config(self, *mocks):
+        for transport in (self.api_transport, self.cli_transport):
+            with self.subTest(transport=transport.name):
+                with self.assertRaises(NoSuchConfig):
+                    transport.get_configs(["prod-app"])
+
+    @mock.patch("compose_flow.docker.get_transport")
+    def test_get_service_configs(self, *mocks):
+        """
+        Ensures services are inspected with a single command
+        """
+        mocks[0].return_value = self.cli_transport
+
+        services = docker.get_service_configs(["dev-app_app", "dev-app_worker"])
+
+        self.assertEqual(
+            ["dev-app_app", "dev-app_worker"], [x["Spec"]["Name"] for x in services]
+        )
+        self.assertEqual(
+            ["docker service inspect dev-app_app dev-app_worker"], self.cli.commands
+        )
+
+    @mock.patch("compose_flow.docker.get_transport")
+    def test_get_service_configs_fallback(self, *mocks):
+        """
+        Ensures services are inspected one by one when the bulk call fails
+        """
+        mocks[0].return_value = self.cli_transport
+
+        services = docker.get_service_configs(["dev-app_app", "dev-app_missing"])
+
+        self.assertEqual(["dev-app_app"], [x["Spec"]["Name"] for x in services])
+        self.assertEqual(
+            "docker service inspect dev-app_app dev-app_missing", self.cli.commands[0]
+        )
+        self.assertEqual(
+            [
+                'docker service inspect dev-app_app --format "{{ json . }}"',
+                'docker service inspect dev-app_missing --format "{{ json . }}"',
+            ],
+            sorted(self.cli.commands[1:]),
+        )
+
+    def test_service_summary(self, *mocks):
+        services = self.api_transport.get_services()
+
+        self.assertEqual(
+            {
+                "ID": "q7w3e9r1t5y2",
+                "Image": "registry.example.com/app:1.0.0",
+                "Mode": "replicated",
+                "Name": "dev-app_app",
+                "Ports": "*:8000->80/tcp",
+                "Replicas": "2/2",
+            },
+            services[0],
+        )
+        self.assertEqual(["GET /services?status=true"], self.client.requests)
+
+    @mock.patch("compose_flow.docker.docker_api.get_client")
+    def test_get_transport(self, *mocks):
+        get_client_mock = mocks[0]
+
+        get_client_mock.return_value = self.client
+        self.assertEqual("api", docker.get_transport().name)
+
+        get_client_mock.return_value = None
+        self.assertEqual("cli", docker.get_transport().name)
+
+    @mock.patch("compose_flow.docker.docker_api.get_client")
+    def test_get_service_config(self, *mocks):
+        """
+        Ensures the module functions return the same data through either transport
+        """
+        get_client_mock = mocks[0]
+
+        get_client_mock.return_value = self.client
+        api_config = docker.get_service_config("dev-app_app")
+        api_contents = docker.get_config_contents(["dev-app"])
+
+        get_client_mock.return_value = None
+        cli_config = docker.get_service_config("dev-app_app")
+        cli_contents = docker.get_config_contents(["dev-app"])
+
+        self.assertEqual(cli_config, api_config)
+        self.assertEqual("dev-app_app", api_config[0]["Spec"]["Name"])
+
+        self.assertEqual(cli_contents, api_contents)
+        self.assertTrue(api_contents["dev-app"].startswith("DJANGO_DEBUG=False\n"))
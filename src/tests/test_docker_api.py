@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase, mock
+
+from compose_flow import docker, docker_api
+from compose_flow.errors import NoSuchConfig, NotConnected
+
+from tests.docker_server import FakeDockerServer
+
+
+class DockerAPITestCase(TestCase):
+    def setUp(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+
+        self.socket_path = os.path.join(tempdir, "docker.sock")
+
+        self.server = FakeDockerServer(self.socket_path)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+        patcher = mock.patch.dict(
+            os.environ, {"DOCKER_HOST": f"unix://{self.socket_path}"}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.addCleanup(self._close_clients)
+
+    @staticmethod
+    def _close_clients():
+        for client in docker_api._clients.values():
+            client.close()
+
+        docker_api._clients.clear()
+
+    def test_get_client(self, *mocks):
+        client = docker_api.get_client()
+
+        self.assertEqual(f"unix://{self.socket_path}", client.docker_host)
+        self.assertIs(client, docker_api.get_client())
+
+    def test_get_client_tcp_host(self, *mocks):
+        client = docker_api.get_client("tcp://127.0.0.1:2375")
+
+        self.assertEqual("tcp://127.0.0.1:2375", client.docker_host)
+
+    def test_get_client_unsupported_host(self, *mocks):
+        self.assertEqual(None, docker_api.get_client("ssh://user@host"))
+
+        with mock.patch.dict(os.environ, {"DOCKER_TLS_VERIFY": "1"}):
+            self.assertEqual(None, docker_api.get_client("tcp://127.0.0.1:2376"))
+
+    @mock.patch("compose_flow.docker_api.settings.DOCKER_API", False)
+    def test_get_client_disabled(self, *mocks):
+        self.assertEqual(None, docker_api.get_client())
+
+    def test_get_config_contents(self, *mocks):
+        """
+        Ensures multiple configs are read with a single request
+        """
+        self.server.add_config("dev-app", "FOO=1\n")
+        self.server.add_config("dev-app-extra", "FOO=2\n")
+        self.server.add_config("prod-app", "FOO=3\n")
+
+        contents = docker.get_config_contents(["dev-app", "prod-app"])
+
+        self.assertEqual({"dev-app": "FOO=1\n", "prod-app": "FOO=3\n"}, contents)
+        self.assertEqual([("GET", "/configs")], self.server.requests)
+
+    def test_get_config_missing(self, *mocks):
+        self.server.add_config("dev-app", "FOO=1\n")
+
+        with self.assertRaises(NoSuchConfig):
+            docker.get_config_contents(["dev-app", "prod-app"])
+
+        with self.assertRaises(NoSuchConfig):
+            docker.get_config("prod-app")
+
+    def test_load_config(self, *mocks):
+        """
+        Ensures an existing config is replaced using a single connection
+        """
+        self.server.add_config("dev-app", "FOO=1\n")
+
+        with tempfile.NamedTemporaryFile("w") as fh:
+            fh.write("FOO=2\n")
+            fh.flush()
+
+            docker.load_config("dev-app", fh.name)
+            docker.load_config("dev-app", fh.name)
+
+        self.assertEqual("FOO=2\n", self.server.get_config("dev-app"))
+        self.assertEqual(["dev-app"], docker.get_configs())
+        self.assertEqual(1, self.server.connections)
+
+    def test_remove_missing_config(self, *mocks):
+        with self.assertRaises(NoSuchConfig):
+            docker.remove_config("dev-app")
+
+    def test_reconnect(self, *mocks):
+        """
+        Ensures the client reconnects when the daemon drops the connection
+        """
+        self.server.add_config("dev-app", "FOO=1\n")
+        self.server.drop_connections = True
+
+        docker.get_config("dev-app")
+        docker.get_config("dev-app")
+
+        self.assertEqual(2, self.server.connections)
+
+    def test_not_connected(self, *mocks):
+        client = docker_api.DockerAPIClient(f"unix://{self.socket_path}.missing")
+
+        with self.assertRaises(NotConnected):
+            client.get_configs()
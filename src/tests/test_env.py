@@ -203,3 +203,190 @@ class EnvTestCase(BaseTestCase):
         buf = flow.environment.render()
 
         self.assertEqual(True, "FOO=true" in buf)
+
+    @mock.patch("compose_flow.commands.subcommands.env.get_backend")
+    def test_resolved_cached(self, *mocks):
+        """Ensure the extended environments are read from the backend once"""
+
+        def backend_read(config_name):
+            if config_name.endswith("-foo"):
+                return "FOO=true\nBAR=base"
+
+            return "CF_ENV_EXTENDS_BASENAME=foo\nBAR=override"
+
+        get_backend_mock = mocks[0]
+        backend_read_mock = get_backend_mock.return_value.read
+        backend_read_mock.side_effect = backend_read
+
+        command = shlex.split("-e dev env cat")
+        flow = Workflow(argv=command)
+
+        resolved = flow.environment.resolved
+
+        self.assertEqual("true", resolved.values["FOO"])
+        self.assertEqual("override", resolved.values["BAR"])
+        self.assertEqual(("foo",), resolved.extends)
+
+        read_count = backend_read_mock.call_count
+
+        flow.environment.render()
+        flow.environment.render()
+
+        self.assertIs(resolved, flow.environment.resolved)
+        self.assertEqual(read_count, backend_read_mock.call_count)
+
+    @mock.patch("compose_flow.commands.subcommands.env.get_backend")
+    def test_resolved_update(self, *mocks):
+        """Ensure updating the environment rebuilds the resolved environment"""
+        get_backend_mock = mocks[0]
+        get_backend_mock.return_value.read.return_value = "FOO=1"
+
+        command = shlex.split("-e dev env cat")
+        flow = Workflow(argv=command)
+
+        self.assertEqual("1", flow.environment.resolved.values["FOO"])
+
+        flow.environment.update({"FOO": "2"})
+
+        self.assertEqual("2", flow.environment.resolved.values["FOO"])
+        self.assertIn("FOO=2", flow.environment.render())
+
+    @staticmethod
+    def _chain_read(config_name):
+        chain = {
+            "dev-testdirname": "CF_ENV_EXTENDS_BASENAME=a\nFOO=1",
+            "dev-a": "CF_ENV_EXTENDS_BASENAME=b\nBAR=2",
+            "dev-b": "BAZ=3",
+        }
+
+        return chain[config_name]
+
+    @mock.patch("compose_flow.commands.subcommands.env.get_backend")
+    def test_extends_circular(self, *mocks):
+        def backend_read(config_name):
+            if config_name == "dev-b":
+                return "CF_ENV_EXTENDS_BASENAME=a"
+
+            return self._chain_read(config_name)
+
+        get_backend_mock = mocks[0]
+        get_backend_mock.return_value.bulk_read = False
+        get_backend_mock.return_value.read.side_effect = backend_read
+
+        command = shlex.split("-e dev env cat")
+        flow = Workflow(argv=command)
+
+        with self.assertRaises(errors.CircularReference) as context:
+            # noinspection PyStatementEffect
+            flow.environment.resolved
+
+        self.assertEqual(
+            "circular CF_ENV_EXTENDS_BASENAME: dev-testdirname -> dev-a -> dev-b -> dev-a",
+            str(context.exception),
+        )
+
+    @mock.patch("compose_flow.commands.subcommands.env.get_backend")
+    def test_extends_loaded_once(self, *mocks):
+        """Ensure extended environments are not read again when the env is rebuilt"""
+        get_backend_mock = mocks[0]
+        get_backend_mock.return_value.bulk_read = False
+        read_mock = get_backend_mock.return_value.read
+        read_mock.side_effect = self._chain_read
+
+        command = shlex.split("-e dev env cat")
+        flow = Workflow(argv=command)
+
+        self.assertEqual("3", flow.environment.resolved.values["BAZ"])
+
+        flow.environment.update({"FOO": "4"})
+
+        self.assertEqual("4", flow.environment.resolved.values["FOO"])
+        self.assertEqual(("a", "b"), flow.environment.resolved.extends)
+
+        read_names = [x[0][0] for x in read_mock.call_args_list]
+        self.assertEqual(1, read_names.count("dev-a"))
+        self.assertEqual(1, read_names.count("dev-b"))
+
+        # the backend is created once
+        self.assertEqual(1, get_backend_mock.call_count)
+
+    @mock.patch("compose_flow.commands.subcommands.env.get_backend")
+    def test_extends_prefetch(self, *mocks):
+        """Ensure the chain followed previously is read in a single call"""
+        get_backend_mock = mocks[0]
+        backend = get_backend_mock.return_value
+        backend.bulk_read = True
+        backend.read.side_effect = self._chain_read
+        backend.read_many.side_effect = lambda names: {
+            x: self._chain_read(x) for x in names
+        }
+
+        command = shlex.split("-e dev env cat")
+
+        flow = Workflow(argv=command)
+        flow.environment.extends_cache.clear()
+
+        self.assertEqual("3", flow.environment.resolved.values["BAZ"])
+        backend.read_many.assert_not_called()
+
+        backend.read.reset_mock()
+
+        flow = Workflow(argv=command)
+
+        self.assertEqual("3", flow.environment.resolved.values["BAZ"])
+
+        backend.read_many.assert_called_once_with(["dev-a", "dev-b"])
+        self.assertEqual([mock.call("dev-testdirname")], backend.read.call_args_list)
+
+    @mock.patch("compose_flow.commands.subcommands.env.get_backend")
+    def test_nested_substitutions(self, *mocks):
+        """Ensure values referencing other values are rendered and the originals kept"""
+        get_backend_mock = mocks[0]
+        get_backend_mock.return_value.read.return_value = (
+            "URL=https://${HOST}\nHOST=${NAME}.example.com\nNAME=app"
+        )
+
+        command = shlex.split("-e dev env cat")
+        flow = Workflow(argv=command)
+
+        data = flow.environment.data
+
+        self.assertEqual("https://app.example.com", data["URL"])
+        self.assertEqual("https://${HOST}", flow.environment._rendered_config["URL"])
+
+    @mock.patch("compose_flow.commands.subcommands.env.get_backend")
+    def test_circular_substitutions(self, *mocks):
+        get_backend_mock = mocks[0]
+        get_backend_mock.return_value.read.return_value = "FOO=${BAR}\nBAR=${FOO}"
+
+        command = shlex.split("-e dev env cat")
+        flow = Workflow(argv=command)
+
+        with self.assertRaises(errors.CircularReference):
+            # noinspection PyStatementEffect
+            flow.environment.data
+
+    @mock.patch("compose_flow.commands.subcommands.env.print")
+    @mock.patch("compose_flow.commands.subcommands.env.get_backend")
+    def test_ls_with_content(self, *mocks):
+        """Ensure environments are read in bulk when listing their content"""
+        get_backend_mock = mocks[0]
+        print_mock = mocks[1]
+
+        backend = get_backend_mock.return_value
+        backend.ls.return_value = ["prod-app", "dev-app"]
+        backend.read_many.return_value = {"dev-app": "FOO=1\n", "prod-app": "FOO=2\n"}
+
+        command = shlex.split("-e dev env ls --with-content")
+        flow = Workflow(argv=command)
+
+        flow.environment.ls()
+
+        backend.read_many.assert_called_with(["dev-app", "prod-app"])
+        backend.read.assert_not_called()
+
+        printed = [x[0][0] for x in print_mock.call_args_list]
+        self.assertEqual(
+            ["# dev-app", "FOO=1", "", "# prod-app", "FOO=2", ""],
+            printed,
+        )
@@ -0,0 +1,142 @@
+import io
+import shlex
+
+from unittest import TestCase, mock
+
+import sh
+
+from compose_flow import errors, fanout
+from compose_flow.commands import Workflow
+from compose_flow.context import WorkflowContext, activate
+
+from tests import BaseTestCase
+
+
+def fake_execute(command, env, **kwargs):
+    """
+    Stands in for compose-flow runs, failing in the prod-eu environment
+    """
+    args = shlex.split(command)
+    environment = args[args.index("-e") + 1]
+
+    kwargs["_out"](f"running {args[-1]}\n")
+
+    if environment == "prod-eu":
+        kwargs["_out"]("\nError: unable to connect\n")
+
+        raise sh.ErrorReturnCode_1(command, b"", b"")
+
+
+class FanoutTestCase(TestCase):
+    def test_is_fanout(self, *mocks):
+        self.assertEqual(False, fanout.is_fanout(None))
+        self.assertEqual(False, fanout.is_fanout("dev"))
+        self.assertEqual(True, fanout.is_fanout("dev,stage"))
+        self.assertEqual(True, fanout.is_fanout("prod-*"))
+
+    def test_get_environments(self, *mocks):
+        environments = fanout.get_environments(
+            "dev, prod-*,prod-us", ["prod-us", "dev", "prod-eu", "stage"]
+        )
+
+        self.assertEqual(["dev", "prod-eu", "prod-us"], environments)
+
+    def test_get_environments_no_match(self, *mocks):
+        with self.assertRaises(errors.NoSuchEnvironment):
+            fanout.get_environments("dev,qa-*", ["dev"])
+
+    def test_get_argv(self, *mocks):
+        """
+        Ensure only the -e before the subcommand is replaced
+        """
+        argv = shlex.split("--dirty -e dev,stage -n app service exec web -e FOO=1")
+
+        self.assertEqual(
+            shlex.split("-e stage --dirty -n app service exec web -e FOO=1"),
+            fanout.get_argv(argv, "stage", "service"),
+        )
+
+        for arg in ("--environment=dev,stage", "-edev,stage"):
+            self.assertEqual(
+                ["-e", "dev", "deploy"],
+                fanout.get_argv([arg, "deploy"], "dev", "deploy"),
+            )
+
+    @mock.patch("compose_flow.fanout.shell.execute", side_effect=fake_execute)
+    def test_run(self, *mocks):
+        stream = io.StringIO()
+
+        results = fanout.run(
+            ["-e", "dev,stage", "deploy"],
+            ["dev", "stage"],
+            command="deploy",
+            workers=2,
+            stream=stream,
+        )
+
+        self.assertEqual(["ok", "ok"], [x.status for x in results])
+
+        output = stream.getvalue()
+        self.assertIn("[dev] running deploy\n", output)
+        self.assertIn("[stage] running deploy\n", output)
+
+    @mock.patch.dict("os.environ", {"DOCKER_HOST": "unix:///tmp/process.sock"})
+    @mock.patch("compose_flow.fanout.shell.execute", side_effect=fake_execute)
+    def test_run_context_environ(self, *mocks):
+        """
+        Ensure the runs get the environment of the workflow's context rather than the process'
+        """
+        execute_mock = mocks[0]
+
+        context = WorkflowContext(environ={"DOCKER_TLS_VERIFY": "1"})
+        with activate(context):
+            fanout.run(
+                ["-e", "dev,stage", "deploy"],
+                ["dev", "stage"],
+                command="deploy",
+                workers=2,
+                stream=io.StringIO(),
+            )
+
+        for call in execute_mock.call_args_list:
+            self.assertEqual({"DOCKER_TLS_VERIFY": "1"}, call[0][1])
+
+    @mock.patch("compose_flow.fanout.shell.execute", side_effect=fake_execute)
+    def test_run_failed(self, *mocks):
+        """
+        Ensure every environment runs and the failures are summarized
+        """
+        stream = io.StringIO()
+
+        with self.assertRaises(errors.FanoutFailed) as context:
+            fanout.run(
+                ["-e", "dev,prod-eu", "deploy"],
+                ["dev", "prod-eu", "stage"],
+                command="deploy",
+                workers=1,
+                stream=stream,
+            )
+
+        lines = str(context.exception).splitlines()[1:]
+
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[0].startswith("ok       dev ("))
+        self.assertTrue(lines[1].startswith("failed   prod-eu ("))
+        self.assertTrue(lines[1].endswith("): Error: unable to connect"))
+        self.assertTrue(lines[2].startswith("ok       stage ("))
+
+
+class WorkflowFanoutTestCase(BaseTestCase):
+    @mock.patch("compose_flow.commands.workflow.fanout.run")
+    def test_workflow_fans_out(self, *mocks):
+        run_mock = mocks[0]
+
+        workflow = Workflow(argv=shlex.split("-e dev,stage --fanout-workers 3 deploy"))
+        workflow.run()
+
+        run_mock.assert_called_once()
+
+        args, kwargs = run_mock.call_args
+        self.assertEqual(["dev", "stage"], args[1])
+        self.assertEqual("deploy", kwargs["command"])
+        self.assertEqual(3, kwargs["workers"])
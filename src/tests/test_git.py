@@ -0,0 +1,125 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from unittest import TestCase, mock, skipUnless
+
+from compose_flow import git
+
+
+@skipUnless(shutil.which("git"), "git is not installed")
+class GitStateTestCase(TestCase):
+    def setUp(self):
+        self.work_tree = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.work_tree)
+
+        self.git("init", "-q")
+        self.git("config", "user.email", "test@example.com")
+        self.git("config", "user.name", "test")
+
+        self.write_file("docker-compose.yml", "services: {}\n")
+        self.write_file("compose/compose-flow.yml", "profiles: {}\n")
+        self.git("add", ".")
+        self.git("commit", "-q", "-m", "initial")
+
+        # make sure files written by the tests get a newer mtime than the index
+        time.sleep(0.01)
+
+    def git(self, *args) -> str:
+        proc = subprocess.run(
+            ["git", "-C", self.work_tree] + list(args),
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+        return proc.stdout.strip()
+
+    def write_file(self, name: str, content: str) -> None:
+        path = os.path.join(self.work_tree, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, "w") as fh:
+            fh.write(content)
+
+    def get_states(self) -> list:
+        """
+        Returns the state read with git status and the state read from files
+        """
+        with mock.patch("compose_flow.git.shell.execute") as execute_mock:
+            execute_mock.side_effect = lambda command, env: self.git(
+                *command.split()[3:]
+            )
+
+            status_state = git.get_state(self.work_tree)
+
+        with mock.patch("compose_flow.git.settings.GIT_READ_FILES", True):
+            files_state = git.get_state(os.path.join(self.work_tree, "compose"))
+
+        return [status_state, files_state]
+
+    def test_find_git_dir(self, *mocks):
+        git_dir, work_tree = git.find_git_dir(os.path.join(self.work_tree, "compose"))
+
+        self.assertEqual(os.path.join(self.work_tree, ".git"), git_dir)
+        self.assertEqual(self.work_tree, work_tree)
+
+    def test_clean(self, *mocks):
+        head = self.git("rev-parse", "HEAD")
+
+        for state in self.get_states():
+            self.assertEqual(self.work_tree, state.work_tree)
+            self.assertEqual(head, state.head)
+            self.assertEqual(True, state.is_clean)
+
+    def test_modified_file(self, *mocks):
+        self.write_file("docker-compose.yml", "services: {app: {}}\n")
+
+        for state in self.get_states():
+            self.assertEqual(False, state.is_clean)
+
+    def test_deleted_file(self, *mocks):
+        os.remove(os.path.join(self.work_tree, "docker-compose.yml"))
+
+        for state in self.get_states():
+            self.assertEqual(False, state.is_clean)
+
+    def test_rewritten_same_content(self, *mocks):
+        self.write_file("docker-compose.yml", "services: {}\n")
+
+        for state in self.get_states():
+            self.assertEqual(True, state.is_clean)
+
+    def test_tags_fingerprint(self, *mocks):
+        """
+        Ensures adding a tag or packing the refs is reflected in the fingerprint
+        """
+        fingerprint = git.get_state(self.work_tree).tags
+
+        self.git("tag", "1.0.0")
+        tagged_fingerprint = self.get_states()[1].tags
+
+        self.assertNotEqual(fingerprint, tagged_fingerprint)
+
+        self.git("pack-refs", "--all")
+
+        for state in self.get_states():
+            self.assertEqual(tagged_fingerprint, state.tags)
+
+    def test_packed_head(self, *mocks):
+        head = self.git("rev-parse", "HEAD")
+
+        self.git("pack-refs", "--all")
+
+        self.assertEqual(
+            head, git.read_ref(os.path.join(self.work_tree, ".git"), "HEAD")
+        )
+
+    def test_not_a_repository(self, *mocks):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+
+        with mock.patch("compose_flow.git.find_git_dir", return_value=(None, None)):
+            self.assertEqual(None, git.get_state(path))
@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase, mock
+
+from compose_flow import timings
+from compose_flow.cache import DiskCache
+from compose_flow.context import WorkflowContext, activate
+from compose_flow.kube.context import KUBE, RANCHER, ContextTracker
+from compose_flow.kube.mixins import KubeMixIn
+
+
+class ContextTrackerTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+        self.config_path = os.path.join(self.root, "cli2.json")
+        self._write_config('{"CurrentServer": "rancherDefault"}')
+
+        patcher = mock.patch.dict(os.environ, {"RANCHER_CONFIG_DIR": self.root})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write_config(self, content: str, mtime: int = 1000) -> None:
+        with open(self.config_path, "w") as fh:
+            fh.write(content)
+
+        os.utime(self.config_path, (mtime, mtime))
+
+    def _get_mixin(self, tracker: ContextTracker) -> KubeMixIn:
+        mixin = KubeMixIn()
+        mixin.workflow = mock.Mock()
+        mixin.logger = mock.Mock()
+        mixin.execute = mock.Mock(return_value="Cluster:dev Project:app\n")
+
+        for name, value in (("cluster_name", "dev"), ("project_name", "app")):
+            patcher = mock.patch.object(
+                KubeMixIn, name, new_callable=mock.PropertyMock, return_value=value
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        patcher = mock.patch(
+            "compose_flow.kube.mixins.get_tracker", return_value=tracker
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        return mixin
+
+    def test_is_current(self, *mocks):
+        tracker = ContextTracker()
+
+        self.assertEqual(False, tracker.is_current(RANCHER, "dev/app"))
+
+        tracker.record(RANCHER, "dev/app")
+
+        self.assertEqual(True, tracker.is_current(RANCHER, "dev/app"))
+        self.assertEqual(False, tracker.is_current(RANCHER, "prod/app"))
+
+        # contexts of other kinds are tracked separately
+        self.assertEqual(False, tracker.is_current(KUBE, "dev/app"))
+
+        self.assertEqual({"switched": 1, "skipped": 1}, tracker.counts)
+
+    def test_counted_per_run(self, *mocks):
+        """
+        Ensures the switches are counted for the run as well as for the process
+        """
+        tracker = ContextTracker()
+        tracker.record(RANCHER, "dev/app")
+
+        context = WorkflowContext(environ=dict(os.environ))
+        with activate(context):
+            tracker.is_current(RANCHER, "dev/app")
+
+        self.assertEqual({"switched": 1, "skipped": 1}, tracker.counts)
+        self.assertEqual({"kube contexts": {"skipped": 1}}, timings.get_counts(context))
+
+    def test_config_modified(self, *mocks):
+        """
+        Ensures the tracked context is not trusted once the config file changes
+        """
+        tracker = ContextTracker()
+        tracker.record(RANCHER, "dev/app")
+
+        self._write_config('{"CurrentServer": "other"}', mtime=2000)
+
+        self.assertEqual(False, tracker.is_current(RANCHER, "dev/app"))
+
+    def test_persisted(self, *mocks):
+        """
+        Ensures the context tracked by one run is used by the next
+        """
+        cache = DiskCache(os.path.join(self.root, "cache"), ttl=60)
+
+        ContextTracker(cache=cache).record(RANCHER, "dev/app")
+
+        tracker = ContextTracker(cache=cache)
+
+        self.assertEqual(True, tracker.is_current(RANCHER, "dev/app"))
+
+    def test_switch_rancher_context_once(self, *mocks):
+        """
+        Ensures the rancher cli is only run for the first switch to a context
+        """
+        mixin = self._get_mixin(ContextTracker())
+
+        mixin.switch_rancher_context()
+        mixin.switch_rancher_context()
+
+        mixin.execute.assert_called_once_with("rancher context current")
+
+    def test_switch_rancher_context_changed(self, *mocks):
+        tracker = ContextTracker()
+        tracker.record(RANCHER, "prod/app")
+
+        mixin = self._get_mixin(tracker)
+        mixin.execute.return_value = "Cluster:prod Project:app\n"
+
+        mixin.switch_rancher_context()
+
+        self.assertEqual(
+            [
+                mock.call("rancher context current"),
+                mock.call("rancher context switch app"),
+            ],
+            mixin.execute.mock_calls,
+        )
+        self.assertEqual(True, tracker.is_current(RANCHER, "dev/app"))
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase, mock
+
+from compose_flow.cache import DiskCache
+from compose_flow.kube.digests import DeployRecord, get_command_digest
+
+
+class DigestsTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def _write(self, relative_path: str, content: str) -> str:
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, "w") as fh:
+            fh.write(content)
+
+        return path
+
+    def test_command_digest(self, *mocks):
+        """
+        Ensures the digest of a command covers the content of the files it applies
+        """
+        path = self._write("manifests/a.yml", "kind: Service")
+        self._write("manifests/nested/b.yml", "kind: Deployment")
+
+        command = f"kubectl apply --validate -f {os.path.dirname(path)} --recursive"
+        digest = get_command_digest(command)
+
+        self.assertEqual(digest, get_command_digest(command))
+
+        self._write("manifests/nested/b.yml", "kind: StatefulSet")
+
+        self.assertNotEqual(digest, get_command_digest(command))
+        self.assertNotEqual(
+            get_command_digest(command), get_command_digest(f"{command} --prune")
+        )
+
+    def test_record(self, *mocks):
+        cache = DiskCache(os.path.join(self.root, "cache"))
+
+        record = DeployRecord(cache, "dev")
+        record.deployed("web", "abc")
+        record.deployed("url", None)
+        record.save()
+
+        record = DeployRecord(cache, "dev")
+
+        self.assertEqual(True, record.is_unchanged("web", "abc"))
+        self.assertEqual(False, record.is_unchanged("web", "def"))
+        self.assertEqual(False, record.is_unchanged("url", None))
+
+        # records are kept per cluster
+        self.assertEqual(False, DeployRecord(cache, "prod").is_unchanged("web", "abc"))
+
+    @mock.patch("compose_flow.kube.digests.time.time", return_value=1000.0)
+    def test_record_expires_per_entry(self, *mocks):
+        """
+        Ensures deploying some steps does not renew the record of the others
+        """
+        time_mock = mocks[0]
+
+        cache = DiskCache(os.path.join(self.root, "cache"))
+
+        record = DeployRecord(cache, "dev", ttl=100)
+        record.deployed("web", "abc")
+        record.deployed("db", "def")
+        record.save()
+
+        # a partial redeploy later on
+        time_mock.return_value = 1060.0
+
+        record = DeployRecord(cache, "dev", ttl=100)
+        record.deployed("web", "abc")
+        record.save()
+
+        # past the TTL of the first deploy
+        time_mock.return_value = 1120.0
+
+        record = DeployRecord(cache, "dev", ttl=100)
+
+        self.assertEqual(True, record.is_unchanged("web", "abc"))
+        self.assertEqual(False, record.is_unchanged("db", "def"))
@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+
+from unittest import TestCase, mock
+
+from compose_flow.cache import DiskCache
+from compose_flow.kube import inventory
+from compose_flow.kube.inventory import Inventory
+from compose_flow.kube.mixins import KubeMixIn
+
+
+class InventoryTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+        self.cache = DiskCache(self.root, ttl=60)
+
+    def _get_mixin(self, inventory_: Inventory) -> KubeMixIn:
+        mixin = KubeMixIn()
+        mixin.execute = mock.Mock(return_value="default\nmy-namespace")
+
+        for name, value in (
+            ("project_name", "app"),
+            ("rancher_scope", "https://rancher/dev/app"),
+        ):
+            patcher = mock.patch.object(
+                KubeMixIn, name, new_callable=mock.PropertyMock, return_value=value
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        patcher = mock.patch(
+            "compose_flow.kube.inventory.get_inventory", return_value=inventory_
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        return mixin
+
+    def test_fetched_once(self, *mocks):
+        """
+        Ensures a listing is fetched once per process and then read from the cache
+        """
+        fetch = mock.Mock(return_value=["a", "b"])
+
+        first = Inventory(cache=self.cache)
+        self.assertEqual(["a", "b"], first.get(inventory.HELM_APPS, "dev", fetch))
+        self.assertEqual(["a", "b"], first.get(inventory.HELM_APPS, "dev", fetch))
+
+        listing = Inventory(cache=self.cache)
+        self.assertEqual(["a", "b"], listing.get(inventory.HELM_APPS, "dev", fetch))
+
+        fetch.assert_called_once_with()
+        self.assertEqual({"fetched": 1, "process": 1}, first.counts)
+        self.assertEqual({"cache": 1}, listing.counts)
+
+        # listings are scoped
+        listing.get(inventory.HELM_APPS, "prod", fetch)
+
+        self.assertEqual(2, fetch.call_count)
+
+    def test_invalidate(self, *mocks):
+        fetch = mock.Mock(return_value=["a"])
+
+        listing = Inventory(cache=self.cache)
+        listing.get(inventory.RANCHER_APPS, "dev", fetch)
+        listing.invalidate(inventory.RANCHER_APPS, "dev")
+
+        Inventory(cache=self.cache).get(inventory.RANCHER_APPS, "dev", fetch)
+
+        self.assertEqual(2, fetch.call_count)
+
+    def test_namespace_created(self, *mocks):
+        """
+        Ensures the namespace listing is fetched again after creating a namespace
+        """
+        mixin = self._get_mixin(Inventory(cache=self.cache))
+
+        self.assertIn("my-namespace", mixin.list_rancher_namespaces())
+        self.assertIn("my-namespace", mixin.list_rancher_namespaces())
+        self.assertEqual(1, mixin.execute.call_count)
+
+        mixin.create_rancher_namespace("other-namespace")
+        mixin.list_rancher_namespaces()
+
+        self.assertEqual(
+            [
+                mock.call("rancher namespaces ls --format '{{.Namespace.ID}}'"),
+                mock.call("rancher namespaces create other-namespace"),
+                mock.call("rancher namespaces ls --format '{{.Namespace.ID}}'"),
+            ],
+            mixin.execute.mock_calls,
+        )
+
+    def test_app_installed(self, *mocks):
+        """
+        Ensures the app listing is fetched once for all apps and again after installing them
+        """
+        mixin = self._get_mixin(Inventory(cache=self.cache))
+        mixin.logger = mock.Mock()
+        mixin.execute.return_value = "existing-app"
+
+        apps = [
+            {"name": name, "version": "1.0", "namespace": "ns", "chart": "chart"}
+            for name in ("existing-app", "new-app")
+        ]
+
+        commands = [mixin.get_app_deploy_command(x) for x in apps]
+
+        self.assertEqual(
+            [
+                "rancher apps upgrade  existing-app 1.0",
+                "rancher apps install  --namespace ns --version 1.0 chart new-app",
+            ],
+            commands,
+        )
+        self.assertEqual(1, mixin.execute.call_count)
+
+        mixin.invalidate_app_listings()
+        mixin.list_rancher_apps()
+
+        self.assertEqual(2, mixin.execute.call_count)
@@ -0,0 +1,274 @@
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase, mock
+
+from compose_flow import errors
+from compose_flow.kube.checks import ManifestChecker
+from compose_flow.kube.mixins import KubeMixIn
+from compose_flow.kube.render import RenderJob, render_directory, render_files
+
+from tests.utils import get_content
+
+ENV = {
+    "AIRFLOW_HOME": "/airflow",
+    "CF_PROJECT": "airflow",
+    "DOCKER_IMAGE": "registry.example.com/airflow:1.0.0",
+    "VARIABLES_DIR": "/variables",
+}
+
+TEMPLATE = (
+    "name: ${CF_PROJECT}\nimage: {{ DOCKER_IMAGE }}\nsecret: {{ 'x' | b64encode }}\n"
+)
+
+RENDERED = "name: airflow\nimage: registry.example.com/airflow:1.0.0\nsecret: eA=="
+
+
+class RenderFilesTestCase(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+
+    def write_file(self, relative_path: str, content: str) -> str:
+        path = os.path.join(self.tempdir, relative_path)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, "w") as fh:
+            fh.write(content)
+
+        return path
+
+    def read_file(self, relative_path: str) -> str:
+        with open(os.path.join(self.tempdir, relative_path), "r") as fh:
+            return fh.read()
+
+    def make_jobs(self, count: int) -> list:
+        return [
+            RenderJob(
+                self.write_file(f"in/{idx}.yml", TEMPLATE),
+                os.path.join(self.tempdir, f"{idx}.yml"),
+            )
+            for idx in range(count)
+        ]
+
+    def test_render(self, *mocks):
+        render_files(self.make_jobs(3), ENV)
+
+        for idx in range(3):
+            self.assertEqual(RENDERED, self.read_file(f"{idx}.yml"))
+
+    @mock.patch("compose_flow.kube.render.PARALLEL_MIN_FILES", new=1)
+    def test_render_pool(self, *mocks):
+        """
+        Ensures files rendered in worker processes match the ones rendered in process
+        """
+        render_files(self.make_jobs(6), ENV, workers=2)
+
+        for idx in range(6):
+            self.assertEqual(RENDERED, self.read_file(f"{idx}.yml"))
+
+    def test_raw(self, *mocks):
+        render_files(self.make_jobs(1), None, raw=True)
+
+        self.assertEqual(TEMPLATE, self.read_file("0.yml"))
+
+    @mock.patch("compose_flow.kube.render.PARALLEL_MIN_FILES", new=1)
+    def test_check_errors(self, *mocks):
+        """
+        Ensures the errors of every failing file are reported and their outputs not written
+        """
+        good_path = self.write_file(
+            "in/good.yml", get_content("manifests/good-init-deployment.yaml")
+        )
+        bad_path = self.write_file(
+            "in/bad.yml", get_content("manifests/no-limits-deployment.yaml")
+        )
+        jobs = [
+            RenderJob(good_path, os.path.join(self.tempdir, "good.yml")),
+            RenderJob(bad_path, os.path.join(self.tempdir, "bad.yml")),
+        ]
+
+        with self.assertRaises(errors.ManifestCheck) as context:
+            render_files(jobs, ENV, checker=ManifestChecker(), workers=2)
+
+        message = str(context.exception)
+        self.assertTrue(message.startswith(f"{bad_path}: "), message)
+        self.assertNotIn(good_path, message)
+
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, "good.yml")))
+        self.assertFalse(os.path.exists(os.path.join(self.tempdir, "bad.yml")))
+
+
+class RenderNestedManifestsTestCase(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+
+        cwd = os.getcwd()
+        os.chdir(self.tempdir)
+        self.addCleanup(os.chdir, cwd)
+
+        self.mixin = KubeMixIn()
+        self.mixin.logger = mock.Mock()
+        self.mixin.workflow = mock.Mock()
+        self.mixin.workflow.environment.resolved.values = ENV
+        self.mixin.get_manifest_filename = mock.Mock(return_value="rendered")
+
+        os.makedirs("k8s/jobs")
+
+        shutil.copy(
+            os.path.join(os.path.dirname(__file__), "files/manifests/good-job.yaml"),
+            "k8s/jobs/good-job.yaml",
+        )
+        with open("k8s/deployment.yml", "w") as fh:
+            fh.write(get_content("manifests/good-init-deployment.yaml"))
+
+    @mock.patch("compose_flow.kube.mixins.print")
+    def test_render(self, *mocks):
+        # a file from a previous render that should not be deployed
+        os.makedirs("rendered")
+        with open("rendered/stale.yml", "w") as fh:
+            fh.write("stale")
+
+        rendered_path = self.mixin.render_nested_manifests("k8s", False)
+
+        self.assertEqual("rendered", rendered_path)
+        self.assertEqual(["deployment.yml", "jobs"], sorted(os.listdir(rendered_path)))
+        self.assertEqual(["good-job.yaml"], os.listdir("rendered/jobs"))
+
+        with open("rendered/deployment.yml", "r") as fh:
+            self.assertIn("image: registry.example.com/airflow:1.0.0", fh.read())
+
+        self.assertEqual(
+            [
+                mock.call("rendered/deployment.yml"),
+                mock.call("rendered/jobs/good-job.yaml"),
+            ],
+            mocks[0].call_args_list,
+        )
+
+    @mock.patch("compose_flow.kube.mixins.print")
+    def test_render_check_error(self, *mocks):
+        """
+        Ensures a failed render keeps the previous render in place
+        """
+        os.makedirs("rendered")
+
+        with open("k8s/no-limits.yml", "w") as fh:
+            fh.write(get_content("manifests/no-limits-deployment.yaml"))
+
+        with self.assertRaises(errors.ManifestCheck):
+            self.mixin.render_nested_manifests("k8s", False)
+
+        self.assertEqual(["k8s", "rendered"], sorted(os.listdir(".")))
+
+
+class RenderDirectoryTestCase(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+
+        self.source_path = os.path.join(self.tempdir, "k8s")
+        self.rendered_path = os.path.join(self.tempdir, "rendered")
+
+        self.env = {"NAME": "app", "IMAGE": "app:1.0.0", "PASSWORD": "secret"}
+
+        self.write_source("app.yml", "name: ${NAME}\n")
+        self.write_source("jobs/job.yml", "image: ${IMAGE}\n")
+        self.write_source("secret.yml", "password: {{ PASSWORD | b64encode }}\n")
+
+    def write_source(self, relative_path: str, content: str) -> None:
+        path = os.path.join(self.source_path, relative_path)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, "w") as fh:
+            fh.write(content)
+
+    def read_output(self, relative_path: str) -> str:
+        with open(os.path.join(self.rendered_path, relative_path), "r") as fh:
+            return fh.read()
+
+    def render(self) -> list:
+        return render_directory(self.source_path, self.rendered_path, self.env)
+
+    def test_unchanged(self, *mocks):
+        self.assertEqual(["app.yml", "jobs/job.yml", "secret.yml"], self.render())
+        self.assertEqual([], self.render())
+
+        self.assertEqual("name: app\n", self.read_output("app.yml"))
+        self.assertEqual("password: c2VjcmV0", self.read_output("secret.yml"))
+
+    def test_changed_input(self, *mocks):
+        self.render()
+
+        self.write_source("app.yml", "name: ${NAME}-web\n")
+
+        self.assertEqual(["app.yml"], self.render())
+        self.assertEqual("name: app-web\n", self.read_output("app.yml"))
+
+    def test_changed_variables(self, *mocks):
+        """
+        Ensures only manifests referencing a changed variable are rendered
+        """
+        self.render()
+
+        self.env["UNUSED"] = "1"
+        self.assertEqual([], self.render())
+
+        self.env["IMAGE"] = "app:2.0.0"
+        self.assertEqual(["jobs/job.yml"], self.render())
+
+        self.env["PASSWORD"] = "changed"
+        self.assertEqual(["secret.yml"], self.render())
+
+    def test_changed_output(self, *mocks):
+        self.render()
+
+        with open(os.path.join(self.rendered_path, "app.yml"), "w") as fh:
+            fh.write("name: edited\n")
+
+        self.assertEqual(["app.yml"], self.render())
+        self.assertEqual("name: app\n", self.read_output("app.yml"))
+
+    def test_prune(self, *mocks):
+        """
+        Ensures outputs of removed manifests are removed, along with empty directories
+        """
+        self.render()
+
+        os.remove(os.path.join(self.source_path, "jobs/job.yml"))
+
+        self.assertEqual([], self.render())
+        self.assertEqual(
+            ["app.yml", "secret.yml"], sorted(os.listdir(self.rendered_path))
+        )
+
+    @mock.patch("compose_flow.kube.render.PARALLEL_MIN_FILES", new=1)
+    def test_check_error(self, *mocks):
+        """
+        Ensures a failed render does not touch the previous render or its state
+        """
+        self.render()
+
+        self.env["NAME"] = "web"
+        self.write_source(
+            "deployment.yml", get_content("manifests/no-limits-deployment.yaml")
+        )
+
+        with self.assertRaises(errors.ManifestCheck):
+            render_directory(
+                self.source_path,
+                self.rendered_path,
+                self.env,
+                checker=ManifestChecker(),
+                workers=2,
+            )
+
+        self.assertEqual("name: app\n", self.read_output("app.yml"))
+        self.assertEqual(
+            [".rendered.render.json", "k8s", "rendered"],
+            sorted(os.listdir(self.tempdir)),
+        )
@@ -0,0 +1,148 @@
+import io
+import threading
+
+from unittest import TestCase, mock
+
+from compose_flow import errors
+from compose_flow.kube import scheduler
+from compose_flow.kube.scheduler import Step
+
+
+def get_steps() -> list:
+    return [
+        Step("rancher apps install a", "a"),
+        Step("rancher apps install b", "b"),
+        Step("kubectl apply -f crd.yml", "crd.yml", scheduler.MANIFESTS_WAVE, "ns"),
+        Step("kubectl apply -f app.yml", "app.yml", scheduler.MANIFESTS_WAVE, "ns"),
+        Step(
+            "kubectl apply -f other.yml", "other.yml", scheduler.MANIFESTS_WAVE, "other"
+        ),
+    ]
+
+
+class SchedulerTestCase(TestCase):
+    def test_concurrent(self, *mocks):
+        """
+        Ensures independent steps run at the same time
+        """
+        barrier = threading.Barrier(2, timeout=5)
+
+        def run(step):
+            if step.name in ("a", "b"):
+                barrier.wait()
+
+        results = scheduler.run_steps(get_steps(), run, workers=2)
+
+        self.assertEqual([scheduler.OK] * 5, [x.status for x in results])
+
+    def test_order(self, *mocks):
+        """
+        Ensures manifests run after apps and in order within a namespace
+        """
+        lock = threading.Lock()
+        labels = []
+
+        def run(step):
+            with lock:
+                labels.append(step.name)
+
+        scheduler.run_steps(get_steps(), run, workers=4)
+
+        self.assertEqual(["a", "b"], sorted(labels[:2]))
+        self.assertLess(labels.index("crd.yml"), labels.index("app.yml"))
+
+    def test_fail_fast(self, *mocks):
+        """
+        Ensures no steps are started after a step fails
+        """
+        run = mock.Mock(side_effect=[None, Exception("chart not found\nmore")])
+
+        with self.assertRaises(errors.DeployFailed) as context:
+            scheduler.run_steps(get_steps(), run, workers=1)
+
+        self.assertEqual(2, run.call_count)
+
+        lines = str(context.exception).splitlines()
+        self.assertEqual("deploy failed:", lines[0])
+        self.assertRegex(lines[1], r"^ok       a \(\d+\.\ds\)$")
+        self.assertRegex(lines[2], r"^failed   b \(\d+\.\ds\): chart not found$")
+        self.assertEqual(
+            ["skipped  crd.yml", "skipped  app.yml", "skipped  other.yml"], lines[3:]
+        )
+
+    def test_output_prefixed(self, *mocks):
+        stream = io.StringIO()
+
+        output = scheduler.get_output("web", stream=stream)
+        output("line 1\n")
+        output("line 2")
+
+        self.assertEqual("[web] line 1\n[web] line 2\n", stream.getvalue())
+
+    def test_depends_on(self, *mocks):
+        """
+        Ensures a step starts once the steps it depends on finished
+        """
+        lock = threading.Lock()
+        labels = []
+
+        def run(step):
+            with lock:
+                labels.append(step.name)
+
+        steps = [
+            Step("rancher apps install web", "web", depends_on=("db",)),
+            Step("rancher apps install db", "db"),
+            Step("kubectl apply -f job.yml", "job.yml", 0),
+        ]
+
+        scheduler.run_steps(steps, run, workers=4)
+
+        self.assertEqual(["job.yml", "db", "web"], labels)
+
+    def test_plan(self, *mocks):
+        steps = get_steps() + [
+            Step("rancher apps install web", "web", depends_on=("a", "b")),
+            Step("kubectl apply -f job.yml", "job.yml", 3, depends_on=("web",)),
+        ]
+
+        self.assertEqual(
+            "wave 1:\n"
+            "  a\n"
+            "  b\n"
+            "  web (after a, b)\n"
+            "wave 2:\n"
+            "  crd.yml\n"
+            "  app.yml (after crd.yml)\n"
+            "  other.yml\n"
+            "wave 3:\n"
+            "  job.yml",
+            scheduler.format_plan(steps),
+        )
+
+    def test_invalid_plan(self, *mocks):
+        invalid = [
+            (
+                [Step("install a", "a", depends_on=("missing",))],
+                "a depends on missing, which is not deployed",
+            ),
+            (
+                [Step("install a", "a", depends_on=("b",)), Step("install b", "b", 2)],
+                "a in wave 1 depends on b in the later wave 2",
+            ),
+            (
+                [
+                    Step("install a", "a", depends_on=("c",)),
+                    Step("install b", "b", depends_on=("a",)),
+                    Step("install c", "c", depends_on=("b",)),
+                ],
+                "circular depends_on: a -> c -> b -> a",
+            ),
+        ]
+
+        for steps, message in invalid:
+            with self.subTest(message=message):
+                with self.assertRaises(errors.InvalidDeployPlan) as context:
+                    scheduler.run_steps(steps, mock.Mock())
+
+                self.assertEqual(message, str(context.exception))
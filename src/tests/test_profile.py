@@ -1,3 +1,6 @@
+import shutil
+import tempfile
+
 from unittest import TestCase, mock
 
 from compose_flow.commands.subcommands.profile import Profile
@@ -249,3 +252,85 @@ class ProfileTestCase(TestCase):
         self.assertEqual(
             resources["limits"]["memory"], resources["reservations"]["memory"]
         )
+
+
+@mock.patch(
+    "compose_flow.commands.subcommands.profile.get_package_version",
+    return_value="1.0.0",
+)
+@mock.patch("compose_flow.commands.subcommands.profile.merge_profile")
+class ProfileCacheTestCase(TestCase):
+    def setUp(self):
+        self.workflow = mock.Mock()
+        self.workflow.config_name = "test-stack"
+
+        self.cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_root)
+
+        self.settings_patcher = mock.patch(
+            "compose_flow.commands.subcommands.profile.settings.CACHE_ROOT",
+            self.cache_root,
+        )
+        self.settings_patcher.start()
+        self.addCleanup(self.settings_patcher.stop)
+
+    def test_compile_cached(self, *mocks):
+        """
+        Ensures a second compile of an unchanged profile does not merge the overlays
+        """
+        merge_profile_mock = mocks[0]
+        merge_profile_mock.return_value = get_content(
+            "profiles/limit_no_reservation.yml"
+        )
+
+        content = Profile(self.workflow)._compile([])
+        cached_content = Profile(self.workflow)._compile([])
+
+        self.assertEqual(1, merge_profile_mock.call_count)
+        self.assertEqual(content, cached_content)
+
+    def test_compile_key_changes_with_config_name(self, *mocks):
+        merge_profile_mock = mocks[0]
+        merge_profile_mock.return_value = get_content(
+            "profiles/limit_no_reservation.yml"
+        )
+
+        Profile(self.workflow)._compile([])
+
+        self.workflow.config_name = "other-stack"
+        content = Profile(self.workflow)._compile([])
+
+        self.assertEqual(2, merge_profile_mock.call_count)
+        self.assertIn("DOCKER_STACK=other-stack", content)
+
+    def test_compile_not_cached_without_version(self, *mocks):
+        """
+        Ensures the cache is skipped when the compose-flow version is not known
+        """
+        merge_profile_mock = mocks[0]
+        merge_profile_mock.return_value = get_content(
+            "profiles/limit_no_reservation.yml"
+        )
+
+        get_package_version_mock = mocks[1]
+        get_package_version_mock.side_effect = Exception("not installed")
+
+        Profile(self.workflow)._compile([])
+        Profile(self.workflow)._compile([])
+
+        self.assertEqual(2, merge_profile_mock.call_count)
+
+    @mock.patch("compose_flow.commands.subcommands.profile.print")
+    def test_action_cache_clear(self, *mocks):
+        merge_profile_mock = mocks[1]
+        merge_profile_mock.return_value = get_content(
+            "profiles/limit_no_reservation.yml"
+        )
+
+        profile = Profile(self.workflow)
+        profile._compile([])
+
+        self.workflow.args.clear = True
+        profile.action_cache()
+
+        self.assertEqual([], profile.compile_cache.entries())
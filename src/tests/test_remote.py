@@ -1,6 +1,7 @@
 from functools import lru_cache
 from unittest import TestCase, mock
 
+from compose_flow import errors
 from compose_flow.commands.subcommands.remote import Remote
 
 TEST_USERNAME = "testuser"
@@ -48,3 +49,41 @@ class RemoteTestCase(TestCase):
         remote = Remote(self.workflow)
 
         self.assertEqual(remote.username, username)
+
+    @mock.patch("compose_flow.commands.subcommands.remote.tunnel.get_tunnel")
+    def test_make_connection_reuses_tunnel(self, *mocks):
+        """
+        Ensure a tunnel that is already up is reported as connected
+        """
+        get_tunnel_mock = mocks[0]
+        get_tunnel_mock.return_value.connect.return_value = False
+
+        self.workflow.args.remote = "dev"
+        self.workflow.app_config = {"remotes": {"dev": {"ssh": "testremotehost"}}}
+
+        remote = Remote(self.workflow)
+
+        with self.assertRaises(errors.AlreadyConnected):
+            remote.make_connection(use_existing=True)
+
+        get_tunnel_mock.assert_called_once()
+        self.assertEqual(
+            "/tmp/compose-flow-testremotehost.sock", get_tunnel_mock.call_args[0][1]
+        )
+
+    @mock.patch("compose_flow.commands.subcommands.remote.tunnel.ping")
+    def test_status_pings_docker(self, *mocks):
+        """
+        Ensure the status comes from docker answering through the socket
+        """
+        ping_mock = mocks[0]
+        ping_mock.return_value = False
+
+        self.workflow.app_config = {}
+
+        remote = Remote(self.workflow)
+
+        self.assertEqual(
+            False, remote.status(docker_host="unix:///tmp/test.sock", do_print=False)
+        )
+        ping_mock.assert_called_with("/tmp/test.sock")
@@ -3,6 +3,7 @@ import shlex
 
 from unittest import mock
 
+from compose_flow import errors
 from compose_flow.commands import Workflow
 
 from tests import BaseTestCase
@@ -18,10 +19,13 @@ class ServiceTestCase(BaseTestCase):
 
         service = workflow.subcommand
 
+        service.wait_for_containers = mock.MagicMock()
         service.select_container = mock.MagicMock()
-        service.select_container.return_value = (
-            "container_id service_name something test_hostname"
-        )
+        service.select_container.return_value = {
+            "ID": "container_id",
+            "Name": "service_name",
+            "Node": "test_hostname",
+        }
 
         workflow.run()
 
@@ -33,3 +37,54 @@ class ServiceTestCase(BaseTestCase):
         command_re = re.compile(r"docker exec .* service_name\.container_id /bin/bash")
 
         self.assertEqual(True, command_re.search(args_s) is not None)
+
+    @mock.patch("compose_flow.commands.subcommands.service.time.sleep")
+    @mock.patch("compose_flow.commands.subcommands.service.docker.get_tasks")
+    def test_waits_for_running_container(self, *mocks):
+        """
+        Ensure the service is listed again, backing off, until a task runs
+        """
+        get_tasks_mock, sleep_mock = mocks[0], mocks[1]
+
+        task = {
+            "ID": "abc123",
+            "Name": "test-service_app.1",
+            "Node": "ip-10-0-0-1",
+            "CurrentState": "Starting 1 second ago",
+        }
+        get_tasks_mock.side_effect = [
+            errors.NoSuchService(),
+            [task],
+            [dict(task, CurrentState="Running 1 second ago")],
+        ]
+
+        workflow = Workflow(
+            argv=shlex.split("-e test -n service service exec app /bin/bash")
+        )
+        workflow.run()
+
+        self.assertEqual(3, get_tasks_mock.call_count)
+        self.assertEqual(2, sleep_mock.call_count)
+        for call in sleep_mock.call_args_list:
+            self.assertLess(call[0][0], 2.0)
+
+        ssh_args = " ".join(self.sh_mock.ssh.mock_calls[0][1])
+        self.assertIn("@10.0.0.1 docker exec", ssh_args)
+        self.assertIn("test-service_app.1.abc123 /bin/bash", ssh_args)
+
+    @mock.patch("compose_flow.commands.subcommands.service.time.sleep")
+    @mock.patch(
+        "compose_flow.commands.subcommands.service.docker.get_tasks", return_value=[]
+    )
+    def test_no_running_container(self, *mocks):
+        get_tasks_mock, sleep_mock = mocks[0], mocks[1]
+
+        workflow = Workflow(
+            argv=shlex.split("-e test service exec --retries 3 app /bin/bash")
+        )
+
+        with self.assertRaises(SystemExit):
+            workflow.run()
+
+        self.assertEqual(3, get_tasks_mock.call_count)
+        self.assertEqual(2, sleep_mock.call_count)
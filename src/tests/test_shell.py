@@ -1,6 +1,7 @@
 from unittest import TestCase, mock
 
 from compose_flow import shell
+from compose_flow.context import WorkflowContext, activate
 
 from tests import BaseTestCase
 
@@ -16,3 +17,17 @@ class ShellTestCase(BaseTestCase):
         shell.execute("docker ps", env)
 
         self.sh_mock.docker.assert_called_with("ps", _env=env)
+
+    @mock.patch.dict("os.environ", {"DOCKER_HOST": "unix:///tmp/process.sock"})
+    def test_execute_context_environ(self, *mocks):
+        """
+        Ensure the included variables come from the context rather than the process
+        """
+        context = WorkflowContext(environ={"DOCKER_TLS_VERIFY": "1", "FOO": "1"})
+
+        with activate(context):
+            shell.execute("docker ps", {"BAR": "1"})
+
+        env = self.sh_mock.docker.call_args[1]["_env"]
+
+        self.assertEqual({"BAR": "1", "DOCKER_TLS_VERIFY": "1"}, env)
@@ -0,0 +1,67 @@
+import shlex
+
+from unittest import TestCase, mock
+
+from compose_flow.commands import Workflow
+from compose_flow.commands.subcommands import (
+    find_subcommands,
+    load_subcommand,
+    resolve_subcommand_name,
+)
+from compose_flow.commands.subcommands.registry import SUBCOMMANDS
+
+
+class SubcommandRegistryTestCase(TestCase):
+    def test_registry_up_to_date(self, *mocks):
+        """
+        Ensure the static registry lists every subcommand found in the package
+
+        When this fails, run `scripts/generate_subcommand_registry.py`
+        """
+        discovered = {}
+        for subcommand_cls in find_subcommands():
+            discovered[subcommand_cls.__name__.lower()] = (
+                subcommand_cls.__module__.rsplit(".", 1)[-1],
+                subcommand_cls.__name__,
+                list(getattr(subcommand_cls, "aliases", [])),
+            )
+
+        self.assertEqual(discovered, SUBCOMMANDS)
+
+    def test_load_subcommand(self, *mocks):
+        """
+        Ensure the registered class is returned for a subcommand name
+        """
+        subcommand_cls = load_subcommand("remoteconfig")
+
+        self.assertEqual("RemoteConfig", subcommand_cls.__name__)
+
+    def test_resolve_unknown_subcommand(self, *mocks):
+        self.assertEqual(None, resolve_subcommand_name("not-a-subcommand"))
+
+    @mock.patch(
+        "compose_flow.commands.workflow.load_subcommand", side_effect=load_subcommand
+    )
+    def test_only_selected_subcommand_loaded(self, *mocks):
+        """
+        Ensure the workflow only imports the subcommand given on the command line
+        """
+        load_subcommand_mock = mocks[0]
+
+        workflow = Workflow(argv=shlex.split("-e dev env cat"))
+
+        load_subcommand_mock.assert_called_once_with("env")
+
+        self.assertEqual("Env", workflow.args.subcommand_cls.__name__)
+        self.assertEqual("cat", workflow.args.action)
+
+    @mock.patch("compose_flow.commands.workflow.load_subcommand")
+    def test_version_loads_no_subcommand(self, *mocks):
+        """
+        Ensure `--version` does not import any subcommand
+        """
+        load_subcommand_mock = mocks[0]
+
+        Workflow(argv=["--version"])
+
+        load_subcommand_mock.assert_not_called()
@@ -0,0 +1,66 @@
+import shlex
+
+from unittest import mock
+
+from compose_flow.commands import Workflow
+
+from tests import BaseTestCase
+from tests.docker_recording import RecordedCli, RecordedClient, load_recording
+
+EXPECTED_INSPECT = """\
+service_name    status_has_node_constraint    status_has_limits    status_has_reservations
+--------------  ----------------------------  -------------------  -------------------------
+dev-app_app     True                          True                 True
+dev-app_worker  Global                        False                False"""
+
+
+# noinspection PyUnusedLocal
+@mock.patch("compose_flow.commands.subcommands.swarm.print")
+@mock.patch("compose_flow.commands.workflow.PROJECT_NAME", new="testdirname")
+@mock.patch("compose_flow.config.read_project_config", return_value=dict())
+class SwarmTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        recording = load_recording("swarm")
+
+        self.client = RecordedClient(recording)
+        self.cli = RecordedCli(recording)
+
+        patcher = mock.patch("compose_flow.docker.get_docker_output", new=self.cli)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _inspect(self, print_mock) -> str:
+        flow = Workflow(argv=shlex.split("-e dev swarm inspect"))
+        flow.subcommand.action_inspect()
+
+        return print_mock.call_args[0][0]
+
+    @mock.patch("compose_flow.docker.docker_api.get_client", return_value=None)
+    def test_inspect_cli(self, *mocks):
+        """
+        Ensures all services are inspected with a single docker command
+        """
+        output = self._inspect(mocks[-1])
+
+        self.assertEqual(EXPECTED_INSPECT, output)
+        self.assertEqual(
+            [
+                'docker service ls --format "{{ json . }}"',
+                "docker service inspect dev-app_app dev-app_worker",
+            ],
+            self.cli.commands,
+        )
+
+    @mock.patch("compose_flow.docker.docker_api.get_client")
+    def test_inspect_api(self, *mocks):
+        mocks[0].return_value = self.client
+
+        output = self._inspect(mocks[-1])
+
+        self.assertEqual(EXPECTED_INSPECT, output)
+        self.assertEqual(
+            ["GET /services?status=true", "GET /services"], self.client.requests
+        )
+        self.assertEqual([], self.cli.commands)
@@ -0,0 +1,122 @@
+from unittest import TestCase, mock
+
+from compose_flow import template
+from compose_flow.errors import CircularReference, EnvError
+from compose_flow.template import Template, Variable
+
+
+class VariableTestCase(TestCase):
+    def test_parse(self, *mocks):
+        self.assertEqual(Variable("FOO"), Variable.parse("FOO"))
+        self.assertEqual(Variable("FOO", ":-", "bar"), Variable.parse("FOO:-bar"))
+        self.assertEqual(Variable("FOO", "-", "a-b"), Variable.parse("FOO-a-b"))
+        self.assertEqual(Variable("FOO", ":?", "err"), Variable.parse("FOO:?err"))
+        self.assertEqual(Variable("FOO", "?", ""), Variable.parse("FOO?"))
+
+    def test_parse_unsupported_modifier(self, *mocks):
+        self.assertEqual(Variable("FOO"), Variable.parse("FOO:+bar"))
+
+
+class TemplateTestCase(TestCase):
+    def test_render(self, *mocks):
+        env = {"FOO": "foo", "EMPTY": ""}
+
+        for content, expected in (
+            ("${FOO}", "foo"),
+            ("a ${FOO} b ${FOO}", "a foo b foo"),
+            ("${EMPTY}", ""),
+            ("${FOO:-default}", "foo"),
+            ("${EMPTY:-default}", "default"),
+            ("${MISSING:-default}", "default"),
+            ("${EMPTY-default}", ""),
+            ("${MISSING-default}", "default"),
+            ("${FOO:?must be set}", "foo"),
+            ("${EMPTY?must be set}", ""),
+            ("$FOO ${FOO", "$FOO ${FOO"),
+        ):
+            with self.subTest(content=content):
+                self.assertEqual(expected, Template(content).render(env))
+
+    def test_multiple_defaults_on_same_line(self, *mocks):
+        """
+        Ensures a default value does not swallow the rest of the line
+        """
+        rendered = Template("${A:-a} ${B:-b} ${C}").render({"C": "c"})
+
+        self.assertEqual("a b c", rendered)
+
+    def test_missing(self, *mocks):
+        for content in ("${MISSING}", "${EMPTY:?}", "${MISSING?must be set}"):
+            with self.subTest(content=content):
+                with self.assertRaises(EnvError):
+                    Template(content).render({"EMPTY": ""})
+
+    @mock.patch("compose_flow.template.Template.logger")
+    def test_error_message(self, *mocks):
+        logger_mock = mocks[0]
+
+        with self.assertRaises(EnvError):
+            Template("${FOO?FOO is required} ${BAR}").render({})
+
+        logger_mock.error.assert_called_with(
+            "FOO: FOO is required\nBAR not found in environment"
+        )
+
+    def test_get_template_cached(self, *mocks):
+        content = "cached ${FOO}"
+
+        self.assertIs(template.get_template(content), template.get_template(content))
+
+    @mock.patch("compose_flow.template.TEMPLATE_CACHE_SIZE", 2)
+    def test_get_template_cache_size(self, *mocks):
+        for idx in range(5):
+            template.get_template(f"${{FOO}} {idx}")
+
+        self.assertEqual(2, len(template._cache))
+
+
+class ResolveReferencesTestCase(TestCase):
+    def test_nested_references(self, *mocks):
+        values = {
+            "URL": "${SCHEME}://${HOST}",
+            "HOST": "${NAME}.example.com",
+            "SCHEME": "https",
+            "NAME": "app",
+        }
+
+        resolved = template.resolve_references(values)
+
+        self.assertEqual("https://app.example.com", resolved["URL"])
+        self.assertEqual("app.example.com", resolved["HOST"])
+        self.assertEqual(list(values.keys()), list(resolved.keys()))
+
+    @mock.patch("compose_flow.template.Template.render", autospec=True)
+    def test_each_value_rendered_once(self, *mocks):
+        render_mock = mocks[0]
+        render_mock.return_value = "rendered"
+
+        template.resolve_references({"A": "${B}", "B": "${C}", "C": "${D}", "D": "d"})
+
+        self.assertEqual(3, render_mock.call_count)
+
+    def test_circular_reference(self, *mocks):
+        values = {"A": "${B}", "B": "x-${C}", "C": "${A}", "D": "${A}"}
+
+        with self.assertRaises(CircularReference) as context:
+            template.resolve_references(values)
+
+        self.assertIn("A -> B -> C -> A", str(context.exception))
+
+    def test_self_reference(self, *mocks):
+        with self.assertRaises(CircularReference) as context:
+            template.resolve_references({"A": "${A}-suffix"})
+
+        self.assertIn("A -> A", str(context.exception))
+
+    def test_missing_reference(self, *mocks):
+        resolved = template.resolve_references({"A": "${MISSING:-default}"})
+
+        self.assertEqual("default", resolved["A"])
+
+        with self.assertRaises(EnvError):
+            template.resolve_references({"A": "${MISSING}"})
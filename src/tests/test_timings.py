@@ -0,0 +1,158 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+
+from unittest import TestCase, mock
+
+import sh
+
+from compose_flow import shell, timings
+from compose_flow.context import WorkflowContext, activate
+
+
+class TimingsTestCase(TestCase):
+    def setUp(self):
+        timings.clear()
+
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_execute_recorded(self, *mocks):
+        with timings.phase("deploy"), timings.subcommand("deploy"):
+            shell.execute("echo hello", {})
+
+        with self.assertRaises(sh.ErrorReturnCode):
+            shell.execute("false", {})
+
+        ok, failed = timings.get_timings()
+
+        self.assertEqual(("echo hello", "deploy", "deploy"), ok[:3])
+        self.assertEqual(0, ok.exit_code)
+        self.assertEqual(6, ok.bytes_out)
+
+        self.assertEqual(("false", None, None), failed[:3])
+        self.assertEqual(1, failed.exit_code)
+
+    def test_streamed_output_counted(self, *mocks):
+        lines = []
+
+        shell.execute("echo hello", {}, _out=lines.append)
+
+        self.assertEqual(["hello\n"], lines)
+        self.assertEqual(6, timings.get_timings()[0].bytes_out)
+
+    def test_recorded_per_context(self, *mocks):
+        """
+        Ensures workflows running at the same time each record their own phases and commands
+        """
+        contexts = [WorkflowContext(environ={}) for _ in range(2)]
+        barrier = threading.Barrier(2)
+
+        def run(context, name):
+            with activate(context), timings.phase(name):
+                # both phases are entered before either command runs
+                barrier.wait()
+
+                shell.execute(f"echo {name}", {})
+
+        threads = [
+            threading.Thread(target=run, args=(x, f"phase{i}"))
+            for i, x in enumerate(contexts)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for i, context in enumerate(contexts):
+            recorded = timings.get_timings(context)
+
+            self.assertEqual(
+                [(f"echo phase{i}", f"phase{i}")], [x[:2] for x in recorded]
+            )
+
+        self.assertEqual([], timings.get_timings())
+
+    def test_redact(self, *mocks):
+        """
+        Ensures long arguments, such as patches carrying an environment, are not recorded
+        """
+        patch = '{"data": {"_env": "%s"}}' % ("x" * 100)
+
+        self.assertEqual(
+            "kubectl patch secrets app --patch '<122 chars>'",
+            timings.redact(f"kubectl patch secrets app --patch '{patch}'"),
+        )
+
+    def test_trace(self, *mocks):
+        path = os.path.join(self.root, "trace.jsonl")
+
+        with mock.patch("compose_flow.timings.settings.TRACE_FILE", path):
+            with timings.phase("profile"):
+                shell.execute("echo hello", {})
+
+        trace = timings.read_trace(path)
+
+        self.assertEqual(timings.get_timings(), trace)
+
+        event = timings.to_chrome_trace(trace)["traceEvents"][0]
+
+        self.assertEqual(
+            ("echo hello", "profile", "X"), (event["name"], event["cat"], event["ph"])
+        )
+        self.assertEqual(int(trace[0].start * 1e6), event["ts"])
+        self.assertEqual(
+            {"subcommand": None, "exit_code": 0, "bytes_out": 6}, event["args"]
+        )
+
+    def test_summary(self, *mocks):
+        records = [
+            timings.CommandTiming(
+                "kubectl get pods", "deploy", "deploy", 0, 1.5, 0, 10, 1
+            ),
+            timings.CommandTiming(
+                "kubectl apply -f a.yml", "deploy", "deploy", 0, 2.0, 0, 20, 1
+            ),
+            timings.CommandTiming("tag-version", "environment", None, 0, 0.25, 0, 5, 1),
+        ]
+
+        self.assertEqual(
+            "phase                program          count    total      max\n"
+            "deploy               kubectl              2    3.50s    2.00s\n"
+            "environment          tag-version          1    0.25s    0.25s\n"
+            "\n"
+            "slowest commands:\n"
+            "   2.00s exit=0 bytes=20 kubectl apply -f a.yml\n"
+            "   1.50s exit=0 bytes=10 kubectl get pods\n"
+            "   0.25s exit=0 bytes=5 tag-version\n"
+            "\n"
+            "3 commands, 3.75s",
+            timings.format_summary(records),
+        )
+
+    def test_counts_summarized(self, *mocks):
+        """
+        Ensures the counted events are printed after the commands
+        """
+        context = WorkflowContext(environ={})
+
+        with activate(context):
+            timings.count("kube contexts", "skipped")
+            timings.count("kube contexts", "skipped")
+            timings.count("kube contexts", "switched")
+            timings.count("kube listings", "cache")
+
+            stream = io.StringIO()
+            timings.print_summary(stream)
+
+        self.assertTrue(
+            stream.getvalue().endswith(
+                "\n\nkube contexts: 2 skipped, 1 switched\nkube listings: 1 cache\n"
+            )
+        )
+
+        timings.clear(context)
+
+        self.assertEqual({}, timings.get_counts(context))
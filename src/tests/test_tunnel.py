@@ -0,0 +1,196 @@
+import os
+import shlex
+import shutil
+import socket
+import tempfile
+
+from unittest import TestCase, mock
+
+import sh
+
+from compose_flow import tunnel
+from compose_flow.cache import DiskCache
+from compose_flow.errors import NotConnected
+
+from tests.docker_server import FakeDockerServer
+
+
+class FakeSSH(object):
+    """
+    Stands in for ssh and the remote sshd, forwarding to a fake docker daemon
+    """
+
+    def __init__(self):
+        self.commands = []
+
+        # the docker daemon reachable through the forward, None when it is not set up
+        self.server = None
+        self.master = False
+
+        # when False, docker does not answer through new forwards
+        self.docker_up = True
+
+    def __call__(self, command: str) -> str:
+        self.commands.append(command)
+
+        args = shlex.split(command)
+        control_path = args[args.index("-o") + 1].split("=", 1)[1]
+
+        if "-O" in args:
+            operation = args[args.index("-O") + 1]
+            if not self.master:
+                raise sh.ErrorReturnCode_255(command, b"", b"Control socket connect")
+
+            if operation == "exit":
+                self.drop_forward()
+                self.master = False
+
+                os.remove(control_path)
+            elif operation == "forward":
+                self.add_forward(args)
+
+            return ""
+
+        self.master = True
+        with open(control_path, "w"):
+            pass
+
+        self.add_forward(args)
+
+        return ""
+
+    def add_forward(self, args) -> None:
+        socket_path = args[args.index("-L") + 1].split(":", 1)[0]
+
+        # StreamLocalBindUnlink
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        if not self.docker_up:
+            # the forward is there but nothing answers behind it
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(socket_path)
+            sock.close()
+
+            return
+
+        self.server = FakeDockerServer(socket_path)
+        self.server.start()
+
+    def drop_forward(self) -> None:
+        if self.server:
+            self.server.stop()
+
+        self.server = None
+
+    @property
+    def starts(self) -> int:
+        return len([x for x in self.commands if "-O" not in x])
+
+
+@mock.patch("compose_flow.settings.REMOTE_CONNECT_TIMEOUT", new=0.5)
+@mock.patch("compose_flow.settings.REMOTE_PING_TIMEOUT", new=0.5)
+class TunnelTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+        self.socket_path = os.path.join(self.root, "compose-flow-host.sock")
+        self.cache = DiskCache(os.path.join(self.root, "cache"))
+
+        self.ssh = FakeSSH()
+        self.addCleanup(self.ssh.drop_forward)
+
+    def get_tunnel(self) -> tunnel.Tunnel:
+        return tunnel.Tunnel(
+            "user@host", self.socket_path, cache=self.cache, execute=self.ssh
+        )
+
+    def test_connect(self, *mocks):
+        tunnel_ = self.get_tunnel()
+
+        self.assertEqual(True, tunnel_.connect())
+
+        self.assertEqual(True, tunnel.ping(self.socket_path))
+        self.assertEqual(1, tunnel_.counts["connected"])
+        self.assertEqual(1, len(tunnel_.get_latencies()))
+
+        command = self.ssh.commands[0]
+        self.assertIn("-o ControlMaster=auto", command)
+        self.assertIn(f"-Nf -L {self.socket_path}:/var/run/docker.sock", command)
+
+    def test_reuse_across_runs(self, *mocks):
+        self.get_tunnel().connect()
+
+        tunnel_ = self.get_tunnel()
+
+        self.assertEqual(False, tunnel_.connect())
+
+        self.assertEqual(1, tunnel_.counts["reused"])
+        self.assertEqual(1, len(self.ssh.commands))
+
+    def test_forward_again_through_master(self, *mocks):
+        """
+        Ensure a running control master is reused when only the forward is gone
+        """
+        self.get_tunnel().connect()
+        self.ssh.drop_forward()
+
+        tunnel_ = self.get_tunnel()
+
+        self.assertEqual(True, tunnel_.connect())
+
+        self.assertEqual(1, tunnel_.counts["forwarded"])
+        self.assertEqual(1, self.ssh.starts)
+        self.assertEqual(2, len(tunnel_.get_latencies()))
+
+    def test_stale_socket_reconnects(self, *mocks):
+        """
+        Ensure a socket left behind by a dead tunnel is not taken as connected
+        """
+        self.get_tunnel().connect()
+        self.ssh.drop_forward()
+        self.ssh.master = False
+
+        tunnel_ = self.get_tunnel()
+
+        self.assertEqual(False, tunnel_.is_alive())
+        self.assertEqual(True, tunnel_.connect())
+
+        self.assertEqual(1, tunnel_.counts["connected"])
+        self.assertEqual(2, self.ssh.starts)
+
+    def test_docker_not_responding(self, *mocks):
+        self.ssh.docker_up = False
+
+        with self.assertRaises(NotConnected):
+            self.get_tunnel().connect()
+
+        self.assertEqual([], self.get_tunnel().get_latencies())
+
+    def test_close(self, *mocks):
+        tunnel_ = self.get_tunnel()
+        tunnel_.connect()
+
+        tunnel_.close()
+
+        self.assertEqual(False, self.ssh.master)
+        self.assertEqual(False, os.path.exists(self.socket_path))
+        self.assertEqual(False, os.path.exists(tunnel_.control_path))
+
+    def test_latency_history_is_bounded(self, *mocks):
+        tunnel_ = self.get_tunnel()
+
+        for idx in range(tunnel.LATENCY_HISTORY + 5):
+            tunnel_.record_latency(float(idx))
+
+        latencies = tunnel_.get_latencies()
+
+        self.assertEqual(tunnel.LATENCY_HISTORY, len(latencies))
+        self.assertEqual(float(tunnel.LATENCY_HISTORY + 4), latencies[-1])
+
+    def test_format_latencies(self, *mocks):
+        self.assertEqual(
+            "last reconnect took 3.00s, median 2.00s over 3 reconnects",
+            tunnel.format_latencies([1.0, 2.0, 3.0]),
+        )
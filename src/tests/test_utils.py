@@ -1,6 +1,15 @@
-from unittest import TestCase
+import os
+import shutil
+import tempfile
 
-from compose_flow import utils
+from collections import OrderedDict
+from unittest import TestCase, mock
+
+import yaml
+
+from compose_flow import git, utils
+
+from tests.utils import MODULE_DIR, get_content
 
 
 class RenderTestCase(TestCase):
@@ -17,6 +26,15 @@ class RenderTestCase(TestCase):
 
         self.assertEqual(expected, rendered)
 
+    def test_get_backoff_delays(self, *mocks):
+        delays = list(utils.get_backoff_delays(8, base=0.1, cap=1.0))
+
+        self.assertEqual(7, len(delays))
+        for attempt, delay in enumerate(delays):
+            self.assertLessEqual(delay, min(1.0, 0.1 * 2**attempt))
+
+        self.assertEqual([], list(utils.get_backoff_delays(1)))
+
     def test_get_kv(self, *mocks):
         """Ensure a single item is parsed"""
         data = utils.get_kv("FOO=one")
@@ -28,3 +46,218 @@ class RenderTestCase(TestCase):
         data = utils.get_kv("FOO=one\nBAR=two", multiple=True)
 
         self.assertEqual([("FOO", "one"), ("BAR", "two")], data)
+
+
+class RemergeTestCase(TestCase):
+    def test_last_wins(self, *mocks):
+        merged = utils.remerge(
+            [{"a": 1, "b": {"c": "x", "d": 2}}, {"a": 3, "b": {"c": "y"}}]
+        )
+
+        self.assertEqual({"a": 3, "b": {"c": "y", "d": 2}}, merged)
+
+    def test_lists_are_additive(self, *mocks):
+        merged = utils.remerge(
+            [{"environment": ["A=1", "B"]}, {"environment": ["C=3"]}, {}]
+        )
+
+        self.assertEqual({"environment": ["A=1", "B", "C=3"]}, merged)
+
+    def test_key_order(self, *mocks):
+        """
+        Ensures existing keys keep their position and new keys are appended
+        """
+        merged = utils.remerge(
+            [OrderedDict([("b", 1), ("a", 1)]), OrderedDict([("c", 2), ("b", 2)])]
+        )
+
+        self.assertEqual(["b", "a", "c"], list(merged.keys()))
+        self.assertEqual(OrderedDict, type(merged))
+
+    def test_targets_not_modified(self, *mocks):
+        base = {"services": {"app": {"environment": ["A=1"]}}}
+        overlay = {"services": {"app": {"environment": ["B=2"]}}}
+
+        utils.remerge([base, overlay])
+
+        self.assertEqual({"services": {"app": {"environment": ["A=1"]}}}, base)
+        self.assertEqual({"services": {"app": {"environment": ["B=2"]}}}, overlay)
+
+    def test_type_change_replaces(self, *mocks):
+        """
+        Ensures a value changing type is replaced, e.g. an empty key in the base file
+        """
+        merged = utils.remerge([{"volumes": None}, {"volumes": {"data": {}}}])
+
+        self.assertEqual({"volumes": {"data": {}}}, merged)
+
+    def test_sourced(self, *mocks):
+        merged, source_map = utils.remerge(
+            [("base", {"a": 1, "b": {"c": [1]}}), ("local", {"b": {"d": 2}})],
+            sourced=True,
+        )
+
+        self.assertEqual({"a": 1, "b": {"c": [1], "d": 2}}, merged)
+        self.assertEqual(
+            {
+                ("a",): "base",
+                ("b",): "local",
+                ("b", "c"): "base",
+                ("b", "d"): "local",
+            },
+            source_map,
+        )
+
+
+class YamlTestCase(TestCase):
+    """
+    Ensures yaml_load and yaml_dump produce the same output as the pure-Python
+    implementation they replaced
+
+    The files in tests/files/yaml/*.expected.yml were generated with the
+    pure-Python loader and dumper.
+    """
+
+    def _get_golden_files(self) -> list:
+        golden_dir = os.path.join(MODULE_DIR, "files", "yaml")
+        profiles_dir = os.path.join(MODULE_DIR, "files", "profiles")
+
+        golden_files = [
+            (os.path.join(golden_dir, "compose.yml"), "compose.expected.yml")
+        ]
+        for filename in sorted(os.listdir(profiles_dir)):
+            name = os.path.splitext(filename)[0]
+
+            golden_files.append(
+                (
+                    os.path.join(profiles_dir, filename),
+                    f"profile-{name}.expected.yml",
+                )
+            )
+
+        return [(x, os.path.join(golden_dir, y)) for x, y in golden_files]
+
+    def test_golden_files(self, *mocks):
+        for source, expected_path in self._get_golden_files():
+            with self.subTest(source=source):
+                with open(source, "r") as fh:
+                    content = utils.yaml_dump(utils.yaml_load(fh))
+
+                with open(expected_path, "r") as fh:
+                    self.assertEqual(fh.read(), content)
+
+    def test_pure_python_equivalent(self, *mocks):
+        """
+        Ensures the pure-Python fallback loads and dumps the same data
+        """
+        for source, _ in self._get_golden_files():
+            with self.subTest(source=source):
+                content = get_content(source)
+
+                data = utils.yaml_load(content)
+                py_data = utils.yaml_load(content, Loader=yaml.Loader)
+
+                self.assertEqual(py_data, data)
+                self.assertEqual(
+                    utils.yaml_dump(py_data, Dumper=yaml.Dumper),
+                    utils.yaml_dump(data),
+                )
+
+    def test_ordered_mappings(self, *mocks):
+        data = utils.yaml_load("b: 1\na:\n  d: 2\n  c: 3\n")
+
+        self.assertEqual(OrderedDict, type(data))
+        self.assertEqual(["b", "a"], list(data.keys()))
+        self.assertEqual(["d", "c"], list(data["a"].keys()))
+        self.assertEqual("b: 1\na:\n  d: 2\n  c: 3\n", utils.yaml_dump(data))
+
+    def test_object_pairs_hook(self, *mocks):
+        data = utils.yaml_load("a:\n  b: 1\n", object_pairs_hook=dict)
+
+        self.assertEqual(dict, type(data["a"]))
+
+    def test_load_file(self, *mocks):
+        """
+        Ensures files are only parsed again when they change
+        """
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+
+        path = os.path.join(temp_dir, "config.yml")
+        with open(path, "w") as fh:
+            fh.write("a: 1\n")
+
+        with mock.patch("compose_flow.utils.yaml_load", wraps=utils.yaml_load) as load:
+            data = utils.yaml_load_file(path)
+            data["a"] = 2
+
+            self.assertEqual({"a": 1}, utils.yaml_load_file(path))
+            self.assertEqual(1, load.call_count)
+
+            with open(path, "w") as fh:
+                fh.write("a: 10\n")
+
+            self.assertEqual({"a": 10}, utils.yaml_load_file(path))
+            self.assertEqual(2, load.call_count)
+
+
+@mock.patch("compose_flow.git.get_state")
+@mock.patch("compose_flow.shell.execute")
+class TagVersionTestCase(TestCase):
+    def setUp(self):
+        self.cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_root)
+
+        patcher = mock.patch("compose_flow.utils.settings.CACHE_ROOT", self.cache_root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_state(self, **kwargs):
+        state = dict(work_tree="/src/app", head="abc123", tags="t1", changes=())
+        state.update(kwargs)
+
+        return git.GitState(**state)
+
+    def test_cached_for_clean_working_copy(self, *mocks):
+        execute_mock, get_state_mock = mocks
+        execute_mock.return_value = "1.2.3\n"
+        get_state_mock.return_value = self._get_state()
+
+        self.assertEqual("1.2.3", utils.get_tag_version())
+        self.assertEqual("1.2.3", utils.get_tag_version())
+
+        execute_mock.assert_called_once()
+
+    def test_new_tag_not_cached(self, *mocks):
+        execute_mock, get_state_mock = mocks
+        execute_mock.return_value = "1.2.3-1-gabc123"
+        get_state_mock.return_value = self._get_state()
+
+        utils.get_tag_version()
+
+        execute_mock.return_value = "1.2.4"
+        get_state_mock.return_value = self._get_state(tags="t2")
+
+        self.assertEqual("1.2.4", utils.get_tag_version())
+
+    def test_dirty_working_copy_not_cached(self, *mocks):
+        execute_mock, get_state_mock = mocks
+        execute_mock.return_value = "1.2.3"
+        get_state_mock.return_value = self._get_state(changes=(" M app.py",))
+
+        utils.get_tag_version()
+        utils.get_tag_version()
+
+        self.assertEqual(2, execute_mock.call_count)
+
+    @mock.patch("compose_flow.utils.settings.TAG_VERSION_CACHE_TTL", 0)
+    def test_cache_disabled(self, *mocks):
+        execute_mock, get_state_mock = mocks
+        execute_mock.return_value = "1.2.3"
+        get_state_mock.return_value = self._get_state()
+
+        utils.get_tag_version()
+        utils.get_tag_version()
+
+        self.assertEqual(2, execute_mock.call_count)
+        get_state_mock.assert_not_called()
@@ -118,15 +118,15 @@ class WorkflowTestCase(BaseTestCase):
         self.assertEqual({}, workflow.environment._data)
 
     @mock.patch("compose_flow.commands.workflow.print")
-    @mock.patch("compose_flow.commands.workflow.pkg_resources")
+    @mock.patch("compose_flow.commands.workflow.get_package_version")
     def test_version(self, *mocks):
         """
         Ensure the --version arg just returns the version
         """
         version = "0.0.0-test"
 
-        pkg_resources_mock = mocks[0]
-        pkg_resources_mock.require.return_value = [mock.Mock(version=version)]
+        get_package_version_mock = mocks[0]
+        get_package_version_mock.return_value = version
 
         command = shlex.split("--version")
         workflow = Workflow(argv=command)